@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Plotly bar-race HTML size and per-frame payload, compact builder vs px.bar.
+
+Usage (from repo root):
+    python self-extended-practice/benchmarks/bench_bar_race.py --years 12 --markets 50
+
+"px.bar" is the previous plot_interactive_bar_race (animation_frame + color, one
+trace per market per frame). "compact" is plot_exports.bar_race_figure (one trace,
+typed x/y/color arrays). There is no browser here, so frame-switch cost is
+measured by proxy: the JSON bytes of one frame, the traces Plotly has to diff per
+frame, and the time to decode every frame's JSON (what the page does per switch
+before redrawing).
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent / "semiconductor-tariff-impact-taiwan" / "src"))
+
+from plot_exports import bar_race_figure  # noqa: E402
+
+
+def legacy_bar_race_figure(df: pd.DataFrame):
+    df_sorted = df.assign(Export_Bn=df["Export_USD"] / 1e9).sort_values(["Year", "Export_Bn"], ascending=[True, False])
+    fig = px.bar(df_sorted, x="Export_Bn", y="Country_EN", orientation="h", color="Country_EN",
+                 animation_frame="Year", range_x=[0, df_sorted["Export_Bn"].max() * 1.1])
+    fig.update_yaxes(categoryorder="total ascending")
+    return fig
+
+
+def make_year_country(years: int, markets: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    base = rng.lognormal(21, 1.5, markets)
+    growth = rng.normal(0.05, 0.1, (years, markets)).cumsum(axis=0)
+    values = base * np.exp(growth)
+    yy, mm = np.meshgrid(np.arange(2013, 2013 + years), np.arange(markets), indexing="ij")
+    return pd.DataFrame({"Year": yy.ravel(), "Country_EN": [f"Market {i:02d}" for i in mm.ravel()],
+                         "Export_USD": values.ravel()})
+
+
+def measure(name: str, build, df: pd.DataFrame, repeat: int) -> dict:
+    t0 = time.perf_counter()
+    fig = build(df)
+    html = pio.to_html(fig, include_plotlyjs="cdn", full_html=True)
+    build_s = time.perf_counter() - t0
+
+    frames = json.loads(fig.to_json())["frames"]
+    frame_json = [json.dumps(f) for f in frames]
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for s in frame_json:
+            json.loads(s)
+    decode_ms = (time.perf_counter() - t0) / (repeat * len(frame_json)) * 1e3
+    return {
+        "variant": name,
+        "html_kb": len(html.encode()) / 1024,
+        "frame_kb": np.mean([len(s) for s in frame_json]) / 1024,
+        "traces_per_frame": np.mean([len(f["data"]) for f in frames]),
+        "decode_ms_per_frame": decode_ms,
+        "build_s": build_s,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bar race output size / frame payload benchmark")
+    ap.add_argument("--years", type=int, default=12)
+    ap.add_argument("--markets", type=int, default=50)
+    ap.add_argument("--top-k", type=int, default=10)
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+
+    df = make_year_country(args.years, args.markets)
+    rows = [
+        measure("px.bar", legacy_bar_race_figure, df, args.repeat),
+        measure("compact", bar_race_figure, df, args.repeat),
+        measure(f"compact top-{args.top_k}", lambda d: bar_race_figure(d, top_k=args.top_k), df, args.repeat),
+    ]
+    print(f"{args.years} years x {args.markets} markets")
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: cold / warm load time per raw dataset, CSV vs memory-mapped Arrow (columnar_store).
+
+Usage (from repo root):
+    python self-extended-practice/benchmarks/bench_columnar_store.py --repeat 20
+
+For every CSV under semiconductor-tariff-impact-taiwan/data/raw the files are
+converted into a temporary store, then three loads are timed:
+
+- csv        : pd.read_csv of the whole file (what consumers did before)
+- arrow all  : columnar_store.read_frame(), every column
+- arrow used : columnar_store.open_table() with only the columns a consumer reads
+
+"cold" runs each load in a fresh interpreter after posix_fadvise(DONTNEED) on the
+file, so the page cache is dropped for it (best effort, no root needed); only the
+load call is timed, not interpreter start-up or imports. "warm" is the median of
+--repeat loads in this process.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+HERE = Path(__file__).resolve().parent
+SRC = HERE.parent / "semiconductor-tariff-impact-taiwan" / "src"
+RAW_DIR = HERE.parent / "semiconductor-tariff-impact-taiwan" / "data" / "raw"
+sys.path.insert(0, str(SRC))
+
+import columnar_store  # noqa: E402
+
+# Columns each consumer actually reads, by dataset family
+USED = {
+    "comtrade": ["refYear", "reporterDesc", "partnerDesc", "fobvalue"],
+    "customs_by_country": ["Year", "Country", "HS Code", "Export Value (USD)"],
+    "customs_portal": ["日期", "貨品號列", "美元(千元)"],
+    "usa_tariffs": ["Year", "HS Code", "MFN Duty Rate (%)"],
+}
+
+
+def _drop_cache(path: Path) -> None:
+    if hasattr(os, "posix_fadvise"):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def _load(kind: str, csv_path: Path, arrow_path: Path, columns):
+    if kind == "csv":
+        return pd.read_csv(csv_path, encoding_errors="replace", index_col=False)
+    if kind == "arrow all":
+        return columnar_store.read_frame(arrow_path)
+    return columnar_store.open_table(arrow_path, columns=columns)
+
+
+_COLD_SNIPPET = """
+import sys, time, json
+sys.path.insert(0, {src!r}); sys.path.insert(0, {here!r})
+from pathlib import Path
+from bench_columnar_store import _load
+t0 = time.perf_counter()
+_load({kind!r}, Path({csv!r}), Path({arrow!r}), {cols!r})
+print(json.dumps(time.perf_counter() - t0))
+"""
+
+
+def cold_time(kind: str, csv_path: Path, arrow_path: Path, columns) -> float:
+    _drop_cache(csv_path if kind == "csv" else arrow_path)
+    code = _COLD_SNIPPET.format(src=str(SRC), here=str(HERE), kind=kind, csv=str(csv_path),
+                                arrow=str(arrow_path), cols=columns)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def warm_time(kind: str, csv_path: Path, arrow_path: Path, columns, repeat: int) -> float:
+    _load(kind, csv_path, arrow_path, columns)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        _load(kind, csv_path, arrow_path, columns)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="CSV vs memory-mapped Arrow load benchmark")
+    ap.add_argument("--raw-dir", type=str, default=str(RAW_DIR))
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as store_dir:
+        for csv_path in sorted(Path(args.raw_dir).glob("*.csv")):
+            arrow_path = columnar_store.convert_csv(csv_path, Path(store_dir), force=True)
+            family = columnar_store.open_table(arrow_path, columns=[]).schema.metadata[b"family"].decode()
+            columns = USED.get(family)
+            for kind in ("csv", "arrow all", "arrow used"):
+                if kind == "arrow used" and not columns:
+                    continue
+                rows.append({
+                    "file": csv_path.name,
+                    "load": kind,
+                    "size_kb": (csv_path if kind == "csv" else arrow_path).stat().st_size / 1024,
+                    "cold_ms": cold_time(kind, csv_path, arrow_path, columns) * 1e3,
+                    "warm_ms": warm_time(kind, csv_path, arrow_path, columns, args.repeat) * 1e3,
+                })
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+
+if __name__ == "__main__":
+    main()
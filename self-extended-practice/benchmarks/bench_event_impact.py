@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Check + benchmark: event_impact cumulative-sum engine vs a per-event, per-market loop.
+
+Usage (from repo root):
+    python self-extended-practice/benchmarks/bench_event_impact.py
+    python self-extended-practice/benchmarks/bench_event_impact.py --events 5000 --markets 500 --monthly
+
+1. Real data: impact_summary(window 2) against the committed
+   data/processed/event_impact_summary.csv, for the per-market rows. That file's TOTAL rows
+   are a mean over markets and every row is repeated once per HS line, so they are
+   compared after drop_duplicates and the TOTAL rows are left out.
+2. Synthetic panel: the engine matches the loop (one event, one market, one window at a
+   time with boolean masks, as the notebook computed it) on a sample of events.
+3. Timing: every event x window x market at once, against the loop extrapolated from
+   the sample.
+"""
+
+from __future__ import annotations
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+HERE = Path(__file__).resolve().parent
+PROJ = HERE.parent / "semiconductor-tariff-impact-taiwan"
+sys.path.insert(0, str(PROJ / "src"))
+
+import event_impact as ei  # noqa: E402
+import trade_cube as tc  # noqa: E402
+
+
+def loop_summary(panel: ei.ExportPanel, events: pd.DataFrame, windows, markets) -> pd.DataFrame:
+    """Reference: the per-event / per-market formulation."""
+    ords = ei._ordinal(panel.periods)
+    total = panel.values.sum(axis=1)
+    rows = []
+    for period, event in zip(events["Period"], events["Event"]):
+        e = int(ei._ordinal(np.array([period if not panel.monthly or period > 9999 else period * 100 + 1]))[0])
+        for w in windows:
+            pre = (ords >= e - w) & (ords <= e - 1)
+            post = (ords >= e + 1) & (ords <= e + w)
+            for m in markets:
+                col = panel.values[:, list(panel.markets).index(m)]
+                share = col / total
+                r = {"Market": m}
+                for side, mask in (("Pre", pre), ("Post", post)):
+                    r[f"{side}Avg_USD"] = col[mask].mean() if mask.any() else np.nan
+                    r[f"{side}Avg_Share"] = share[mask].mean() if mask.any() else np.nan
+                rows.append(r)
+    return pd.DataFrame(rows)
+
+
+def _rel(a, b) -> float:
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    if not np.array_equal(np.isnan(a), np.isnan(b)):
+        return np.inf
+    m = ~np.isnan(a)
+    return float(np.max(np.abs(a[m] - b[m]) / np.maximum(np.abs(b[m]), 1e-12), initial=0.0))
+
+
+def check_real(tol: float) -> bool:
+    cube = tc.customs_cube(PROJ / "data" / "raw" / "taiwan_exports_by_country_2013_2025.csv",
+                           PROJ / "data" / "mappings" / "country_name_map_full.json")
+    events = ei.load_events(PROJ / "data" / "processed" / "us_tariffs_with_policy_events.csv")
+    got = ei.impact_summary(ei.ExportPanel.from_cube(cube), events)
+    ref = pd.read_csv(PROJ / "data" / "processed" / "event_impact_summary.csv", encoding="utf-8-sig")
+    ref = ref[ref["Market"] != ei.TOTAL_LABEL].drop_duplicates(["EventYear", "Market"])
+    got = got[got["Market"] != ei.TOTAL_LABEL].astype({"Market": str})
+    merged = ref.merge(got, on=["EventYear", "Market"], suffixes=("_ref", ""))
+    d = max(_rel(merged[c], merged[f"{c}_ref"]) for c in ei.STATS)
+    same_events = (merged["Event"].astype(str) == merged["Event_ref"].fillna("None")).all()
+    ok = d <= tol and len(merged) == len(ref) and same_events
+    print(f"window 2 vs committed event_impact_summary ({len(merged)} rows): max rel diff = {d:.2e}  "
+          f"[{'OK' if ok else 'FAIL'}]")
+    return ok
+
+
+def synthetic(n_periods: int, n_markets: int, n_events: int, monthly: bool, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    if monthly:
+        ords = 2000 * 12 + np.arange(n_periods)
+        periods = (ords // 12) * 100 + ords % 12 + 1
+        ev = rng.choice(periods, n_events)
+    else:
+        periods = 2025 - n_periods + 1 + np.arange(n_periods)
+        ev = rng.integers(periods[0] - 3, periods[-1] + 3, n_events)     # some windows fall off the edges
+    values = rng.lognormal(16, 2, (n_periods, n_markets)) * (rng.random((n_periods, n_markets)) > 0.1)
+    panel = ei.ExportPanel.from_arrays(periods, [f"M{i:04d}" for i in range(n_markets)], values)
+    events = pd.DataFrame({"Period": ev, "Event": [f"event {i}" for i in range(n_events)]})
+    return panel, events
+
+
+def main():
+    ap = argparse.ArgumentParser(description="event_impact parity and timing")
+    ap.add_argument("--events", type=int, default=3000)
+    ap.add_argument("--markets", type=int, default=300)
+    ap.add_argument("--periods", type=int, default=60, help="Years (or months with --monthly)")
+    ap.add_argument("--monthly", action="store_true")
+    ap.add_argument("--windows", type=int, nargs="+", default=[1, 2, 3, 4, 5])
+    ap.add_argument("--sample", type=int, default=20, help="Events run through the loop reference")
+    ap.add_argument("--tol", type=float, default=1e-9)
+    args = ap.parse_args()
+
+    if not check_real(args.tol):
+        raise SystemExit(1)
+
+    panel, events = synthetic(args.periods, args.markets, args.events, args.monthly)
+    markets = list(panel.markets)
+
+    sample = events.iloc[:args.sample]
+    t0 = time.perf_counter()
+    ref = loop_summary(panel, sample, args.windows, markets)
+    loop_s = (time.perf_counter() - t0) / len(sample) * len(events)
+    got = ei.impact_summary(panel, sample, args.windows, markets)
+    got = got[got["Market"] != ei.TOTAL_LABEL]
+    cols = ["PreAvg_USD", "PostAvg_USD", "PreAvg_Share", "PostAvg_Share"]
+    d = max(_rel(got[c].to_numpy(), ref[c].to_numpy()) for c in cols)
+    print(f"engine vs per-event loop ({args.sample} events x {len(args.windows)} windows x {args.markets} markets): "
+          f"max rel diff = {d:.2e}  [{'OK' if d <= args.tol else 'FAIL'}]")
+    if d > args.tol:
+        raise SystemExit(1)
+
+    t0 = time.perf_counter()
+    ei.window_stats(panel, events["Period"].to_numpy(), args.windows)
+    stats_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    df = ei.impact_summary(panel, events, args.windows, markets)
+    total_s = time.perf_counter() - t0
+    freq = "months" if args.monthly else "years"
+    print(f"\n{args.events} events x {len(args.windows)} windows x {args.markets} markets "
+          f"({args.periods} {freq}, {len(df):,} rows)")
+    print(f"  window_stats            : {stats_s:.3f}s")
+    print(f"  impact_summary (frame)  : {total_s:.3f}s")
+    print(f"  per-event loop (est.)   : {loop_s:.1f}s  -> {loop_s / total_s:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
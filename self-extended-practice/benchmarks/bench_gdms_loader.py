@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark + memory check for the streaming GDMS loader (_load_quakes_from_gdms).
+
+Generates a synthetic multi-million-row GDMS catalog, loads it in a fresh
+subprocess and reports wall time, rows kept and peak RSS. Exits non-zero when
+peak RSS exceeds --max-rss-mb (the documented target in _load_quakes_from_gdms)
+or when the loaded frame fails the bbox/validity invariants.
+
+Usage (from repo root):
+    python self-extended-practice/benchmarks/bench_gdms_loader.py --events 5000000
+    python self-extended-practice/benchmarks/bench_gdms_loader.py --events 2000000 --baseline
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+SRC = HERE.parent / "taiwan_earthquake_analysis" / "src"
+sys.path.insert(0, str(HERE))
+
+from synth import write_gdms_catalog  # noqa: E402
+
+_CHILD = r"""
+import json, resource, sys, time
+sys.path.insert(0, {src!r})
+path, mode = sys.argv[1], sys.argv[2]
+t0 = time.perf_counter()
+if mode == "stream":
+    from quake_sources import _load_quakes_from_gdms, TAIWAN_BBOX
+    df = _load_quakes_from_gdms(path)
+    ok = bool(
+        df["lat"].between(*TAIWAN_BBOX["lat"]).all()
+        and df["lon"].between(*TAIWAN_BBOX["lon"]).all()
+        and df["time"].notna().all()
+        and df["time"].is_monotonic_increasing
+    )
+    rows = len(df)
+else:
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    ok, rows = True, len(raw["body"])
+dt = time.perf_counter() - t0
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({{"seconds": dt, "rows": rows, "peak_rss_mb": rss_mb, "ok": ok}}))
+"""
+
+
+def run_child(path: Path, mode: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD.format(src=str(SRC)), str(path), mode],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Peak-RSS check for the streaming GDMS loader")
+    ap.add_argument("--events", type=int, default=3_000_000)
+    ap.add_argument("--max-rss-mb", type=float, default=600.0)
+    ap.add_argument("--baseline", action="store_true",
+                    help="Also measure a plain json.load of the same file for reference")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_gdms_catalog(Path(tmp) / "gdms.json", args.events)
+        size_mb = path.stat().st_size / 1e6
+        print(f"catalog: {args.events:,} events, {size_mb:.0f} MB")
+
+        modes = ["stream"] + (["json.load"] if args.baseline else [])
+        results = {m: run_child(path, m) for m in modes}
+
+    for mode, r in results.items():
+        rate = r["rows"] / r["seconds"] if r["seconds"] else float("inf")
+        print(f"{mode:>10}: {r['seconds']:7.2f}s  rows={r['rows']:,}  "
+              f"peak_rss={r['peak_rss_mb']:.0f} MB  ({rate:,.0f} rows/s)")
+
+    stream = results["stream"]
+    if not stream["ok"]:
+        sys.exit("FAIL: loaded frame violates bbox/time invariants")
+    if stream["peak_rss_mb"] > args.max_rss_mb:
+        sys.exit(f"FAIL: peak RSS {stream['peak_rss_mb']:.0f} MB > target {args.max_rss_mb:.0f} MB")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
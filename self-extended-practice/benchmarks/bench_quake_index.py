@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Check + benchmark: quake_index.QuakeIndex queries vs the full-scan pandas filter.
+
+Usage (from repo root):
+    python self-extended-practice/benchmarks/bench_quake_index.py
+    python self-extended-practice/benchmarks/bench_quake_index.py --events 5000000 --queries 200
+
+The catalog is synth.quake_frame (normalized columns, 60% of events clustered around
+four hotspots). A seeded batch of mixed queries is answered two ways:
+
+- radius   : M >= mag_min within radius_km of a hotspot / random point, between two dates
+- bbox     : lat/lon box, depth range, between two dates
+- radius*  : small radius, whole catalog period
+- nearest  : k nearest M >= mag_min events to a random "station"
+
+The full scan uses boolean masks over the whole frame (haversine for radius, an argsort
+of all distances for nearest). Both answers must be identical; the timings are per query,
+and for the whole batch via QuakeIndex.query_batch.
+
+Boundary check first: mag / depth thresholds equal to a catalog value's printed form
+(e.g. 4.1 for the float32 M4.1) are passed as np.float64 to the index and as Python floats
+to the scan; events on the boundary must be kept by both.
+"""
+
+from __future__ import annotations
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent / "taiwan_earthquake_analysis" / "src"))
+sys.path.insert(0, str(HERE))
+
+from quake_index import QuakeIndex, haversine_km  # noqa: E402
+from synth import QUAKE_HOTSPOTS, quake_frame  # noqa: E402
+
+
+def make_queries(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n):
+        kind = ("radius", "bbox", "radius*", "nearest")[i % 4]
+        lat, lon = QUAKE_HOTSPOTS[rng.integers(len(QUAKE_HOTSPOTS))] if rng.random() < 0.5 else \
+            (rng.uniform(21, 26), rng.uniform(119, 123))
+        start = pd.Timestamp("2000-01-01") + pd.Timedelta(days=int(rng.integers(0, 24 * 365)))
+        end = start + pd.Timedelta(days=int(rng.integers(30, 3 * 365)))
+        if kind == "radius":
+            q = dict(start=start, end=end, lat=lat, lon=lon, radius_km=float(rng.choice([20, 50, 100])),
+                     mag_min=float(rng.choice([3.0, 4.0])))
+        elif kind == "bbox":
+            h = rng.uniform(0.2, 1.0)
+            q = dict(start=start, end=end, lat_min=lat - h, lat_max=lat + h, lon_min=lon - h, lon_max=lon + h,
+                     depth_min=0.0, depth_max=float(rng.choice([30, 70])))
+        elif kind == "radius*":
+            q = dict(lat=lat, lon=lon, radius_km=float(rng.choice([5, 10])))
+        else:
+            q = dict(lat=lat, lon=lon, k=10, mag_min=float(rng.choice([3.0, 4.5])))
+        rows.append({"kind": kind, **q})
+    return pd.DataFrame(rows)
+
+
+def scan(df: pd.DataFrame, q: dict) -> np.ndarray:
+    """Full-scan pandas filter (the bbox-mask approach of make_map.py, generalized)."""
+    m = pd.Series(True, index=df.index)
+    if pd.notna(q.get("start")):
+        m &= df["time"].between(q["start"], q["end"])
+    if pd.notna(q.get("lat_min")):
+        m &= df["lat"].between(q["lat_min"], q["lat_max"]) & df["lon"].between(q["lon_min"], q["lon_max"])
+    if pd.notna(q.get("mag_min")):
+        m &= df["mag"] >= q["mag_min"]
+    if pd.notna(q.get("depth_min")):
+        m &= df["depth"].between(q["depth_min"], q["depth_max"])
+    if pd.notna(q.get("k")):
+        dist = haversine_km(q["lat"], q["lon"], df["lat"], df["lon"])
+        idx = np.flatnonzero(m.to_numpy())
+        return idx[np.argsort(dist[idx], kind="stable")[:int(q["k"])]]
+    if pd.notna(q.get("radius_km")):
+        m &= haversine_km(q["lat"], q["lon"], df["lat"], df["lon"]) <= q["radius_km"]
+    return np.flatnonzero(m.to_numpy())
+
+
+def check_boundaries(df: pd.DataFrame, index: QuakeIndex, n: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    for j in rng.choice(len(df), n, replace=False):
+        for col, lo, hi in (("mag", "mag_min", "mag_max"), ("depth", "depth_min", "depth_max")):
+            v = float(str(df[col].iloc[j]))  # shortest repr of the float32 value, e.g. 4.1
+            for field, mask in ((lo, df[col] >= v), (hi, df[col] <= v)):
+                got = index.query(**{field: np.float64(v)})
+                ref = np.flatnonzero(mask.to_numpy())
+                if not np.array_equal(np.sort(got), ref):
+                    print(f"MISMATCH [boundary] {field}={v!r}: index {len(got)} rows, scan {len(ref)}")
+                    raise SystemExit(1)
+    print(f"boundary thresholds: {n} catalog values x mag/depth min/max, np.float64 vs scan: OK")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="QuakeIndex vs full-scan pandas filter")
+    ap.add_argument("--events", type=int, default=3_000_000)
+    ap.add_argument("--queries", type=int, default=100)
+    ap.add_argument("--cell-km", type=float, default=10.0)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    df = quake_frame(args.events, seed=args.seed)
+    t0 = time.perf_counter()
+    index = QuakeIndex(df, cell_km=args.cell_km)
+    build = time.perf_counter() - t0
+    print(f"catalog: {len(df):,} events; index build {build:.2f}s ({index.ny} x {index.nx} cells of {args.cell_km:g} km)")
+
+    check_boundaries(df, index, 20, args.seed + 2)
+
+    queries = make_queries(args.queries, args.seed + 1)
+    fields = queries.drop(columns="kind")
+    per_kind = {}
+    for kind, q in zip(queries["kind"], fields.to_dict("records")):
+        t0 = time.perf_counter()
+        got = index.query_batch([q])["row"].to_numpy()
+        t_idx = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        ref = scan(df, q)
+        t_scan = time.perf_counter() - t0
+        if kind == "nearest":
+            same = np.allclose(np.sort(haversine_km(q["lat"], q["lon"], df["lat"].to_numpy()[got], df["lon"].to_numpy()[got])),
+                               np.sort(haversine_km(q["lat"], q["lon"], df["lat"].to_numpy()[ref], df["lon"].to_numpy()[ref])))
+        else:
+            same = np.array_equal(got, ref)
+        if not same:
+            print(f"MISMATCH [{kind}] {q}")
+            raise SystemExit(1)
+        per_kind.setdefault(kind, []).append((t_idx, t_scan, len(ref)))
+
+    print(f"\n{'query':<9}{'n':>5}{'rows (median)':>15}{'index ms':>11}{'scan ms':>11}{'speedup':>10}")
+    for kind, rows in per_kind.items():
+        t_idx = statistics.median(r[0] for r in rows) * 1e3
+        t_scan = statistics.median(r[1] for r in rows) * 1e3
+        n_rows = statistics.median(r[2] for r in rows)
+        print(f"{kind:<9}{len(rows):>5}{n_rows:>15.0f}{t_idx:>11.2f}{t_scan:>11.1f}{t_scan / t_idx:>9.0f}x")
+
+    t0 = time.perf_counter()
+    out = index.query_batch(fields)
+    t_batch = time.perf_counter() - t0
+    scan_total = sum(r[1] for rows in per_kind.values() for r in rows)
+    print(f"\nquery_batch: {len(fields)} queries -> {len(out):,} rows in {t_batch:.3f}s "
+          f"(full scans: {scan_total:.2f}s)  [all answers identical: OK]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: make_interactive_map build time and HTML size — packed layer, hex-binned
+layer and the per-row CircleMarker path.
+
+Usage (from repo root):
+    python self-extended-practice/benchmarks/bench_quake_map.py --events 1557 20000 100000
+
+Each size is a synthetic GDMS catalog (header+body) written to a temp dir.
+The "markers" path is skipped above --markers-max events because it takes minutes.
+"""
+
+from __future__ import annotations
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent / "taiwan_earthquake_analysis" / "src"))
+
+from make_map_by_year import make_interactive_map  # noqa: E402
+from synth import write_gdms_catalog  # noqa: E402
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark packed vs per-marker earthquake map rendering")
+    ap.add_argument("--events", type=int, nargs="+", default=[1557, 20000, 100000])
+    ap.add_argument("--markers-max", type=int, default=20000,
+                    help="Skip the per-row CircleMarker path above this many events")
+    args = ap.parse_args()
+
+    variants = [("packed", "raw"), ("packed", "binned"), ("markers", "raw")]
+    print(f"{'events':>9} {'renderer':>9} {'mode':>7} {'build_s':>9} {'html_MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for n in args.events:
+            src = tmp / f"gdms_{n}.json"
+            write_gdms_catalog(src, n)
+            for renderer, mode in variants:
+                if renderer == "markers" and n > args.markers_max:
+                    continue
+                out = tmp / f"{renderer}_{mode}_{n}.html"
+                t0 = time.perf_counter()
+                make_interactive_map(str(src), outfile=str(out), renderer=renderer, mode=mode, use_cache=False)
+                dt = time.perf_counter() - t0
+                print(f"{n:>9} {renderer:>9} {mode:>7} {dt:>9.2f} {out.stat().st_size / 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: quake_raster.QuakeRaster accumulate + PNG time and extra memory vs catalog size.
+
+Usage (from repo root):
+    python self-extended-practice/benchmarks/bench_quake_raster.py
+    python self-extended-practice/benchmarks/bench_quake_raster.py --events 1000000 10000000 30000000 --shading eq
+
+Each (size, mode) runs in a fresh interpreter on a synth.quake_frame catalog built in
+memory, so the reading step is not timed. The child reports these:
+- add_s / png_s : QuakeRaster.add over the whole frame / shading + imsave
+- rss_delta_mb  : RSS high-water mark during add + save, minus RSS with the frame loaded.
+  It should stay flat as --events grows, because the accumulators depend only on
+  pixels and years, and the temporaries only on CHUNK_ROWS.
+The total pixel counts are checked against len(frame). Before timing, check_micro_quakes
+checks that events with M <= 0 or no magnitude still shade their pixel under the default
+weight="mag".
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent / "taiwan_earthquake_analysis" / "src"))
+sys.path.insert(0, str(HERE.parent / "common"))
+sys.path.insert(0, str(HERE))
+
+
+def child(n_events: int, by_year: bool, shading: str, out: Path) -> dict:
+    import matplotlib.image  # noqa: F401
+    from quake_raster import BY_YEAR_WIDTH, WIDTH, QuakeRaster
+    from stage_trace import peak_rss_mb, reset_peak, status_mb
+    from synth import quake_frame
+
+    df = quake_frame(n_events, seed=0)
+    reset_peak()
+    base = status_mb("VmRSS") or peak_rss_mb()
+    t0 = time.perf_counter()
+    raster = QuakeRaster(width=BY_YEAR_WIDTH if by_year else WIDTH, by_year=by_year).add(df)
+    t1 = time.perf_counter()
+    raster.save(out, shading=shading)
+    t2 = time.perf_counter()
+    if raster.n_events != len(df):
+        raise SystemExit(f"pixel counts {raster.n_events} != {len(df)} events")
+    return {"add_s": t1 - t0, "png_s": t2 - t1, "rss_delta_mb": max(peak_rss_mb() - base, 0.0),
+            "px": f"{raster.width}x{raster.height}", "layers": len(raster.years)}
+
+
+def check_micro_quakes() -> None:
+    """M <= 0 and NaN-magnitude events must keep a positive weight and a visible pixel."""
+    import pandas as pd
+    from quake_raster import BACKGROUND, QuakeRaster, _hex_rgb
+
+    mags = [-1.2, 0.0, np.nan, 3.5]
+    df = pd.DataFrame({"lat": [21.0, 22.0, 23.0, 24.0], "lon": [119.0, 120.0, 121.0, 122.0],
+                       "depth": np.float32(10.0), "mag": np.array(mags, dtype=np.float32)})
+    raster = QuakeRaster(width=200).add(df)
+    pix = np.flatnonzero(raster.count[0, 0])
+    rgb = raster.images()[0].reshape(-1, 3)[pix]
+    shaded = np.abs(rgb - _hex_rgb(BACKGROUND)).max(axis=1) > 1e-3
+    if len(pix) != len(mags) or (raster.sum[0, 0, pix] <= 0).any() or not shaded.all():
+        raise SystemExit(f"M <= 0 events not visible: sums {raster.sum[0, 0, pix]}, shaded {shaded}")
+    print("M <= 0 / missing-magnitude events stay visible ✅")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="QuakeRaster time / memory vs catalog size")
+    ap.add_argument("--events", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    ap.add_argument("--shading", choices=["log", "eq"], default="log")
+    ap.add_argument("--outdir", type=str, default="/tmp")
+    ap.add_argument("--child", type=str, default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        n, by_year, out = json.loads(args.child)
+        print(json.dumps(child(n, by_year, args.shading, Path(out))))
+        return
+
+    check_micro_quakes()
+    print(f"{'events':>11} {'mode':>8} {'pixels':>10} {'layers':>7} {'add_s':>7} {'png_s':>7} {'rss_delta_mb':>13}")
+    for n in args.events:
+        for by_year in (False, True):
+            out = Path(args.outdir) / f"quake_raster_{n}{'_by_year' if by_year else ''}.png"
+            cmd = [sys.executable, __file__, "--shading", args.shading, "--child", json.dumps([n, by_year, str(out)])]
+            r = json.loads(subprocess.run(cmd, check=True, capture_output=True, text=True).stdout.strip().splitlines()[-1])
+            mode = "by-year" if by_year else "single"
+            print(f"{n:>11,} {mode:>8} {r['px']:>10} {r['layers']:>7} {r['add_s']:>7.2f} {r['png_s']:>7.2f} "
+                  f"{r['rss_delta_mb']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
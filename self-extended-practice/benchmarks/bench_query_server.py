@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load test: query_server.py on localhost, p50 / p90 / p99 latency and requests per second.
+
+Usage (from repo root):
+    python self-extended-practice/benchmarks/bench_query_server.py
+    python self-extended-practice/benchmarks/bench_query_server.py --requests 20000 --concurrency 64 --distinct 500
+
+The server runs as a subprocess (port 0, the bound port is read from its startup line) with
+the customs cube and the committed GDMS catalog. A seeded set of --distinct URLs mixes the
+trade top / trend / bar_race slices with quake layer / event queries. Each set is run twice:
+
+1. cold : every distinct URL once (all cache misses: the slice is computed and encoded)
+2. warm : --requests requests drawn from that set with Zipf-like popularity
+
+Both phases use --concurrency keep-alive connections. The warm phase is repeated against a
+second server started with --cache-size 0, to show what the LRU saves. Every response must be
+200. The cache hit rate is read from /api/stats.
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+HERE = Path(__file__).resolve().parent
+PROJ = HERE.parent / "semiconductor-tariff-impact-taiwan"
+CATALOG = HERE.parent / "taiwan_earthquake_analysis" / "data" / "earthquakes" / "GDMScatalog.json"
+
+
+def make_urls(n: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    hotspots = [(23.99, 121.60), (23.87, 121.57), (22.99, 120.21), (24.15, 120.68), (25.04, 121.51)]
+    urls = set()
+    while len(urls) < n:
+        kind = rng.choice(["top", "trend", "bar_race", "layer", "events"], p=[0.3, 0.2, 0.05, 0.3, 0.15])
+        if kind in ("top", "trend", "bar_race"):
+            y0 = int(rng.integers(2013, 2024))
+            y1 = int(rng.integers(y0 + 1, 2026))
+            urls.add(f"/api/trade/{kind}?n={int(rng.integers(3, 16))}&year_min={y0}&year_max={y1}"
+                     f"&others={int(rng.random() < 0.3)}")
+        elif kind == "layer":
+            mode = "&mode=binned" if rng.random() < 0.2 else ""
+            urls.add(f"/api/quakes/layer?year={int(rng.integers(2000, 2026))}"
+                     f"&mag_min={rng.choice([0, 2, 3, 3.5, 4, 5])}{mode}")
+        else:
+            lat, lon = hotspots[rng.integers(len(hotspots))]
+            if rng.random() < 0.5:
+                urls.add(f"/api/quakes/events?lat={lat}&lon={lon}&k={int(rng.choice([5, 10, 50]))}")
+            else:
+                y = int(rng.integers(2000, 2025))
+                urls.add(f"/api/quakes/events?start={y}-01-01&end={y + 1}-12-31&lat={lat}&lon={lon}"
+                         f"&radius_km={int(rng.choice([20, 50, 100]))}&mag_min={rng.choice([3, 4])}")
+    return sorted(urls)
+
+
+def start_server(cache_size: int) -> tuple:
+    cmd = [sys.executable, "src/query_server.py", "--port", "0", "--cache-size", str(cache_size),
+           "--quakes", str(CATALOG)]
+    proc = subprocess.Popen(cmd, cwd=PROJ, stdout=subprocess.PIPE, text=True)
+    for line in proc.stdout:
+        m = re.search(r"Serving on http://([\d.]+):(\d+)/", line)
+        if m:
+            return proc, m.group(1), int(m.group(2))
+    raise SystemExit(f"server exited with {proc.wait()} before listening")
+
+
+async def _get(reader, writer, host: str, url: str) -> tuple:
+    writer.write(f"GET {url} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+    status = int(head.split(" ", 2)[1])
+    length = int(re.search(r"(?im)^content-length:\s*(\d+)", head).group(1))
+    return status, await reader.readexactly(length)
+
+
+async def run_load(host: str, port: int, urls: list, concurrency: int) -> tuple:
+    """Send `urls` over `concurrency` keep-alive connections; (latencies in s, wall s, non-200 count)."""
+    queue = iter(enumerate(urls))
+    lat = np.empty(len(urls))
+    bad = 0
+
+    async def worker():
+        nonlocal bad
+        reader, writer = await asyncio.open_connection(host, port)
+        for i, url in queue:
+            t0 = time.perf_counter()
+            status, _ = await _get(reader, writer, host, url)
+            lat[i] = time.perf_counter() - t0
+            bad += status != 200
+        writer.close()
+        await writer.wait_closed()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return lat, time.perf_counter() - t0, bad
+
+
+async def fetch_json(host: str, port: int, url: str) -> dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    _, body = await _get(reader, writer, host, url)
+    writer.close()
+    return json.loads(body)
+
+
+def report(label: str, lat: np.ndarray, wall: float, bad: int, hit_rate=None) -> None:
+    p50, p90, p99 = np.percentile(lat * 1e3, [50, 90, 99])
+    hits = f"{hit_rate:>8.1%}" if hit_rate is not None else f"{'-':>8}"
+    print(f"{label:<18}{len(lat):>9,}{p50:>9.2f}{p90:>9.2f}{p99:>9.2f}{len(lat) / wall:>11,.0f}{hits}{bad:>7}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="query_server.py load test (localhost)")
+    ap.add_argument("--requests", type=int, default=10_000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--distinct", type=int, default=300, help="Distinct query URLs in the workload")
+    ap.add_argument("--zipf", type=float, default=1.1, help="Popularity skew of the warm phase")
+    ap.add_argument("--cache-size", type=int, default=512)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    urls = make_urls(args.distinct, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    weights = 1.0 / np.arange(1, len(urls) + 1) ** args.zipf
+    warm = [urls[i] for i in rng.choice(len(urls), args.requests, p=weights / weights.sum())]
+
+    print(f"{len(urls)} distinct URLs, {args.requests:,} warm requests, {args.concurrency} connections\n")
+    print(f"{'phase':<18}{'requests':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'req/s':>11}{'hits':>8}{'non200':>7}")
+    failed = 0
+    for cache_size in (args.cache_size, 0):
+        proc, host, port = start_server(cache_size)
+        try:
+            tag = f"LRU {cache_size}" if cache_size else "no cache"
+            if cache_size:
+                lat, wall, bad = asyncio.run(run_load(host, port, list(urls), args.concurrency))
+                report(f"cold ({tag})", lat, wall, bad, 0.0)
+                failed += bad
+            before = asyncio.run(fetch_json(host, port, "/api/stats"))["cache"]
+            lat, wall, bad = asyncio.run(run_load(host, port, warm, args.concurrency))
+            after = asyncio.run(fetch_json(host, port, "/api/stats"))["cache"]
+            lookups = (after["hits"] - before["hits"]) + (after["misses"] - before["misses"])
+            report(f"warm ({tag})", lat, wall, bad, (after["hits"] - before["hits"]) / max(lookups, 1))
+            failed += bad
+        finally:
+            proc.terminate()
+            proc.wait()
+    if failed:
+        raise SystemExit(f"{failed} responses were not 200")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite: wall time and peak memory of every src/ entry point at several
+input sizes, saved as JSON so runs can be compared.
+
+Usage (from repo root):
+    python self-extended-practice/benchmarks/bench_suite.py --sizes small medium --out bench.json
+    python self-extended-practice/benchmarks/bench_suite.py --stages gdms_loader quake_map --sizes large
+    python self-extended-practice/benchmarks/bench_suite.py --sizes small --compare bench.json --tolerance 0.25
+
+Inputs are generated by synth.py from --seed, once per (generator, size), into
+--data-dir (a temp dir unless given, so generated inputs can be kept between runs).
+Each (stage, size) runs in a fresh interpreter. Setup that is not the stage itself
+is not timed: imports, and building the Top 10 frame that the plot stages take.
+That interpreter reports:
+- seconds_median / seconds_min over --repeat calls
+- peak_rss_mb  : RSS high-water mark during the timed calls (VmHWM, reset after setup
+                 via /proc/self/clear_refs; elsewhere ru_maxrss for the whole process)
+- rss_delta_mb : peak_rss_mb minus RSS after imports and setup (what the stage itself added)
+
+--compare BASELINE exits non-zero when a (stage, size) present in both runs has
+seconds_median above baseline * (1 + --tolerance), or rss_delta_mb above
+baseline * (1 + --mem-tolerance) + 16 MB.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+HERE = Path(__file__).resolve().parent
+SEMI = HERE.parent / "semiconductor-tariff-impact-taiwan"
+QUAKE = HERE.parent / "taiwan_earthquake_analysis"
+MAPPING_JSON = SEMI / "data" / "mappings" / "country_name_map_full.json"
+MEM_SLACK_MB = 16.0
+
+import synth  # noqa: E402
+
+# -------------------------
+# Inputs: generator -> size -> params
+# -------------------------
+
+INPUTS: Dict[str, Dict[str, dict]] = {
+    # N-country x M-year x K-HS-code customs rows
+    "customs": {
+        "small": {"n_countries": 60, "n_years": 13, "n_hs": 20},
+        "medium": {"n_countries": 199, "n_years": 13, "n_hs": 200},
+        "large": {"n_countries": 240, "n_years": 20, "n_hs": 500},
+    },
+    "comtrade": {
+        "small": {"n_rows": 50_000},
+        "medium": {"n_rows": 500_000},
+        "large": {"n_rows": 3_000_000},
+    },
+    "gdms": {
+        "small": {"n_events": 100_000},
+        "medium": {"n_events": 1_000_000},
+        "large": {"n_events": 5_000_000},
+    },
+    "cwa": {
+        "small": {"n_events": 20_000},
+        "medium": {"n_events": 200_000},
+        "large": {"n_events": 1_000_000},
+    },
+}
+
+
+def input_path(data_dir: Path, kind: str, size: str, seed: int) -> Path:
+    """Generate (once) and return the input file for a generator at a size."""
+    params = INPUTS[kind][size]
+    tag = "_".join(f"{v}" for v in params.values())
+    ext = ".json" if kind in ("gdms", "cwa") else ".csv"
+    path = Path(data_dir) / f"{kind}_{tag}_s{seed}{ext}"
+    if path.exists():
+        return path
+    tmp = path.with_name(path.name + ".tmp")
+    t0 = time.perf_counter()
+    if kind == "customs":
+        synth.write_customs_csv(tmp, seed=seed, mapping_json=MAPPING_JSON, **params)
+    elif kind == "comtrade":
+        synth.write_comtrade_extract(tmp, seed=seed, **params)
+    elif kind == "gdms":
+        synth.write_gdms_catalog(tmp, seed=seed, **params)
+    else:
+        synth.write_cwa_catalog(tmp, seed=seed, **params)
+    tmp.replace(path)
+    print(f"  [gen] {path.name} ({path.stat().st_size / 1e6:.1f} MB, {time.perf_counter() - t0:.1f}s)", flush=True)
+    return path
+
+
+# -------------------------
+# Stages (run inside the child interpreter)
+# -------------------------
+# Each setup function takes (input path, work dir) and returns a zero-argument
+# callable: the timed call. Imports happen in setup.
+
+def _top10_frame(path: Path, work: Path):
+    from plot_exports import prepare_top10_tables
+
+    years = _customs_years(path)
+    return prepare_top10_tables(path, MAPPING_JSON, years[0], years[1], False, work)
+
+
+def _customs_years(path: Path):
+    """Year range of a generated customs file: customs_<countries>_<years>_<hs codes>_s<seed>.csv."""
+    first = 2013
+    n_years = int(path.stem.split("_")[2])
+    return first, first + n_years - 1
+
+
+def setup_prepare_top10(path: Path, work: Path) -> Callable[[], object]:
+    from plot_exports import prepare_top10_tables
+
+    y0, y1 = _customs_years(path)
+    return lambda: prepare_top10_tables(path, MAPPING_JSON, y0, y1, False, work)
+
+
+def setup_static_lines(path: Path, work: Path) -> Callable[[], object]:
+    from plot_exports import plot_static_lines
+
+    df = _top10_frame(path, work)
+    return lambda: plot_static_lines(df, work / "top10.png")
+
+
+def setup_bar_race(path: Path, work: Path) -> Callable[[], object]:
+    from plot_exports import plot_interactive_bar_race
+
+    df = _top10_frame(path, work)
+    return lambda: plot_interactive_bar_race(df, work / "bar_race.html")
+
+
+def setup_clean_uncomtrade(path: Path, work: Path) -> Callable[[], object]:
+    from clean_uncomtrade_exports import clean_uncomtrade_exports
+
+    return lambda: clean_uncomtrade_exports(path, work / "clean.csv")
+
+
+def setup_gdms_loader(path: Path, work: Path) -> Callable[[], object]:
+    from quake_sources import _load_quakes_from_gdms
+
+    return lambda: _load_quakes_from_gdms(path)
+
+
+def setup_cwa_loader(path: Path, work: Path) -> Callable[[], object]:
+    from quake_sources import _load_quakes_from_cwa
+
+    return lambda: _load_quakes_from_cwa(path)
+
+
+def setup_quake_map(path: Path, work: Path) -> Callable[[], object]:
+    from make_map_by_year import make_interactive_map
+
+    return lambda: make_interactive_map(str(path), outfile=str(work / "index.html"), use_cache=False)
+
+
+def setup_quake_raster(path: Path, work: Path) -> Callable[[], object]:
+    import matplotlib.image  # noqa: F401  (import is not part of the stage)
+    from quake_raster import QuakeRaster
+    from quake_sources import _load_quakes_from_gdms
+
+    df = _load_quakes_from_gdms(path)
+    return lambda: QuakeRaster().add(df).save(work / "density.png")
+
+
+STAGES: Dict[str, dict] = {
+    "prepare_top10_tables": {"input": "customs", "setup": setup_prepare_top10},
+    "plot_static_lines": {"input": "customs", "setup": setup_static_lines},
+    "plot_interactive_bar_race": {"input": "customs", "setup": setup_bar_race},
+    "clean_uncomtrade_exports": {"input": "comtrade", "setup": setup_clean_uncomtrade},
+    "gdms_loader": {"input": "gdms", "setup": setup_gdms_loader},
+    "cwa_loader": {"input": "cwa", "setup": setup_cwa_loader},
+    "quake_map": {"input": "gdms", "setup": setup_quake_map},
+    "quake_raster": {"input": "gdms", "setup": setup_quake_raster},
+}
+
+
+def child(stage: str, path: Path, repeat: int) -> dict:
+    sys.path[:0] = [str(SEMI / "src"), str(QUAKE / "src"), str(HERE.parent / "common")]
+    import contextlib
+    import io
+
+    from stage_trace import peak_rss_mb, reset_peak, status_mb
+
+    with tempfile.TemporaryDirectory() as work:
+        quiet = io.StringIO()
+        with contextlib.redirect_stdout(quiet):
+            run = STAGES[stage]["setup"](path, Path(work))
+            reset_peak()
+            base = status_mb("VmRSS") or peak_rss_mb()
+            times = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                run()
+                times.append(time.perf_counter() - t0)
+    times.sort()
+    peak = peak_rss_mb()
+    return {
+        "seconds_median": times[len(times) // 2],
+        "seconds_min": times[0],
+        "peak_rss_mb": round(peak, 1),
+        "rss_delta_mb": round(max(peak - base, 0.0), 1),
+    }
+
+
+# -------------------------
+# Driver / comparison
+# -------------------------
+
+def measure(stage: str, size: str, data_dir: Path, seed: int, repeat: int) -> dict:
+    kind = STAGES[stage]["input"]
+    path = input_path(data_dir, kind, size, seed)
+    out = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--child", stage, str(path), "--repeat", str(repeat)],
+        capture_output=True, text=True,
+    )
+    row = {"stage": stage, "size": size, "input": kind, "params": INPUTS[kind][size],
+           "input_mb": round(path.stat().st_size / 1e6, 2)}
+    if out.returncode != 0:
+        row["error"] = (out.stderr.strip().splitlines() or ["failed"])[-1]
+        return row
+    row.update(json.loads(out.stdout.strip().splitlines()[-1]))
+    return row
+
+
+def _meta(seed: int, repeat: int) -> dict:
+    import numpy
+    import pandas
+
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                             text=True).stdout.strip() or None
+    except OSError:
+        rev = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": rev,
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "repeat": repeat,
+    }
+
+
+def compare(results: List[dict], baseline: dict, tolerance: float, mem_tolerance: float) -> List[str]:
+    """Regression messages for (stage, size) pairs present in both runs."""
+    base = {(r["stage"], r["size"]): r for r in baseline["results"] if "error" not in r}
+    failures = []
+    print(f"\n{'stage':<28}{'size':<8}{'base_s':>9}{'now_s':>9}{'ratio':>7}{'base_MB':>9}{'now_MB':>9}")
+    for r in results:
+        b = base.get((r["stage"], r["size"]))
+        if b is None or "error" in r:
+            continue
+        ratio = r["seconds_median"] / max(b["seconds_median"], 1e-9)
+        flag = ""
+        if ratio > 1 + tolerance:
+            failures.append(f"{r['stage']}/{r['size']}: {ratio:.2f}x slower (tolerance {tolerance:.0%})")
+            flag = "  TIME"
+        if r["rss_delta_mb"] > b["rss_delta_mb"] * (1 + mem_tolerance) + MEM_SLACK_MB:
+            failures.append(f"{r['stage']}/{r['size']}: {r['rss_delta_mb']:.0f} MB vs {b['rss_delta_mb']:.0f} MB")
+            flag += "  MEM"
+        print(f"{r['stage']:<28}{r['size']:<8}{b['seconds_median']:>9.3f}{r['seconds_median']:>9.3f}"
+              f"{ratio:>7.2f}{b['rss_delta_mb']:>9.0f}{r['rss_delta_mb']:>9.0f}{flag}")
+    return failures
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Time + memory benchmark for every src/ entry point")
+    ap.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    ap.add_argument("--sizes", nargs="+", choices=["small", "medium", "large"], default=["small", "medium"])
+    ap.add_argument("--repeat", type=int, default=3, help="Timed calls per (stage, size); the median is kept")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--data-dir", type=str, default=None, help="Keep generated inputs here (default: temp dir)")
+    ap.add_argument("--out", type=str, default=None, help="Write results JSON here")
+    ap.add_argument("--compare", type=str, default=None, help="Baseline results JSON")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = +25%%)")
+    ap.add_argument("--mem-tolerance", type=float, default=0.25, help="Allowed rss_delta_mb growth vs baseline")
+    ap.add_argument("--child", nargs=2, metavar=("STAGE", "INPUT"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child[0], Path(args.child[1]), args.repeat)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(args.data_dir or tmp)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        results = []
+        print(f"{'stage':<28}{'size':<8}{'input_MB':>9}{'median_s':>10}{'min_s':>8}{'peak_MB':>9}{'delta_MB':>9}")
+        for size in args.sizes:
+            for stage in args.stages:
+                r = measure(stage, size, data_dir, args.seed, args.repeat)
+                results.append(r)
+                if "error" in r:
+                    print(f"{stage:<28}{size:<8}{r['input_mb']:>9.1f}  ERROR: {r['error']}")
+                else:
+                    print(f"{stage:<28}{size:<8}{r['input_mb']:>9.1f}{r['seconds_median']:>10.3f}"
+                          f"{r['seconds_min']:>8.3f}{r['peak_rss_mb']:>9.0f}{r['rss_delta_mb']:>9.0f}", flush=True)
+
+    run = {"meta": _meta(args.seed, args.repeat), "results": results}
+    if args.out:
+        Path(args.out).write_text(json.dumps(run, indent=2), encoding="utf-8")
+        print(f"\nSaved -> {args.out}")
+
+    failures = [f"{r['stage']}/{r['size']}: {r['error']}" for r in results if "error" in r]
+    if args.compare:
+        failures += compare(results, json.loads(Path(args.compare).read_text(encoding="utf-8")),
+                            args.tolerance, args.mem_tolerance)
+    if failures:
+        print("\nFAIL:\n  " + "\n  ".join(failures))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Check + benchmark: trade_cube queries vs the pandas groupby code they replace.
+
+Usage (from repo root):
+    python self-extended-practice/benchmarks/bench_trade_cube.py
+    python self-extended-practice/benchmarks/bench_trade_cube.py --countries 400 --hs 800 --repeat 200
+
+1. Real data: TradeCube answers are compared with the committed outputs:
+   - top_n(10)                -> data/processed/top10_export_markets_avg_2013_2025.csv values
+   - event_window(year, 2, 2) -> data/processed/event_impact_summary.csv (per-market rows)
+   - cagr(2013, 2024)         -> output/regression/cagr_summary_2013_2024.csv
+2. Timing on a synthetic customs file (synth.write_customs_csv): cube build once, then the
+   median of --repeat calls of each query against the same query done with pandas groupby on
+   the tidy frame (what plot_exports / the notebooks do per question).
+"""
+
+from __future__ import annotations
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+HERE = Path(__file__).resolve().parent
+PROJ = HERE.parent / "semiconductor-tariff-impact-taiwan"
+sys.path.insert(0, str(PROJ / "src"))
+sys.path.insert(0, str(HERE))
+
+import trade_cube as tc  # noqa: E402
+from plot_exports import english_names, load_country_map, read_exports  # noqa: E402
+from synth import write_customs_csv  # noqa: E402
+
+MAPPING = PROJ / "data" / "mappings" / "country_name_map_full.json"
+RAW = PROJ / "data" / "raw" / "taiwan_exports_by_country_2013_2025.csv"
+CAGR_NAMES = {"Korea": "Rep. of Korea"}
+
+
+def _report(name: str, diff: float, tol: float) -> bool:
+    ok = diff <= tol
+    print(f"{name:<46} max rel diff = {diff:.2e}  [{'OK' if ok else 'FAIL'}]")
+    return ok
+
+
+def _rel(a, b) -> float:
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    if not np.array_equal(np.isnan(a), np.isnan(b)):
+        return np.inf
+    m = ~np.isnan(a)
+    return float(np.max(np.abs(a[m] - b[m]) / np.maximum(np.abs(b[m]), 1e-300), initial=0.0))
+
+
+def check_real(tol: float) -> bool:
+    cube = tc.customs_cube(RAW, MAPPING)
+    ok = True
+
+    _, avg = cube.top_n(10)
+    ref = pd.read_csv(PROJ / "data" / "processed" / "top10_export_markets_avg_2013_2025.csv", encoding="utf-8-sig")
+    ok &= _report("top_n(10) vs top10_export_markets_avg", _rel(avg, ref.iloc[:, 1]), tol)
+
+    ev = pd.read_csv(PROJ / "data" / "processed" / "event_impact_summary.csv", encoding="utf-8-sig")
+    ev = ev[~ev["Market"].str.startswith("TOTAL")].drop_duplicates(["EventYear", "Market"])
+    cols = {"pre_avg": "PreAvg_USD", "post_avg": "PostAvg_USD", "delta": "Delta_USD",
+            "pre_share": "PreAvg_Share", "post_share": "PostAvg_Share", "delta_share": "Delta_Share"}
+    worst = 0.0
+    for year, g in ev.groupby("EventYear"):
+        res = cube.event_window(int(year), pre=2, post=2)
+        pos = [list(res["labels"]).index(m) for m in g["Market"]]
+        for k, c in cols.items():
+            worst = max(worst, _rel(res[k][pos], g[c]))
+    ok &= _report("event_window(2, 2) vs event_impact_summary", worst, tol)
+
+    comp = tc.comparison_cube(PROJ / "data" / "processed" / "ic_exports_comparison_panel.csv")
+    labels, _, _, rate = comp.cagr(2013, 2024)
+    ref = pd.read_csv(PROJ / "output" / "regression" / "cagr_summary_2013_2024.csv")
+    got = pd.Series(rate * 100, index=labels)[[CAGR_NAMES.get(c, c) for c in ref["Country"]]]
+    ok &= _report("cagr(2013, 2024) vs cagr_summary_2013_2024", _rel(got, ref["CAGR(%)"]), tol)
+    return ok
+
+
+# -------------------------
+# pandas reference queries
+# -------------------------
+
+def pd_top_n(df: pd.DataFrame, n: int = 10) -> pd.Series:
+    yc = df.groupby(["Year", "Country_EN"])["Export Value (USD)"].sum()
+    avg = yc.groupby(level="Country_EN").mean()
+    return avg[avg.index.str.lower() != "others"].nlargest(n)
+
+
+def pd_share(df: pd.DataFrame, hs4: str) -> pd.DataFrame:
+    sub = df[df["HS Code"].str[:4] == hs4]
+    yc = sub.groupby(["Year", "Country_EN"])["Export Value (USD)"].sum().unstack(fill_value=0.0)
+    return yc.div(yc.sum(axis=1), axis=0)
+
+
+def pd_cagr(df: pd.DataFrame, start: int, end: int) -> pd.Series:
+    yc = df.groupby(["Year", "Country_EN"])["Export Value (USD)"].sum().unstack(fill_value=0.0)
+    return (yc.loc[end] / yc.loc[start]) ** (1.0 / (end - start)) - 1.0
+
+
+def pd_event(df: pd.DataFrame, year: int, pre: int = 2, post: int = 2) -> pd.DataFrame:
+    yc = df.groupby(["Year", "Country_EN"])["Export Value (USD)"].sum().unstack(fill_value=0.0)
+    share = yc.div(yc.sum(axis=1), axis=0)
+    before, after = yc.index.to_series().between(year - pre, year - 1), yc.index.to_series().between(year + 1, year + post)
+    out = pd.DataFrame({"pre_avg": yc[before].mean(), "post_avg": yc[after].mean(),
+                        "pre_share": share[before].mean(), "post_share": share[after].mean()})
+    return out.assign(delta=out["post_avg"] - out["pre_avg"], delta_share=out["post_share"] - out["pre_share"])
+
+
+def _median_us(fn, repeat: int) -> float:
+    fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1e6
+
+
+def bench(countries: int, years: int, n_hs: int, repeat: int, pd_repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = write_customs_csv(Path(tmp) / "customs.csv", countries, years, n_hs, seed=0, mapping_json=MAPPING)
+        t0 = time.perf_counter()
+        cube = tc.customs_cube(raw, MAPPING, year_max=2013 + years)
+        build = time.perf_counter() - t0
+        df = read_exports(raw, year_min=2013, year_max=2013 + years, hs_prefix="8542")
+        df["Country_EN"] = english_names(df["Country"], load_country_map(MAPPING))
+
+    end = 2013 + years - 1
+    mid = 2013 + years // 2
+    print(f"\nsynthetic customs: {len(df):,} rows ({countries} countries x {years} years x {n_hs} HS codes); "
+          f"cube build {build:.2f}s incl. CSV read, {cube.values.nbytes / 1e6:.1f} MB base array")
+
+    queries = [
+        ("top_n(10)", lambda: cube.top_n(10), lambda: pd_top_n(df)),
+        ("share(hs4=8542)", lambda: cube.share(hs4="8542"), lambda: pd_share(df, "8542")),
+        (f"cagr(2013, {end}, by=partner)", lambda: cube.cagr(2013, end, by="partner"),
+         lambda: pd_cagr(df, 2013, end)),
+        (f"event_window({mid})", lambda: cube.event_window(mid), lambda: pd_event(df, mid)),
+    ]
+    print(f"{'query':<34}{'cube (us)':>12}{'pandas (us)':>14}{'speedup':>10}")
+    for name, cube_fn, pd_fn in queries:
+        c_us, p_us = _median_us(cube_fn, repeat), _median_us(pd_fn, pd_repeat)
+        print(f"{name:<34}{c_us:>12.1f}{p_us:>14.1f}{p_us / c_us:>9.0f}x")
+
+    # answers agree with the pandas versions
+    labels, avg = cube.top_n(10)
+    ref = pd_top_n(df)
+    assert list(labels) == list(ref.index) and _rel(avg, ref.to_numpy()) < 1e-9
+
+
+def main():
+    ap = argparse.ArgumentParser(description="trade_cube parity and query latency")
+    ap.add_argument("--countries", type=int, default=300)
+    ap.add_argument("--years", type=int, default=13)
+    ap.add_argument("--hs", type=int, default=200)
+    ap.add_argument("--repeat", type=int, default=500, help="Timed cube calls per query")
+    ap.add_argument("--pd-repeat", type=int, default=10, help="Timed pandas calls per query")
+    ap.add_argument("--tol", type=float, default=1e-9)
+    args = ap.parse_args()
+
+    if not check_real(args.tol):
+        raise SystemExit(1)
+    bench(args.countries, args.years, args.hs, args.repeat, args.pd_repeat)
+
+
+if __name__ == "__main__":
+    main()
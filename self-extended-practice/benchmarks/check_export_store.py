@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Check: export_store incremental updates vs a full pandas aggregation of the same CSV.
+
+Usage (from repo root):
+    python self-extended-practice/benchmarks/check_export_store.py
+
+Each scenario runs in a fresh temporary store on a synth.write_customs_csv extract. After
+every update_store call, check_consistency must hold (store == aggregate_year_country of
+the whole file), except while a partial row is deliberately held back:
+
+1. no trailing newline : the last row is ingested on the first (rebuild) run
+2. partial append      : a row without newline is held back while the file grows, then
+                         ingested on the next run with the file size unchanged
+3. row extended        : bytes appended to an EOF-terminated row force a rebuild
+4. malformed number    : an unparsable Export Value is coerced to NaN (row dropped), not fatal
+5. same file name      : two extracts named x.csv in different directories keep separate entries;
+                         the store equals the sum of both full aggregations
+6. mapping change      : a new country mapping re-maps the stored rows (nothing re-read, no
+                         source dropped) and still equals the full aggregations under the new mapping
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent / "semiconductor-tariff-impact-taiwan" / "src"))
+sys.path.insert(0, str(HERE))
+
+from export_store import check_consistency, update_store, year_country_from_store  # noqa: E402
+from plot_exports import aggregate_year_country  # noqa: E402
+from synth import write_customs_csv  # noqa: E402
+
+ROW = "2025,美國,85423100000, Electronic integrated circuits,{:.2f}"
+
+
+def _append(path: Path, text: str) -> None:
+    with path.open("a", encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+def _strip_newline(path: Path) -> None:
+    data = path.read_bytes()
+    path.write_bytes(data.rstrip(b"\n"))
+
+
+def run(name: str, steps, work: Path, mapping: Path, raw: Path) -> bool:
+    store = work / f"store_{name}"
+    ok = True
+    for i, (expect_mode, mutate, *held) in enumerate(steps, 1):
+        mutate()
+        stats = update_store(raw, mapping, store)
+        try:
+            rel = check_consistency(raw, mapping, store)
+            err = ""
+        except AssertionError as e:
+            rel, err = float("nan"), str(e).splitlines()[0]
+        if held:  # the store must NOT contain the half-written row yet
+            err = "" if err else "partial row was ingested"
+        good = not err and stats["mode"] == expect_mode
+        ok &= good
+        print(f"  {name:<20} step {i}: {stats['mode']:<8} +{stats['delta_rows']:<6} "
+              f"max rel diff {rel:.1e}  [{'OK' if good else 'FAIL'}] {err}")
+    return ok
+
+
+def multi_source(work: Path, mapping: Path, n_countries: int, n_hs: int) -> bool:
+    """Scenarios 5 and 6: one store fed by a/x.csv and b/x.csv, then a changed mapping."""
+    store = work / "store_multi"
+    raws = []
+    for i, d in enumerate("ab"):
+        (work / d).mkdir()
+        raws.append(write_customs_csv(work / d / "x.csv", n_countries, 13, n_hs, seed=10 + i))
+
+    def compare(name: str, mp: Path, stats: list) -> bool:
+        full = pd.concat([aggregate_year_country(r, mp) for r in raws])
+        full = full.groupby(["Year", "Country_EN"])["Export_USD"].sum()
+        inc = year_country_from_store(store).set_index(["Year", "Country_EN"])["Export_USD"]
+        good = full.index.sort_values().equals(inc.index.sort_values())
+        rel = float(np.max(np.abs(full - inc.reindex(full.index)) / np.maximum(full.abs(), 1.0))) if good else np.nan
+        good = good and rel <= 1e-9
+        print(f"  {name:<20} {' / '.join(s['mode'] for s in stats):<16} "
+              f"+{sum(s['delta_rows'] for s in stats):<6} max rel diff {rel:.1e}  [{'OK' if good else 'FAIL'}]")
+        return good
+
+    ok = compare("same file name", mapping, [update_store(r, mapping, store) for r in raws])
+    new_map = work / "map2.json"
+    new_map.write_text(json.dumps({"美國": "United States", "國家0000": "Somewhere", "國家0001": "Elsewhere"},
+                                  ensure_ascii=False), encoding="utf-8")
+    stats = [update_store(r, new_map, store) for r in raws]
+    ok &= compare("mapping change", new_map, stats) and all(s["delta_rows"] == 0 for s in stats)
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description="export_store incremental update checks")
+    ap.add_argument("--countries", type=int, default=40)
+    ap.add_argument("--hs", type=int, default=5)
+    args = ap.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        mapping = work / "map.json"
+        mapping.write_text(json.dumps({"美國": "United States"}, ensure_ascii=False), encoding="utf-8")
+
+        def fresh(name: str) -> Path:
+            raw = work / f"{name}.csv"
+            write_customs_csv(raw, args.countries, 13, args.hs, seed=0)
+            return raw
+
+        raw = fresh("no_newline")
+        ok &= run("no trailing newline", [
+            ("rebuild", lambda: _strip_newline(raw)),
+            ("noop", lambda: None),
+        ], work, mapping, raw)
+
+        raw2 = fresh("partial")
+        ok &= run("partial append", [
+            ("rebuild", lambda: None),
+            ("append", lambda: _append(raw2, ROW.format(1.5e9)), "held"),   # file grew
+            ("append", lambda: None),                                       # unchanged size: ingested
+            ("noop", lambda: None),
+        ], work, mapping, raw2)
+
+        raw3 = fresh("extended")
+        ok &= run("row extended", [
+            ("rebuild", lambda: _strip_newline(raw3)),
+            ("rebuild", lambda: _append(raw3, "7\n")),                      # last value gained a digit
+            ("append", lambda: _append(raw3, ROW.format(2.5e9) + "\n")),
+        ], work, mapping, raw3)
+
+        raw4 = fresh("malformed")
+        ok &= run("malformed number", [
+            ("rebuild", lambda: None),
+            ("append", lambda: _append(raw4, ROW.format(3.5e9).rsplit(",", 1)[0] + ",12x4.00\n"
+                                             + ROW.format(4.5e9) + "\n")),
+        ], work, mapping, raw4)
+
+        ok &= multi_source(work, mapping, args.countries, args.hs)
+
+    if not ok:
+        raise SystemExit(1)
+    print("All export_store checks passed ✅")
+
+
+if __name__ == "__main__":
+    main()
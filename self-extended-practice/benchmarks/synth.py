@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Seeded synthetic input generators for the benchmarks.
+
+All writers stream to disk in blocks so multi-million-row inputs can be
+generated without holding them in memory.
+
+- write_gdms_catalog      : GDMS {"header", "footer", "body"} quake catalog
+- write_cwa_catalog       : CWA E-A0073 quake catalog (cwaopendata ... EarthquakeInfo)
+- quake_frame             : normalized quake frame (time/lat/lon/depth/mag/year) built in memory
+- write_customs_csv       : Taiwan customs by-country extract, N countries x M years x K HS codes
+- write_comtrade_extract  : UN Comtrade API extract (monthly rows, trailing comma per row)
+"""
+
+from __future__ import annotations
+import json
+from pathlib import Path
+
+import numpy as np
+
+BLOCK_ROWS = 100_000
+
+
+def _quake_block(rng: np.random.Generator, n: int, start: str = "2000-01-01", years: int = 26):
+    """Random quake attributes for one block; times are sorted within the block."""
+    t0 = np.datetime64(f"{start}T00:00:00")
+    secs = np.sort(rng.integers(0, years * 365 * 86400, n))
+    ts = (t0 + secs.astype("timedelta64[s]")).astype(str)
+    # ~2% of events fall outside the Taiwan bbox so the filters have work to do
+    lat = rng.uniform(19.5, 27.2, n)
+    lon = rng.uniform(117.5, 124.5, n)
+    depth = rng.gamma(2.0, 15.0, n)
+    mag = rng.uniform(2.0, 6.5, n)
+    return ts, lat, lon, depth, mag
+
+
+def write_gdms_catalog(path: Path, n_events: int, seed: int = 0) -> Path:
+    """Write a GDMS-style catalog ({"header", "footer", "body"}) with n_events rows."""
+    rng = np.random.default_rng(seed)
+    header = ["date", "time", "lat", "lon", "depth", "ML", "nstn", "quality"]
+    path = Path(path)
+    with path.open("w", encoding="utf-8") as f:
+        f.write('{"header":' + json.dumps(header) + ',"footer":null,"body":[')
+        written = 0
+        while written < n_events:
+            n = min(BLOCK_ROWS, n_events - written)
+            ts, lat, lon, depth, mag = _quake_block(rng, n)
+            rows = ",".join(
+                f'["{t[:10]}","{t[11:19]}.{i % 100:02d}","{a:.4f}","{o:.4f}","{d:.2f}","{m:.2f}",{i % 90},"B"]'
+                for i, (t, a, o, d, m) in enumerate(zip(ts, lat, lon, depth, mag))
+            )
+            f.write(("," if written else "") + rows)
+            written += n
+        f.write("]}")
+    return path
+
+
+def write_cwa_catalog(path: Path, n_events: int, seed: int = 0) -> Path:
+    """Write a CWA E-A0073-style catalog (cwaopendata.Dataset.Catalog.EarthquakeInfo) with n_events rows."""
+    rng = np.random.default_rng(seed)
+    path = Path(path)
+    with path.open("w", encoding="utf-8") as f:
+        f.write('{"cwaopendata":{"dataid":"E-A0073-001","Dataset":{"Catalog":{"EarthquakeInfo":[')
+        written = 0
+        while written < n_events:
+            n = min(BLOCK_ROWS, n_events - written)
+            ts, lat, lon, depth, mag = _quake_block(rng, n)
+            rows = ",".join(
+                f'{{"OriginTime":"{t}+08:00","EpicenterLongitude":"{o:.3f}","EpicenterLatitude":"{a:.3f}",'
+                f'"FocalDepth":"{d:.1f}","LocalMagnitude":"{m:.1f}","StationNumber":"{i % 90}"}}'
+                for i, (t, a, o, d, m) in enumerate(zip(ts, lat, lon, depth, mag))
+            )
+            f.write(("," if written else "") + rows)
+            written += n
+        f.write("]}}}}")
+    return path
+
+
+# Seismic hotspots (lat, lon) for quake_frame: Hualien, Yilan offshore, Chiayi, Pingtung offshore
+QUAKE_HOTSPOTS = np.array([[23.99, 121.60], [24.60, 122.10], [23.45, 120.50], [22.30, 120.90]])
+
+
+def quake_frame(n_events: int, seed: int = 0, start: str = "2000-01-01", years: int = 26, clustered: float = 0.6):
+    """
+    Normalized quake frame (quake_sources.QUAKE_DTYPES, sorted by time, inside TAIWAN_BBOX) built in
+    memory: multi-million-row catalogs without the JSON round trip. `clustered` of the events sit
+    around QUAKE_HOTSPOTS (sigma ~0.25 deg), the rest are uniform over the bbox.
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    t0 = np.datetime64(f"{start}T00:00:00", "ns")
+    secs = np.sort(rng.integers(0, years * 365 * 86400, n_events))
+    near = rng.random(n_events) < clustered
+    spot = QUAKE_HOTSPOTS[rng.integers(0, len(QUAKE_HOTSPOTS), n_events)]
+    lat = np.where(near, spot[:, 0] + rng.normal(0, 0.25, n_events), rng.uniform(20.0, 27.0, n_events))
+    lon = np.where(near, spot[:, 1] + rng.normal(0, 0.25, n_events), rng.uniform(118.0, 124.0, n_events))
+    lat, lon = np.clip(lat, 20.0, 27.0), np.clip(lon, 118.0, 124.0)
+    time = t0 + (secs * 1_000_000_000).astype("timedelta64[ns]")
+    return pd.DataFrame({
+        "time": time,
+        "lat": lat,
+        "lon": lon,
+        "depth": rng.gamma(2.0, 15.0, n_events).astype("float32"),
+        "mag": (2.0 + rng.exponential(0.7, n_events)).astype("float32"),
+        "year": time.astype("datetime64[Y]").astype(np.int64).astype("int16") + 1970,
+    })
+
+
+# Taiwan customs by-country extract (data/raw/taiwan_exports_by_country_2013_2025.csv)
+CUSTOMS_HEADER = ["Year", "Country", "HS Code", "Description", "Export Value (USD)"]
+
+
+def write_customs_csv(path: Path, n_countries: int, n_years: int, n_hs: int, seed: int = 0,
+                      mapping_json: Path | None = None, first_year: int = 2013) -> Path:
+    """
+    Customs rows for every (year, country, HS code): n_years x n_countries x n_hs rows.
+    Country names come from the CN->EN mapping when given (so the EN mapping is exercised),
+    then synthetic unmapped names ("Others" after mapping). Export values are log-normal
+    with a per-country scale, so a stable Top 10 exists.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(json.loads(Path(mapping_json).read_text(encoding="utf-8"))) if mapping_json else []
+    countries = (names + [f"國家{i:04d}" for i in range(max(0, n_countries - len(names)))])[:n_countries]
+    hs = [f"8542{3100 + (i % 900):04d}{i // 900:03d}" for i in range(n_hs)]
+    scale = rng.lognormal(16, 2, n_countries)
+
+    path = Path(path)
+    with path.open("w", encoding="utf-8-sig", newline="") as f:
+        f.write(",".join(CUSTOMS_HEADER) + "\n")
+        per_year = n_countries * n_hs
+        ci = np.repeat(np.arange(n_countries), n_hs)
+        hi = np.tile(np.arange(n_hs), n_countries)
+        for y in range(n_years):
+            for start in range(0, per_year, BLOCK_ROWS):
+                c, h = ci[start:start + BLOCK_ROWS], hi[start:start + BLOCK_ROWS]
+                v = scale[c] * rng.lognormal(0, 0.5, len(c))
+                f.write("".join(
+                    f"{first_year + y},{countries[a]},{hs[b]}, Electronic integrated circuits,{val:.2f}\n"
+                    for a, b, val in zip(c, h, v)
+                ))
+    return path
+
+
+# UN Comtrade API extract (data/raw/ic_exports_*_uncomtrade*.csv): every row ends with a trailing comma
+COMTRADE_HEADER = (
+    "typeCode,freqCode,refPeriodId,refYear,refMonth,period,reporterCode,reporterISO,reporterDesc,flowCode,"
+    "flowDesc,partnerCode,partnerISO,partnerDesc,partner2Code,partner2ISO,partner2Desc,classificationCode,"
+    "classificationSearchCode,isOriginalClassification,cmdCode,cmdDesc,aggrLevel,isLeaf,customsCode,customsDesc,"
+    "mosCode,motCode,motDesc,qtyUnitCode,qtyUnitAbbr,qty,isQtyEstimated,altQtyUnitCode,altQtyUnitAbbr,altQty,"
+    "isAltQtyEstimated,netWgt,isNetWgtEstimated,grossWgt,isGrossWgtEstimated,cifvalue,fobvalue,primaryValue,"
+    "legacyEstimationFlag,isReported,isAggregate"
+)
+
+
+def write_comtrade_extract(path: Path, n_rows: int, seed: int = 0, n_reporters: int = 200,
+                           first_year: int = 2000, n_years: int = 25) -> Path:
+    """Monthly HS8542 export rows for n_reporters reporters; ~3% have a zero or missing value."""
+    rng = np.random.default_rng(seed)
+    path = Path(path)
+    with path.open("w", encoding="utf-8", newline="") as f:
+        f.write(COMTRADE_HEADER + "\n")
+        written = 0
+        while written < n_rows:
+            n = min(BLOCK_ROWS, n_rows - written)
+            rep = rng.integers(0, n_reporters, n)
+            year = first_year + rng.integers(0, n_years, n)
+            month = rng.integers(1, 13, n)
+            value = np.round(rng.lognormal(18, 2, n))
+            value[rng.random(n) < 0.03] = 0
+            f.write("".join(
+                f'"C","M","{y}{m:02d}01","{y}","{m}","{y}{m:02d}","{r}","R{r:03d}","Reporter {r:03d}","X",'
+                f'"Export","0","W00","World","0","W00","World","H4","HS","true","8542",'
+                f'"Electronic integrated circuits","4","false","C00","TOTAL CPC","0","0","TOTAL MOT","-1","N/A",,'
+                f'"false","-1","N/A",,"false",,"false",,"false",,"{v:.0f}","{"" if v == 0 and r % 2 else f"{v:.0f}"}",'
+                f'"4","true","false",\n'
+                for r, y, m, v in zip(rep, year, month, value)
+            ))
+            written += n
+    return path
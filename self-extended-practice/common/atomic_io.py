@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Content hashes, JSON state files and atomic writes, shared by both projects' src/ scripts.
+
+Manifests, caches and stores all follow the same pattern: hash the source, read the previous
+state (a missing or corrupt file counts as empty), write the result to <path>.tmp, then
+os.replace it over <path>. A crash mid-write therefore never leaves a truncated output.
+
+Scripts import it after adding this directory to sys.path:
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))
+    from atomic_io import atomic_path, load_json, sha256_file
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+
+# -------------------------
+# Hashes
+# -------------------------
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path: Path, block_size: int = 1 << 20) -> str:
+    """sha256 of a file, read in blocks so large inputs are never held in memory."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# -------------------------
+# State files
+# -------------------------
+
+def load_json(path: Path, default: Any = None) -> Any:
+    """Parsed JSON at path, or default when the file is missing or not valid JSON."""
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return default
+
+
+@contextmanager
+def atomic_path(path: Path) -> Iterator[Path]:
+    """Yield <path>.tmp to write to; it replaces path on success and is removed on error."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    with atomic_path(path) as tmp:
+        tmp.write_text(text, encoding="utf-8")
+
+
+def atomic_write_json(path: Path, obj: Any, **dumps_kwargs) -> None:
+    atomic_write_text(path, json.dumps(obj, **dumps_kwargs))
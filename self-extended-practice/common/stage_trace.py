@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stage timing and memory instrumentation for the src/ scripts of both projects.
+
+Scripts mark their steps (read / normalize / filter / aggregate / render / write) with stage().
+Every stage is a no-op until main() calls configure(), which happens with --profile or when
+STAGE_PROFILE is set:
+
+    with stage("read") as st:
+        df = read_exports(raw_csv)
+        st.rows(out=len(df))
+
+Each stage records:
+- wall time and rows in / out;
+- RSS at entry, and peak RSS while it ran. This is the kernel high-water mark, reset at
+  every stage entry on Linux. A nested stage folds its peak into its parent.
+
+At exit, the script writes a JSON trace to <project>/output/profile/<script>.json (the
+project being the parent of the running script's src/), or a Chrome trace
+for chrome://tracing / Perfetto with --profile-format chrome, and prints a per-stage summary.
+--profile-stage NAME also runs cProfile over every stage called NAME, and saves the stats
+next to the trace.
+
+When profiling is off, each stage costs one function call that returns a shared no-op
+context manager.
+
+Environment, for runs without the flags (e.g. every stage of pipeline.py):
+    STAGE_PROFILE=1 | <trace path>    STAGE_PROFILE_FORMAT=json | chrome    STAGE_PROFILE_CPROFILE=<stage>
+
+Work done in worker processes (render_figures, clean_batch --workers) is not split into
+stages. Its time shows up in the parent stage that waits for it.
+
+status_mb / reset_peak / peak_rss_mb are also the memory probes of benchmarks/.
+"""
+
+from __future__ import annotations
+import argparse
+import atexit
+import cProfile
+import json
+import os
+import pstats
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROFILE_ENV = "STAGE_PROFILE"
+FORMAT_ENV = "STAGE_PROFILE_FORMAT"
+CPROFILE_ENV = "STAGE_PROFILE_CPROFILE"
+FORMATS = ("json", "chrome")
+
+
+def profile_dir() -> Path:
+    """<project>/output/profile for a script run as <project>/src/<script>.py; else ./output/profile."""
+    main = Path(sys.argv[0]).resolve() if sys.argv and sys.argv[0] else None
+    if main is not None and main.is_file() and main.parent.name == "src":
+        return main.parent.parent / "output" / "profile"
+    return Path("output") / "profile"
+
+
+# -------------------------
+# Memory (Linux /proc, getrusage elsewhere)
+# -------------------------
+
+def status_mb(field: str) -> Optional[float]:
+    """A /proc/self/status field (VmRSS, VmHWM, ...) in MB; None off Linux."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak() -> bool:
+    """Reset the RSS high-water mark (Linux >= 4.0); elsewhere peaks are process-wide so far."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    hwm = status_mb("VmHWM")
+    if hwm is not None:
+        return hwm
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+# -------------------------
+# Stages
+# -------------------------
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def rows(self, rows_in=None, out=None) -> None:
+        pass
+
+
+_NULL = _NullStage()
+
+
+class Stage:
+    def __init__(self, tracer: "Tracer", name: str, rows_in: Optional[int] = None):
+        self.tracer = tracer
+        self.name = name
+        self.rows_in = None if rows_in is None else int(rows_in)
+        self.rows_out: Optional[int] = None
+        self.peak = 0.0
+        self.profiled = False
+
+    def rows(self, rows_in: Optional[int] = None, out: Optional[int] = None) -> None:
+        if rows_in is not None:
+            self.rows_in = int(rows_in)
+        if out is not None:
+            self.rows_out = int(out)
+
+    def __enter__(self) -> "Stage":
+        self.tracer._enter(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer._exit(self)
+        return False
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.records: List[dict] = []
+        self._stack: List[Stage] = []
+        self._done = False
+
+    def configure(self, script: str, path: Optional[str] = None, fmt: str = "json",
+                  cprofile_stage: Optional[str] = None) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown profile format: {fmt!r} (use {' or '.join(FORMATS)})")
+        self.script = script
+        self.fmt = fmt
+        self.path = Path(path) if path else profile_dir() / f"{script}{'.trace' if fmt == 'chrome' else ''}.json"
+        self.cprofile_stage = cprofile_stage
+        self._profiler = cProfile.Profile() if cprofile_stage else None
+        self.pid = os.getpid()
+        self.started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.t0 = time.perf_counter()
+        self.enabled = True
+        atexit.register(self.finish)
+
+    def _enter(self, st: Stage) -> None:
+        if self._stack:
+            self._stack[-1].peak = max(self._stack[-1].peak, peak_rss_mb())
+        reset_peak()
+        st.depth = len(self._stack)
+        st.rss_start = status_mb("VmRSS")
+        self._stack.append(st)
+        if self._profiler is not None and st.name == self.cprofile_stage \
+                and not any(s.profiled for s in self._stack):
+            st.profiled = True
+            self._profiler.enable()
+        st.t0 = time.perf_counter()
+
+    def _exit(self, st: Stage) -> None:
+        wall = time.perf_counter() - st.t0
+        if st.profiled:
+            self._profiler.disable()
+        self._stack.pop()
+        peak = max(st.peak, peak_rss_mb())
+        if self._stack:
+            self._stack[-1].peak = max(self._stack[-1].peak, peak)
+        self.records.append({
+            "name": st.name,
+            "depth": st.depth,
+            "start_s": round(st.t0 - self.t0, 6),
+            "wall_s": round(wall, 6),
+            "rows_in": st.rows_in,
+            "rows_out": st.rows_out,
+            "rss_start_mb": None if st.rss_start is None else round(st.rss_start, 1),
+            "peak_rss_mb": round(peak, 1),
+        })
+
+    # -------------------------
+    # Output
+    # -------------------------
+
+    def finish(self) -> None:
+        if not self.enabled or self._done or os.getpid() != self.pid:
+            return
+        self._done = True
+        total = time.perf_counter() - self.t0
+        records = sorted(self.records, key=lambda r: r["start_s"])
+        if self.fmt == "chrome":
+            events = [{"name": r["name"], "cat": "stage", "ph": "X", "pid": self.pid, "tid": 1,
+                       "ts": r["start_s"] * 1e6, "dur": r["wall_s"] * 1e6,
+                       "args": {k: r[k] for k in ("rows_in", "rows_out", "rss_start_mb", "peak_rss_mb")}}
+                      for r in records]
+            payload = {"traceEvents": events, "displayTimeUnit": "ms",
+                       "otherData": {"script": self.script, "argv": sys.argv, "started": self.started}}
+        else:
+            payload = {"script": self.script, "argv": sys.argv, "started": self.started,
+                       "total_s": round(total, 6), "peak_rss_mb": round(peak_rss_mb(), 1), "stages": records}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8")
+        print_summary(records, total, f"{self.script} -> {self.path.as_posix()}")
+
+        if self._profiler is not None:
+            prof = self.path.with_name(f"{self.path.name.split('.')[0]}.{self.cprofile_stage}.prof")
+            self._profiler.dump_stats(prof)
+            print(f"\ncProfile of stage '{self.cprofile_stage}' -> {prof.as_posix()}")
+            pstats.Stats(str(prof)).sort_stats("cumulative").print_stats(15)
+
+
+def print_summary(records: List[dict], total: float, title: str) -> None:
+    """Per stage name (first-seen order): calls, total wall, share of the run, rows, max peak RSS."""
+    by_name: Dict[str, dict] = {}
+    for r in records:
+        s = by_name.setdefault(r["name"], {"depth": r["depth"], "calls": 0, "wall": 0.0,
+                                           "rows_in": None, "rows_out": None, "peak": 0.0})
+        s["depth"] = min(s["depth"], r["depth"])
+        s["calls"] += 1
+        s["wall"] += r["wall_s"]
+        for k in ("rows_in", "rows_out"):
+            if r[k] is not None:
+                s[k] = (s[k] or 0) + r[k]
+        s["peak"] = max(s["peak"], r["peak_rss_mb"])
+
+    def n(v):
+        return "-" if v is None else f"{v:,}"
+
+    print(f"\nStage profile ({total:.2f}s total): {title}")
+    print(f"  {'stage':<22}{'calls':>6}{'wall_s':>9}{'%run':>7}{'rows_in':>12}{'rows_out':>12}{'peak_mb':>9}")
+    for name, s in by_name.items():
+        label = "  " * s["depth"] + name
+        print(f"  {label:<22}{s['calls']:>6}{s['wall']:>9.3f}{100 * s['wall'] / max(total, 1e-9):>6.1f}%"
+              f"{n(s['rows_in']):>12}{n(s['rows_out']):>12}{s['peak']:>9.1f}")
+
+
+_TRACER = Tracer()
+
+
+def stage(name: str, rows_in: Optional[int] = None):
+    """Context manager for one stage; the shared no-op when profiling is off (or in a worker process)."""
+    if not _TRACER.enabled or os.getpid() != _TRACER.pid:
+        return _NULL
+    return Stage(_TRACER, name, rows_in)
+
+
+def add_profile_args(ap: argparse.ArgumentParser) -> None:
+    g = ap.add_argument_group("profiling")
+    g.add_argument("--profile", nargs="?", const="", default=None, metavar="TRACE",
+                   help="Record time / rows / peak RSS per stage (trace default: output/profile/<script>.json)")
+    g.add_argument("--profile-format", choices=FORMATS, default=None, help="json (default) or chrome trace events")
+    g.add_argument("--profile-stage", type=str, default=None, metavar="STAGE",
+                   help="Also run cProfile over this stage (e.g. render)")
+
+
+def configure(script: str, args: Optional[argparse.Namespace] = None) -> bool:
+    """Turn profiling on from --profile / STAGE_PROFILE; returns whether it is on."""
+    flag = getattr(args, "profile", None)
+    env = os.environ.get(PROFILE_ENV, "").strip()
+    if flag is None and env.lower() in ("", "0", "false", "no"):
+        return False
+    path = flag or (env if env.lower() not in ("1", "true", "yes") else None)
+    fmt = getattr(args, "profile_format", None) or os.environ.get(FORMAT_ENV) or "json"
+    cprofile_stage = getattr(args, "profile_stage", None) or os.environ.get(CPROFILE_ENV) or None
+    _TRACER.configure(script, path or None, fmt, cprofile_stage)
+    return True
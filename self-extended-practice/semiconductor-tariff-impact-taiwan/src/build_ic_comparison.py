@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Build data/processed/ic_exports_comparison_panel.csv (Year, Country, ExportValue(USD)):
+the script form of notebooks/data_cleaning_ic_exports.ipynb, reduced to the three panel
+columns that panel_fe.py / panel_inference.py / trade_cube.py read. The notebook's own
+ic_exports_comparison.csv (all 50 Comtrade columns, read by online_ai_regression.ipynb)
+is left as it is.
+
+- China / Rep. of Korea / USA : UN Comtrade HS8542 export totals (reporterDesc, primaryValue)
+- Taiwan                      : Taiwan customs portal export, HS 8542 rows only, ROC or
+                                Gregorian dates, USD thousands -> USD, summed per year
+
+Usage:
+    python src/build_ic_comparison.py
+    python src/build_ic_comparison.py --year-min 2013 --year-max 2024 --out data/processed/ic_exports_comparison_panel.csv
+"""
+
+from __future__ import annotations
+import argparse
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from clean_uncomtrade_exports import read_clean
+
+VALUE_COLUMNS = ["美元(千元)", "美元(千)", "金額(千美元)", "金額(千元)"]
+
+
+def comtrade_countries(raw_csv: Path) -> pd.DataFrame:
+    df = read_clean(raw_csv)
+    return pd.DataFrame({
+        "Year": df["Year"].astype(int),
+        "Country": df["Reporter"].astype(str),
+        "ExportValue(USD)": df["ExportValueUSD"],
+    })
+
+
+def _parse_year(s: str) -> float:
+    """4-digit Gregorian year, else the leading ROC year (102, 112/01, 10201 ...)."""
+    m = re.search(r"(19|20)\d{2}", s)
+    if m:
+        return float(m.group(0))
+    digs = re.findall(r"\d+", s)
+    if not digs:
+        return np.nan
+    tok = digs[0]
+    y = int(tok[:3]) if len(tok) >= 3 else int(tok)
+    return float(y + 1911) if 80 <= y <= 200 else np.nan
+
+
+def taiwan_customs(raw_csv: Path) -> pd.DataFrame:
+    tw = pd.read_csv(raw_csv, dtype=str).fillna("")
+    if "進出口別" in tw.columns:
+        tw = tw[tw["進出口別"].str.contains("出", na=False)]
+    if "貨品號列" in tw.columns:
+        tw = tw[tw["貨品號列"].str.startswith("8542")]
+    if "日期" not in tw.columns:
+        raise ValueError("檔案缺少『日期』欄，無法解析年份")
+    val_col = next((c for c in VALUE_COLUMNS if c in tw.columns), None)
+    if val_col is None:
+        raise ValueError("找不到金額欄（例如『美元(千元)』）")
+
+    year = tw["日期"].map(_parse_year)
+    usd = pd.to_numeric(tw[val_col].str.replace(r"[^0-9.\-]+", "", regex=True), errors="coerce") * 1000.0
+    out = pd.DataFrame({"Year": year, "ExportValue(USD)": usd}).dropna()
+    out = out.astype({"Year": int}).groupby("Year", as_index=False)["ExportValue(USD)"].sum()
+    out.insert(1, "Country", "Taiwan")
+    return out
+
+
+def build_ic_comparison(comtrade_csv: Path, taiwan_csv: Path, year_min: int, year_max: int) -> pd.DataFrame:
+    parts = [comtrade_countries(comtrade_csv), taiwan_customs(taiwan_csv)]
+    df = pd.concat(parts, ignore_index=True)
+    df = df[df["Year"].between(year_min, year_max) & (df["ExportValue(USD)"] > 0)]
+    return df.sort_values(["Country", "Year"]).reset_index(drop=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the 4-country HS8542 export comparison table")
+    ap.add_argument("--comtrade", type=str, default="data/raw/ic_exports_comparison_uncomtrade_2013_2024.csv")
+    ap.add_argument("--taiwan", type=str, default="data/raw/taiwan_exports_8542_2013_2025.csv")
+    ap.add_argument("--out", type=str, default="data/processed/ic_exports_comparison_panel.csv")
+    ap.add_argument("--year-min", type=int, default=2013)
+    ap.add_argument("--year-max", type=int, default=2024)
+    args = ap.parse_args()
+
+    df = build_ic_comparison(Path(args.comtrade), Path(args.taiwan), args.year_min, args.year_max)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(out, index=False)
+    print(f"✅ Saved 4-country dataset -> {out.as_posix()} ({len(df)} rows)")
+
+
+if __name__ == "__main__":
+    main()
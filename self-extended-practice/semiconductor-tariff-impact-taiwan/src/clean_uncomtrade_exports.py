@@ -1,35 +1,311 @@
-import pandas as pd
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Clean UN Comtrade export extracts into Year / Period / Reporter / ExportValueUSD.
+
+Batch mode takes a glob or a manifest of extracts and reads only the three
+needed columns. It cleans files in parallel worker processes and writes one
+Year-partitioned output:
+
+    <out>/Year=2013/part-<extract stem>-<path hash>.csv
+    <out>/_manifest.json        # per-extract source size/mtime, rows, years written
+
+Extracts are keyed by stem plus a hash of their resolved path, so same-named files
+in different directories get separate partitions and manifest entries.
+
+Both Comtrade header styles are accepted: the legacy bulk download (Period,
+Reporter, Trade Value (US$)) and the current API (period, reporterDesc,
+primaryValue). API extracts may be cp1252-encoded and end every row with a
+trailing comma; both are handled.
+
+Without --inputs the script cleans one file (--input -> --output), as it always has.
+
+Usage:
+    python src/clean_uncomtrade_exports.py                                                   # single file, default paths
+    python src/clean_uncomtrade_exports.py --input raw.csv --output clean.csv
+    python src/clean_uncomtrade_exports.py --inputs "data/raw/*uncomtrade*.csv" --out data/processed/uncomtrade_clean
+    python src/clean_uncomtrade_exports.py --inputs extracts.txt --workers 8 --since          # only stale extracts
+    python src/clean_uncomtrade_exports.py --inputs "data/raw/*.csv" --since 2025-09-01       # also redo newer files
+"""
+
+from __future__ import annotations
+import argparse
+import codecs
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))  # shared by both projects
+from atomic_io import atomic_path, atomic_write_json, load_json, sha256_bytes  # noqa: E402
+from stage_trace import add_profile_args, configure, stage  # noqa: E402
+
+# 標準欄位 -> 可接受的原始欄名（舊版 bulk 下載 / 新版 API）
+COLUMN_ALIASES = {
+    "Period": ["Period", "period"],
+    "Reporter": ["Reporter", "reporterDesc"],
+    "ExportValueUSD": ["Trade Value (US$)", "primaryValue"],
+}
+OUTPUT_COLUMNS = ["Year", "Period", "Reporter", "ExportValueUSD"]
+MANIFEST_FILE = "_manifest.json"
+SNIFF_BYTES = 1 << 20  # 編碼偵測只解碼檔頭這麼多位元組
+
+
+# -------------------------
+# 單檔清理
+# -------------------------
+
+def _detect_encoding(path: Path) -> str:
+    """只看檔頭 SNIFF_BYTES；之後才出現的非 UTF-8 位元組由 read_clean 的 cp1252 重讀處理。"""
+    with path.open("rb") as f:
+        head = f.read(SNIFF_BYTES)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)  # 截斷的多位元組字元不算錯
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "cp1252"  # Comtrade API 下載檔
+
+
+def _resolve_columns(header: List[str]) -> Dict[str, str]:
+    cols = {c.strip(): c for c in header}
+    found = {}
+    for std, aliases in COLUMN_ALIASES.items():
+        hit = next((cols[a] for a in aliases if a in cols), None)
+        if hit is None:
+            raise ValueError(f"找不到欄位 {std}（可接受：{aliases}）")
+        found[hit] = std
+    return found
+
+
+def _read_columns(raw_path: Path, rename: Dict[str, str], encoding: str) -> pd.DataFrame:
+    typed = {src: ("float64" if std == "ExportValueUSD" else "string") for src, std in rename.items()}
+    kwargs = dict(usecols=list(rename), encoding=encoding, index_col=False)  # API 檔每列結尾多一個逗號
+    try:
+        return pd.read_csv(raw_path, dtype=typed, **kwargs)
+    except UnicodeDecodeError:
+        raise
+    except ValueError:
+        # 數值欄有無法解析的值：以文字重讀再 coerce（同原本的 to_numeric(errors="coerce")）
+        df = pd.read_csv(raw_path, dtype="string", **kwargs)
+        value = next(src for src, std in rename.items() if std == "ExportValueUSD")
+        df[value] = pd.to_numeric(df[value], errors="coerce")
+        return df
+
+
+def read_clean(raw_path: Path) -> pd.DataFrame:
+    """只讀三個需要的欄位（型別化解析），一次遮罩過濾，回傳 Year/Period/Reporter/ExportValueUSD。"""
+    raw_path = Path(raw_path)
+    encoding = _detect_encoding(raw_path)
+    header = pd.read_csv(raw_path, nrows=0, encoding=encoding, index_col=False).columns.tolist()
+    rename = _resolve_columns(header)
+    with stage("read") as st:
+        try:
+            df = _read_columns(raw_path, rename, encoding)
+        except UnicodeDecodeError:  # 檔頭是 UTF-8，後段才出現 cp1252 位元組
+            df = _read_columns(raw_path, rename, "cp1252")
+        df = df.rename(columns=rename)
+        st.rows(out=len(df))
+
+    # 移除缺失值與 ExportValueUSD <= 0（單一遮罩，不產生中間複本）
+    with stage("filter", rows_in=len(df)) as st:
+        df = df[df["ExportValueUSD"] > 0]
+        st.rows(out=len(df))
+
+    with stage("normalize", rows_in=len(df)) as st:
+        period = df["Period"].str.strip()
+        df = pd.DataFrame({
+            "Year": pd.to_numeric(period.str[:4], errors="coerce").astype("Int64"),
+            "Period": period,
+            "Reporter": df["Reporter"].str.strip(),
+            "ExportValueUSD": df["ExportValueUSD"],
+        })
+        df = df[df["Year"].notna()]
+        df = df.sort_values(["Year", "Period", "Reporter"], kind="stable").reset_index(drop=True)
+        st.rows(out=len(df))
+    return df
+
 
 def clean_uncomtrade_exports(raw_path, processed_path):
-    # 讀取原始資料
-    df = pd.read_csv(raw_path)
-    
-    # 保留必要欄位
-    keep_cols = ["Period", "Reporter", "Trade Value (US$)"]
-    df = df[keep_cols].rename(columns={
-        "Period": "Year",
-        "Trade Value (US$)": "ExportValueUSD"
-    })
-    
-    # 移除缺失值
-    df = df.dropna(subset=["ExportValueUSD"])
-    
-    # 確保數值型態正確
-    df["ExportValueUSD"] = pd.to_numeric(df["ExportValueUSD"], errors="coerce")
-    
-    # 移除 ExportValueUSD = 0 的列
-    df = df[df["ExportValueUSD"] > 0]
-    
-    # 排序
-    df = df.sort_values(by=["Year", "Reporter"]).reset_index(drop=True)
-    
+    df = read_clean(raw_path)[["Year", "Reporter", "ExportValueUSD"]]
+
     # 輸出到 processed/
-    Path(processed_path).parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(processed_path, index=False)
+    with stage("write", rows_in=len(df)):
+        Path(processed_path).parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(processed_path, index=False)
     print(f"✅ Cleaned file saved to: {processed_path}")
 
+
+# -------------------------
+# 批次：glob / manifest -> 依 Year 分區輸出
+# -------------------------
+
+def resolve_inputs(spec: str) -> List[Path]:
+    """glob 樣式，或 manifest（.txt 每行一個路徑 / .json 路徑清單，相對於 manifest 所在目錄）。"""
+    p = Path(spec)
+    if p.suffix in (".txt", ".json") and p.is_file():
+        text = p.read_text(encoding="utf-8")
+        items = json.loads(text) if p.suffix == ".json" else text.splitlines()
+        paths = [Path(s.strip()) for s in items if s.strip() and not s.strip().startswith("#")]
+        return [q if q.is_absolute() else p.parent / q for q in paths]
+    return [Path(s) for s in sorted(glob.glob(spec))]
+
+
+def source_key(path: Path) -> str:
+    """manifest / 分區檔名用的鍵：檔名 stem + 絕對路徑雜湊（不同目錄的同名檔不互相覆蓋）。"""
+    digest = sha256_bytes(str(Path(path).resolve()).encode("utf-8"))[:10]
+    return f"{Path(path).stem}-{digest}"
+
+
+def _source_stamp(path: Path) -> Dict[str, int]:
+    st = path.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _is_current(path: Path, entry: Optional[dict], out_dir: Path) -> bool:
+    if not entry or entry.get("stamp") != _source_stamp(path):
+        return False
+    return all((out_dir / f"Year={y}" / entry["part"]).exists() for y in entry["years"])
+
+
+def _clean_to_partitions(raw_path: Path, out_dir: Path, old: Optional[dict]) -> dict:
+    """Worker：清理一個檔案並寫入各年份分區；回傳統計（失敗時回傳 error，不中斷整批）。"""
+    t0 = time.perf_counter()
+    try:
+        df = read_clean(raw_path)
+    except (ValueError, OSError) as e:
+        return {"source": str(raw_path), "error": str(e)}
+    key = source_key(raw_path)
+    part = f"part-{key}.csv"
+    if old:  # 上次的分區檔（來源改變後不再出現的年份、或舊版檔名）要清掉
+        for y in old["years"]:
+            (out_dir / f"Year={y}" / old["part"]).unlink(missing_ok=True)
+    years = []
+    with stage("write", rows_in=len(df)):
+        for year, g in df.groupby("Year", sort=True):
+            d = out_dir / f"Year={int(year)}"
+            d.mkdir(parents=True, exist_ok=True)
+            with atomic_path(d / part) as tmp:
+                g.drop(columns="Year").to_csv(tmp, index=False)
+            years.append(int(year))
+    return {
+        "source": str(raw_path),
+        "key": key,
+        "part": part,
+        "years": years,
+        "rows": len(df),
+        "bytes": raw_path.stat().st_size,
+        "seconds": time.perf_counter() - t0,
+        "stamp": _source_stamp(raw_path),
+    }
+
+
+def clean_batch(
+    inputs: List[Path],
+    out_dir: Path,
+    workers: int = 0,
+    since: Optional[str] = None,
+) -> List[dict]:
+    """
+    since=None     : 全部重新清理
+    since="last"   : 略過輸出已是最新（來源 size/mtime 未變且分區檔都在）的檔案
+    since=ISO 日期 : 只略過在該時間之前就沒再修改過、且輸出已是最新的檔案（之後修改過的一律重新清理）
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_json(out_dir / MANIFEST_FILE, {})
+    cutoff = None if since in (None, "last") else datetime.fromisoformat(since).timestamp()
+
+    todo, skipped = [], 0
+    for path in inputs:
+        entry = manifest.get(source_key(path))
+        legacy = manifest.get(path.name)  # 舊版 manifest 以檔名為鍵
+        if entry is None and legacy and Path(legacy["source"]).resolve() == path.resolve():
+            entry = manifest.pop(path.name)
+            entry["stamp"] = None  # 舊檔名的分區要換成新檔名，一律重新清理
+        old = cutoff is None or path.stat().st_mtime < cutoff
+        if since is not None and old and _is_current(path, entry, out_dir):
+            skipped += 1
+            continue
+        todo.append((path, entry))
+
+    t0 = time.perf_counter()
+    workers = min(workers or os.cpu_count() or 1, max(len(todo), 1))
+    with stage("clean") as st:  # with workers > 1 the per-file stages run (untraced) in the pool
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                stats = list(pool.map(_clean_to_partitions, [p for p, _ in todo], [out_dir] * len(todo),
+                                      [e for _, e in todo]))
+        else:
+            stats = [_clean_to_partitions(p, out_dir, e) for p, e in todo]
+        st.rows(out=sum(s.get("rows", 0) for s in stats))
+    wall = time.perf_counter() - t0
+
+    failed = [s for s in stats if "error" in s]
+    stats = [s for s in stats if "error" not in s]
+    for s in failed:
+        print(f"  [skip] {Path(s['source']).name}: {s['error']}")
+    for s in stats:
+        manifest[s["key"]] = {k: s[k] for k in ("source", "part", "years", "rows", "stamp")}
+        print(f"  {s['key']:<60} {s['rows']:>8} rows  {s['seconds']:6.2f}s")
+    atomic_write_json(out_dir / MANIFEST_FILE, manifest, ensure_ascii=False, indent=2)
+
+    rows = sum(s["rows"] for s in stats)
+    mb = sum(s["bytes"] for s in stats) / 1e6
+    print(f"✅ Cleaned {len(stats)} file(s), skipped {skipped} up to date, {len(failed)} failed, {workers} worker(s): "
+          f"{rows} rows in {wall:.2f}s ({rows / max(wall, 1e-9):,.0f} rows/s, {mb / max(wall, 1e-9):.1f} MB/s)")
+    return stats
+
+
+def read_partitioned(out_dir: Path, years: Optional[List[int]] = None) -> pd.DataFrame:
+    """讀回分區輸出（可只讀指定年份）。"""
+    frames = []
+    for d in sorted(Path(out_dir).glob("Year=*")):
+        year = int(d.name.split("=", 1)[1])
+        if years is not None and year not in years:
+            continue
+        for part in sorted(d.glob("part-*.csv")):
+            frames.append(pd.read_csv(part, dtype={"Period": "string", "Reporter": "string"}).assign(Year=year))
+    if not frames:
+        return pd.DataFrame(columns=OUTPUT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[OUTPUT_COLUMNS]
+
+
+RAW_FILE = "self-extended-practice/semiconductor-tariff-impact-taiwan/data/raw/ic_exports_comparison_uncomtrade_2013_2024.csv"
+PROCESSED_FILE = ("self-extended-practice/semiconductor-tariff-impact-taiwan/data/processed/"
+                  "ic_exports_comparison_clean_2013_2024.csv")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Clean UN Comtrade export extracts (one file, or batch Year-partitioned)")
+    ap.add_argument("--input", type=str, default=RAW_FILE, help="Single extract to clean (without --inputs)")
+    ap.add_argument("--output", type=str, default=PROCESSED_FILE, help="Cleaned CSV for --input")
+    ap.add_argument("--inputs", type=str, default=None,
+                    help="Batch mode: glob of extracts, or a manifest (.txt one path per line / .json list)")
+    ap.add_argument("--out", type=str, default="data/processed/uncomtrade_clean",
+                    help="Partitioned output directory (Year=YYYY/part-<extract>.csv)")
+    ap.add_argument("--workers", type=int, default=0, help="Worker processes (0 = CPU count)")
+    ap.add_argument("--since", nargs="?", const="last", default=None,
+                    help="Skip extracts whose outputs are current; with an ISO date, skip only those not "
+                         "modified since then")
+    add_profile_args(ap)
+    args = ap.parse_args()
+    configure("clean_uncomtrade_exports", args)
+
+    if args.inputs is None:
+        clean_uncomtrade_exports(args.input, args.output)
+        return
+    inputs = resolve_inputs(args.inputs)
+    if not inputs:
+        ap.error(f"No inputs match {args.inputs!r}")
+    clean_batch(inputs, Path(args.out), workers=args.workers, since=args.since)
+
+
 if __name__ == "__main__":
-    raw_file = "self-extended-practice/semiconductor-tariff-impact-taiwan/data/raw/ic_exports_comparison_uncomtrade_2013_2024.csv"
-    processed_file = "self-extended-practice/semiconductor-tariff-impact-taiwan/data/processed/ic_exports_comparison_clean_2013_2024.csv"
-    clean_uncomtrade_exports(raw_file, processed_file)
+    main()
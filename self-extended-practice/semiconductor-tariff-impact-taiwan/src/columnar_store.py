@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory-mapped columnar copies of the raw CSV datasets under data/raw.
+
+Each CSV is converted once to an uncompressed Arrow IPC (Feather v2) file in
+data/columnar/<stem>.arrow with explicit dtypes: code columns stay strings (HS
+codes, Comtrade reporter/partner codes), values are float64, repetitive text
+columns are dictionary-encoded. Readers memory-map the file and select only the
+columns they need, so untouched columns are never read from disk and numeric
+buffers are not copied. CSV stays the interchange format (`export`).
+
+The source file's size, mtime and sha256 are kept in the Arrow schema metadata;
+`convert` skips files whose columnar copy is still current.
+
+Usage:
+    python src/columnar_store.py convert                  # data/raw/*.csv -> data/columnar/*.arrow
+    python src/columnar_store.py info
+    python src/columnar_store.py export usa_tariffs_2013_2025 --out /tmp/usa_tariffs.csv
+"""
+
+from __future__ import annotations
+import argparse
+import csv
+import io
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.feather as feather
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))  # shared by both projects
+from atomic_io import atomic_path, sha256_file  # noqa: E402
+
+STORE_VERSION = "1"
+DEFAULT_RAW_DIR = Path("data/raw")
+DEFAULT_STORE_DIR = Path("data/columnar")
+TRAILING_COLUMN = "_trailing"
+
+# Column typing per dataset family, recognized by header columns.
+# Listed strings are kept as plain strings (codes with meaningful digits / prefix filters),
+# listed floats are forced to float64; any other text column is dictionary-encoded.
+SCHEMAS: List[Dict[str, object]] = [
+    {   # UN Comtrade API extracts (ic_exports_*_uncomtrade*.csv, ic_exports_world_HS8542_raw.csv)
+        "family": "comtrade",
+        "signature": {"typeCode", "freqCode", "refPeriodId", "reporterCode", "cmdCode"},
+        "strings": ["refPeriodId", "period", "reporterCode", "partnerCode", "partner2Code", "cmdCode",
+                    "customsCode", "mosCode", "motCode", "qtyUnitCode", "altQtyUnitCode"],
+        "floats": ["qty", "altQty", "netWgt", "grossWgt", "cifvalue", "fobvalue", "primaryValue"],
+    },
+    {   # Taiwan customs, by destination country
+        "family": "customs_by_country",
+        "signature": {"Year", "Country", "HS Code", "Export Value (USD)"},
+        "strings": ["HS Code"],
+        "floats": ["Export Value (USD)"],
+    },
+    {   # Taiwan customs portal export (Chinese headers, ROC year)
+        "family": "customs_portal",
+        "signature": {"日期", "貨品號列", "美元(千元)"},
+        "strings": ["貨品號列"],
+        "floats": ["美元(千元)"],
+    },
+    {   # USITC tariff schedule extract
+        "family": "usa_tariffs",
+        "signature": {"Year", "HS Code", "MFN Duty Rate (%)"},
+        "strings": ["HS Code"],
+        "floats": ["MFN Duty Rate (%)", "General Duty Rate (%)"],
+    },
+]
+
+
+# -------------------------
+# Source inspection
+# -------------------------
+
+def _detect_encoding(raw: bytes) -> str:
+    """UTF-8 (BOM tolerated by Arrow) or Windows-1252 for the Comtrade bulk downloads."""
+    try:
+        raw.decode("utf-8")
+        return "utf8"
+    except UnicodeDecodeError:
+        return "cp1252"
+
+
+def _header_and_width(raw: bytes, encoding: str):
+    text = raw[:1 << 16].decode("utf-8-sig" if encoding == "utf8" else encoding, errors="replace")
+    rows = csv.reader(io.StringIO(text))
+    header = next(rows)
+    first = next(rows, header)
+    return [h.strip() for h in header], len(first)
+
+
+def _schema_for(header: List[str]) -> Dict[str, object]:
+    cols = set(header)
+    for spec in SCHEMAS:
+        if spec["signature"] <= cols:
+            return spec
+    return {"family": "generic", "strings": [], "floats": []}
+
+
+# -------------------------
+# Conversion
+# -------------------------
+
+def store_path(csv_path: Path, store_dir: Path = DEFAULT_STORE_DIR) -> Path:
+    return Path(store_dir) / (Path(csv_path).stem + ".arrow")
+
+
+def is_fresh(csv_path: Path, store_dir: Path = DEFAULT_STORE_DIR) -> bool:
+    """True when the columnar copy exists and was built from the current CSV contents."""
+    out = store_path(csv_path, store_dir)
+    if not out.exists():
+        return False
+    meta = feather.read_table(out, columns=[], memory_map=True).schema.metadata or {}
+    if meta.get(b"store_version", b"").decode() != STORE_VERSION:
+        return False
+    st = Path(csv_path).stat()
+    if meta.get(b"source_size") == str(st.st_size).encode() and meta.get(b"source_mtime_ns") == str(st.st_mtime_ns).encode():
+        return True
+    return meta.get(b"source_sha256", b"").decode() == sha256_file(Path(csv_path))
+
+
+def read_csv_typed(csv_path: Path) -> pa.Table:
+    """Parse one raw CSV into an Arrow table with the dataset family's dtypes."""
+    raw = Path(csv_path).read_bytes()
+    encoding = _detect_encoding(raw)
+    header, width = _header_and_width(raw, encoding)
+    spec = _schema_for(header)
+
+    names = list(header)
+    if width == len(header) + 1:  # Comtrade rows end with a trailing comma
+        names.append(TRAILING_COLUMN)
+    column_types = {c: pa.string() for c in spec["strings"] if c in names}
+    column_types.update({c: pa.float64() for c in spec["floats"] if c in names})
+
+    table = pacsv.read_csv(
+        io.BytesIO(raw),
+        read_options=pacsv.ReadOptions(column_names=names, skip_rows=1, encoding=encoding),
+        convert_options=pacsv.ConvertOptions(
+            column_types=column_types,
+            strings_can_be_null=True,
+            auto_dict_encode=True,
+            auto_dict_max_cardinality=4096,
+        ),
+    )
+    if TRAILING_COLUMN in table.column_names:
+        table = table.drop_columns([TRAILING_COLUMN])
+    return table.unify_dictionaries().combine_chunks()
+
+
+def convert_csv(csv_path: Path, store_dir: Path = DEFAULT_STORE_DIR, force: bool = False) -> Optional[Path]:
+    """CSV -> uncompressed Feather v2 (memory-mappable). Returns the output path, or None if already current."""
+    csv_path = Path(csv_path)
+    out = store_path(csv_path, store_dir)
+    if not force and is_fresh(csv_path, store_dir):
+        return None
+
+    table = read_csv_typed(csv_path)
+    st = csv_path.stat()
+    meta = dict(table.schema.metadata or {})
+    meta.update({
+        b"store_version": STORE_VERSION.encode(),
+        b"source": csv_path.name.encode(),
+        b"source_size": str(st.st_size).encode(),
+        b"source_mtime_ns": str(st.st_mtime_ns).encode(),
+        b"source_sha256": sha256_file(csv_path).encode(),
+        b"family": str(_schema_for(table.column_names)["family"]).encode(),
+    })
+    table = table.replace_schema_metadata(meta)
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_path(out) as tmp:
+        feather.write_feather(table, tmp, compression="uncompressed")
+    return out
+
+
+def convert_all(raw_dir: Path = DEFAULT_RAW_DIR, store_dir: Path = DEFAULT_STORE_DIR, force: bool = False) -> List[Path]:
+    written = []
+    for csv_path in sorted(Path(raw_dir).glob("*.csv")):
+        out = convert_csv(csv_path, store_dir, force=force)
+        print(f"{'Converted' if out else 'Up to date'}: {csv_path.name}")
+        if out:
+            written.append(out)
+    return written
+
+
+# -------------------------
+# Read API
+# -------------------------
+
+def _resolve(name_or_path, store_dir: Path) -> Path:
+    p = Path(name_or_path)
+    if p.suffix == ".arrow":
+        return p
+    return Path(store_dir) / (p.stem + ".arrow")
+
+
+def open_table(name_or_path, columns: Optional[List[str]] = None, store_dir: Path = DEFAULT_STORE_DIR) -> pa.Table:
+    """
+    Memory-map a converted dataset (by stem, CSV path or .arrow path) and return only `columns`.
+    Buffers reference the mapped file; nothing outside the selected columns is read.
+    """
+    return feather.read_table(_resolve(name_or_path, store_dir), columns=columns, memory_map=True)
+
+
+def read_frame(name_or_path, columns: Optional[List[str]] = None, store_dir: Path = DEFAULT_STORE_DIR) -> pd.DataFrame:
+    """pandas view of open_table(); dictionary columns become categoricals."""
+    return open_table(name_or_path, columns, store_dir).to_pandas()
+
+
+def export_csv(name_or_path, out_csv: Path, store_dir: Path = DEFAULT_STORE_DIR) -> None:
+    table = open_table(name_or_path, store_dir=store_dir)
+    Path(out_csv).parent.mkdir(parents=True, exist_ok=True)
+    table.to_pandas().to_csv(out_csv, index=False, encoding="utf-8-sig")
+
+
+# -------------------------
+# CLI
+# -------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Memory-mapped Arrow copies of data/raw CSVs")
+    ap.add_argument("command", choices=["convert", "info", "export"])
+    ap.add_argument("name", nargs="?", help="Dataset stem for export (e.g. usa_tariffs_2013_2025)")
+    ap.add_argument("--raw", type=str, default=str(DEFAULT_RAW_DIR))
+    ap.add_argument("--store", type=str, default=str(DEFAULT_STORE_DIR))
+    ap.add_argument("--out", type=str, help="CSV path for export")
+    ap.add_argument("--force", action="store_true", help="Re-convert even if the copy is current")
+    args = ap.parse_args()
+
+    store_dir = Path(args.store)
+    if args.command == "convert":
+        convert_all(Path(args.raw), store_dir, force=args.force)
+    elif args.command == "info":
+        for path in sorted(store_dir.glob("*.arrow")):
+            schema = open_table(path, columns=[]).schema
+            n_rows = feather.read_table(path, memory_map=True).num_rows
+            family = (schema.metadata or {}).get(b"family", b"?").decode()
+            print(f"{path.name}: {n_rows} rows, {len(schema.names)} columns [{family}]")
+    else:
+        if not args.name or not args.out:
+            ap.error("export needs a dataset name and --out")
+        export_csv(args.name, Path(args.out), store_dir)
+        print(f"Exported {args.name} -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
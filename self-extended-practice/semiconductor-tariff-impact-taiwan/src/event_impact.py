@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Event-window impact engine -> data/processed/event_impact_summary.csv
+
+For every policy event x window x market, the engine computes the average export value
+and the average yearly share (of all markets excluding "Others") over the `w` periods
+before the event and the `w` periods after it. The event period itself is in neither
+window, and windows are clipped at the panel's edges. All events and windows come from
+one cumulative-sum array per statistic:
+
+    sum over periods [lo, hi) = C[hi] - C[lo],   C = cumsum of the (periods x markets) panel
+
+so the cost is a gather over (events x windows x markets) and does not depend on the
+window length. The panel comes from trade_cube (the yearly or monthly partner rollup). A
+monthly panel takes YYYYMM event periods; a bare event year there means January.
+
+Output schema: EventYear, Event, Market, PreAvg_USD, PostAvg_USD, Delta_USD,
+PreAvg_Share, PostAvg_Share, Delta_Share. A Window column follows Event when more than
+one window is requested; EventYear is named EventPeriod for monthly panels.
+"TOTAL (All markets)" is the sum over every market except "Others", so its share is 1.
+
+Usage:
+    python src/event_impact.py
+    python src/event_impact.py --windows 1 2 3 4 5 --markets all --out output/event_impact_sweep.csv
+    python src/event_impact.py --cube data/cube/customs.npz --events-only
+"""
+
+from __future__ import annotations
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import trade_cube as tc
+
+MARKETS = ["China", "United States", "Hong Kong", "Singapore", "Malaysia", "Vietnam", "Japan", "South Korea"]
+TOTAL_LABEL = "TOTAL (All markets)"
+STATS = ["PreAvg_USD", "PostAvg_USD", "Delta_USD", "PreAvg_Share", "PostAvg_Share", "Delta_Share"]
+
+
+def _ordinal(periods: np.ndarray) -> np.ndarray:
+    """YYYY -> year, YYYYMM -> months since year 0."""
+    p = np.asarray(periods, dtype=np.int64)
+    return np.where(p > 9999, (p // 100) * 12 + p % 100 - 1, p)
+
+
+@dataclass
+class ExportPanel:
+    """Dense (periods x markets) export values over a contiguous period range."""
+    periods: np.ndarray       # YYYY or YYYYMM labels, contiguous
+    markets: np.ndarray
+    values: np.ndarray
+
+    @property
+    def monthly(self) -> bool:
+        return bool(len(self.periods)) and int(self.periods.max()) > 9999
+
+    @classmethod
+    def from_arrays(cls, periods: Sequence[int], markets: Sequence[str], values: np.ndarray) -> "ExportPanel":
+        """Reindex to a contiguous period range; missing periods get zero exports."""
+        periods = np.asarray(periods, dtype=np.int64)
+        ords = _ordinal(periods)
+        full = np.arange(ords.min(), ords.max() + 1)
+        dense = np.zeros((len(full), len(markets)))
+        dense[ords - full[0]] = values
+        labels = full if int(periods.max()) <= 9999 else (full // 12) * 100 + full % 12 + 1
+        return cls(labels, np.asarray(markets, dtype=str), dense)
+
+    @classmethod
+    def from_cube(cls, cube: tc.TradeCube, by: str = "partner", exclude: Sequence[str] = ("Others",),
+                  **where) -> "ExportPanel":
+        period = "month" if cube.monthly else "year"
+        values, _, r = cube.view((period, by), **where)
+        labels = r.coords[by]
+        keep = ~np.isin(np.char.lower(labels), [e.lower() for e in exclude])
+        return cls.from_arrays(r.coords[period].astype(np.int64), labels[keep], values[:, keep])
+
+
+def load_events(csv: Path) -> pd.DataFrame:
+    """One row per event period (the tariff table repeats each year per HS line); no event -> "None"."""
+    df = pd.read_csv(csv, encoding="utf-8-sig", usecols=["Year", "Policy Event"])
+    df = df.drop_duplicates("Year").sort_values("Year")
+    return pd.DataFrame({"Period": df["Year"].astype(np.int64).to_numpy(),
+                         "Event": df["Policy Event"].fillna("None").astype(str).to_numpy()})
+
+
+def window_stats(panel: ExportPanel, event_periods: Sequence[int], windows: Sequence[int]) -> Dict[str, np.ndarray]:
+    """
+    Pre/post averages of value and share for every event x window x (market + TOTAL column):
+    arrays of shape (events, windows, markets + 1), NaN where a window has no periods.
+    """
+    values = np.column_stack([panel.values, panel.values.sum(axis=1)])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        shares = np.nan_to_num(values / values[:, -1:])
+    zero = np.zeros((1, values.shape[1]))
+    cum_v = np.vstack([zero, np.cumsum(values, axis=0)])
+    cum_s = np.vstack([zero, np.cumsum(shares, axis=0)])
+
+    ords = _ordinal(panel.periods)
+    ev = np.asarray(event_periods, dtype=np.int64)
+    if panel.monthly:
+        ev = np.where(ev <= 9999, ev * 100 + 1, ev)
+    pos = (_ordinal(ev) - ords[0])[:, None]                     # (E, 1), may fall outside the panel
+    w = np.asarray(windows, dtype=np.int64)[None, :]            # (1, W)
+    n_periods = len(ords)
+    bounds = {
+        "Pre": (np.clip(pos - w, 0, n_periods), np.clip(pos, 0, n_periods)),
+        "Post": (np.clip(pos + 1, 0, n_periods), np.clip(pos + 1 + w, 0, n_periods)),
+    }
+    out = {}
+    for side, (lo, hi) in bounds.items():
+        n = (hi - lo)[..., None].astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[f"{side}Avg_USD"] = np.where(n > 0, (cum_v[hi] - cum_v[lo]) / n, np.nan)
+            out[f"{side}Avg_Share"] = np.where(n > 0, (cum_s[hi] - cum_s[lo]) / n, np.nan)
+    out["Delta_USD"] = out["PostAvg_USD"] - out["PreAvg_USD"]
+    out["Delta_Share"] = out["PostAvg_Share"] - out["PreAvg_Share"]
+    return out
+
+
+def impact_summary(panel: ExportPanel, events: pd.DataFrame, windows: Sequence[int] = (2,),
+                   markets: Optional[Sequence[str]] = MARKETS) -> pd.DataFrame:
+    """event_impact_summary rows (event x window x market, markets in the given order then TOTAL)."""
+    if markets is None:
+        markets = list(panel.markets)
+    index = {m: i for i, m in enumerate(panel.markets)}
+    missing = [m for m in markets if m not in index]
+    if missing:
+        print(f"⚠️ Not in the export panel, skipped: {', '.join(missing)}")
+    markets = [m for m in markets if m in index]
+    cols = np.array([index[m] for m in markets] + [len(panel.markets)])
+
+    stats = window_stats(panel, events["Period"].to_numpy(), windows)
+    n_ev, n_win, n_mk = len(events), len(windows), len(cols)
+    event_codes, event_names = pd.factorize(events["Event"])
+    data = {
+        "EventPeriod" if panel.monthly else "EventYear": np.repeat(events["Period"].to_numpy(), n_win * n_mk),
+        "Event": pd.Categorical.from_codes(np.repeat(event_codes, n_win * n_mk), categories=event_names),
+    }
+    if n_win > 1:
+        data["Window"] = np.tile(np.repeat(np.asarray(windows), n_mk), n_ev)
+    data["Market"] = pd.Categorical.from_codes(np.tile(np.arange(n_mk), n_ev * n_win),
+                                               categories=[*markets, TOTAL_LABEL])
+    for name in STATS:
+        data[name] = stats[name][:, :, cols].reshape(-1)
+    return pd.DataFrame(data)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Pre/post event-window export impact per market")
+    ap.add_argument("--events", type=str, default="data/processed/us_tariffs_with_policy_events.csv")
+    ap.add_argument("--raw", type=str, default="data/raw/taiwan_exports_by_country_2013_2025.csv")
+    ap.add_argument("--mapping", type=str, default="data/mappings/country_name_map_full.json")
+    ap.add_argument("--cube", type=str, default=None, help="Prebuilt trade_cube .npz instead of --raw")
+    ap.add_argument("--windows", type=int, nargs="+", default=[2], help="Periods before / after the event")
+    ap.add_argument("--markets", nargs="+", default=MARKETS, help='Market names, or "all"')
+    ap.add_argument("--events-only", action="store_true", help="Skip periods without a named policy event")
+    ap.add_argument("--out", type=str, default="data/processed/event_impact_summary.csv")
+    args = ap.parse_args()
+
+    cube = tc.TradeCube.load(Path(args.cube)) if args.cube else tc.customs_cube(Path(args.raw), Path(args.mapping))
+    panel = ExportPanel.from_cube(cube)
+    events = load_events(Path(args.events))
+    if args.events_only:
+        events = events[events["Event"] != "None"]
+    markets = None if args.markets == ["all"] else args.markets
+
+    df = impact_summary(panel, events, args.windows, markets)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(out, index=False, encoding="utf-8-sig")
+    print(f"✅ Saved event impact summary -> {out.as_posix()} "
+          f"({len(events)} events x {len(args.windows)} windows, {len(df)} rows)")
+
+
+if __name__ == "__main__":
+    main()
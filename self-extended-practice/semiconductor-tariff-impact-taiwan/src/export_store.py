@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persisted Year x Country_EN x HS-prefix aggregate store for the customs exports CSV.
+
+Appending monthly customs rows to the raw CSV should not force a full re-read:
+the store remembers how many bytes of each source it has already folded in and
+only parses the bytes appended since then. The Top10 avg/trend tables are then
+recomputed from the (small) aggregate table alone.
+
+Store layout (default data/processed/store/):
+- aggregates.csv : Source, Year, Country, Country_EN, HS_Prefix, Export_USD (sum), Rows (count)
+- manifest.json  : per-source byte offset, header line and fingerprints
+
+Sources are keyed by resolved path, so extracts with the same file name in
+different directories are tracked separately. A source is re-ingested from
+scratch when its already-ingested bytes look changed (size shrank, or the
+first/last 64 KiB before the offset differ). A new country mapping JSON only
+re-maps Country -> Country_EN on the stored rows; no source is re-read.
+
+A last line without a trailing newline is held back while the file is still
+growing (it may be a half-written row). It is ingested on a rebuild, or once
+the file size is unchanged since the previous run. If such a row is later
+extended in place, the source is rebuilt.
+
+Usage:
+    python src/export_store.py update --raw data/raw/taiwan_exports_by_country_2013_2025.csv
+    python src/export_store.py tables --processed data/processed
+    python src/export_store.py check  --raw data/raw/taiwan_exports_by_country_2013_2025.csv
+"""
+
+from __future__ import annotations
+import argparse
+import io
+import sys
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))  # shared by both projects
+from atomic_io import atomic_path, atomic_write_json, load_json, sha256_bytes, sha256_file  # noqa: E402
+from plot_exports import (  # noqa: E402
+    READ_DTYPES,
+    REQUIRED_COLUMNS,
+    USED_COLUMNS,
+    aggregate_year_country,
+    english_names,
+    load_country_map,
+    write_top10_tables,
+)
+
+STORE_VERSION = 2
+AGG_FILE = "aggregates.csv"
+MANIFEST_FILE = "manifest.json"
+AGG_KEYS = ["Source", "Year", "Country", "Country_EN", "HS_Prefix"]
+FINGERPRINT_BYTES = 64 * 1024
+
+
+# -------------------------
+# Manifest / fingerprints
+# -------------------------
+
+def _fingerprint(path: Path, offset: int) -> Dict[str, str]:
+    """Hash the first and last FINGERPRINT_BYTES of the already-ingested prefix [0, offset)."""
+    with path.open("rb") as f:
+        head = f.read(min(offset, FINGERPRINT_BYTES))
+        f.seek(max(0, offset - FINGERPRINT_BYTES))
+        tail = f.read(min(offset, FINGERPRINT_BYTES))
+    return {"head_sha256": sha256_bytes(head), "tail_sha256": sha256_bytes(tail)}
+
+
+def _load_manifest(store_dir: Path) -> dict:
+    manifest = load_json(store_dir / MANIFEST_FILE, {})
+    if manifest.get("version") != STORE_VERSION:
+        manifest = {"version": STORE_VERSION, "mapping_sha256": None, "sources": {}}
+    return manifest
+
+
+def _empty_store() -> pd.DataFrame:
+    return pd.DataFrame({
+        "Source": pd.Series(dtype=str), "Year": pd.Series(dtype="int64"),
+        "Country": pd.Series(dtype=str), "Country_EN": pd.Series(dtype=str),
+        "HS_Prefix": pd.Series(dtype=str),
+        "Export_USD": pd.Series(dtype="float64"), "Rows": pd.Series(dtype="int64"),
+    })
+
+
+def load_store(store_dir: Path) -> pd.DataFrame:
+    path = store_dir / AGG_FILE
+    if not path.exists():
+        return _empty_store()
+    return pd.read_csv(path, dtype={"Source": str, "Country": str, "Country_EN": str, "HS_Prefix": str},
+                       float_precision="round_trip", keep_default_na=False)
+
+
+def _remap(store: pd.DataFrame, cmap: Dict[str, str]) -> pd.DataFrame:
+    """Recompute Country_EN from the stored Country names under a new mapping."""
+    return store.assign(Country_EN=english_names(store["Country"].astype("category"), cmap))
+
+
+# -------------------------
+# Delta ingestion
+# -------------------------
+
+def _aggregate_rows(df: pd.DataFrame, source: str, cmap: Dict[str, str], hs_len: int) -> pd.DataFrame:
+    df = df.rename(columns=str.strip).dropna(subset=["Year", "Export Value (USD)"])
+    country = df["Country"].str.strip().fillna("")
+    df = df.assign(
+        Source=source,
+        Year=df["Year"].astype("int64"),
+        Country=country,
+        Country_EN=english_names(country.astype("category"), cmap),
+        HS_Prefix=df["HS Code"].str.strip().str[:hs_len].fillna(""),
+    )
+    return (df.groupby(AGG_KEYS, as_index=False)
+              .agg(Export_USD=("Export Value (USD)", "sum"), Rows=("Export Value (USD)", "size")))
+
+
+def _parse_rows(data: bytes, names: Dict[str, str], chunksize: int):
+    """Typed chunks of header + delta bytes; malformed numbers are coerced to NaN like read_exports."""
+    try:
+        reader = pd.read_csv(io.BytesIO(data), usecols=[names[c] for c in USED_COLUMNS],
+                             dtype={names[c]: t for c, t in READ_DTYPES.items()},
+                             encoding="utf-8-sig", float_precision="round_trip", chunksize=chunksize)
+        return [c.rename(columns=str.strip) for c in reader]
+    except ValueError:
+        text = {names[c]: "string" for c in USED_COLUMNS}
+        reader = pd.read_csv(io.BytesIO(data), usecols=list(text), dtype=text, encoding="utf-8-sig",
+                             chunksize=chunksize)
+        chunks = []
+        for c in reader:
+            c = c.rename(columns=str.strip)
+            for col in ("Year", "Export Value (USD)"):
+                c[col] = pd.to_numeric(c[col], errors="coerce")
+            chunks.append(c)
+        return chunks
+
+
+def _read_delta(path: Path, key: str, header: bytes, offset: int, cmap, hs_len: int, chunksize: int,
+                to_eof: bool):
+    """
+    Parse bytes [offset, last complete line) and aggregate them; with to_eof, EOF also ends
+    the last record. Returns (agg, new_offset, rows).
+    """
+    with path.open("rb") as f:
+        f.seek(offset)
+        data = f.read()
+    if not to_eof:
+        data = data[: data.rfind(b"\n") + 1]  # leave a partial last line for the next run
+    if not data.strip():
+        return None, offset, 0
+
+    names = {c.strip(): c for c in pd.read_csv(io.BytesIO(header), nrows=0, encoding="utf-8-sig").columns}
+    missing = REQUIRED_COLUMNS - set(names)
+    if missing:
+        raise ValueError(f"Missing required columns in {path}: {sorted(missing)}")
+
+    parts, rows = [], 0
+    for chunk in _parse_rows(header + data, names, chunksize):
+        rows += len(chunk)
+        parts.append(_aggregate_rows(chunk, key, cmap, hs_len))
+    agg = pd.concat(parts, ignore_index=True)
+    return agg, offset + len(data), rows
+
+
+def _mid_row(path: Path, offset: int) -> bool:
+    """True when the byte at offset is row content (not a line break or EOF)."""
+    with path.open("rb") as f:
+        f.seek(offset)
+        return f.read(1) not in (b"", b"\n", b"\r")
+
+
+def update_store(
+    raw_csv: Path,
+    mapping_json: Path,
+    store_dir: Path = Path("data/processed/store"),
+    hs_len: int = 4,
+    chunksize: int = 200_000,
+) -> dict:
+    """Fold rows appended to raw_csv since the last run into the store. Returns run statistics."""
+    raw_csv, store_dir = Path(raw_csv), Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    manifest = _load_manifest(store_dir)
+    store = load_store(store_dir) if manifest["sources"] else _empty_store()
+    cmap = load_country_map(Path(mapping_json))
+
+    mapping_sha = sha256_file(Path(mapping_json))
+    remapped = manifest["mapping_sha256"] != mapping_sha
+    if remapped:
+        # only Country_EN depends on the mapping; the raw Country names are stored alongside
+        if len(store):
+            store = _remap(store, cmap)
+            print(f"[store] country mapping changed: re-mapped {len(store)} aggregate rows "
+                  f"of {len(manifest['sources'])} source(s)")
+        manifest["mapping_sha256"] = mapping_sha
+
+    key = str(raw_csv.resolve())
+    with raw_csv.open("rb") as f:
+        header = f.readline()
+    size = raw_csv.stat().st_size
+    entry = manifest["sources"].get(key)
+
+    mode = "append"
+    if entry is not None and (
+        size < entry["offset"]
+        or entry["header"] != header.decode("utf-8")
+        or _fingerprint(raw_csv, entry["offset"]) != entry["fingerprint"]
+        or entry.get("hs_len") != hs_len
+        or (entry.get("eof_row") and _mid_row(raw_csv, entry["offset"]))
+    ):
+        entry = None
+    if entry is None:
+        mode = "rebuild"
+        store = store[store["Source"] != key]
+        entry = {"offset": len(header), "rows": 0, "header": header.decode("utf-8"), "hs_len": hs_len}
+
+    # EOF ends the last row on a rebuild, or when nothing was appended since the previous run
+    to_eof = mode == "rebuild" or size == entry.get("size")
+    delta, new_offset, delta_rows = _read_delta(raw_csv, key, header, entry["offset"], cmap, hs_len,
+                                                chunksize, to_eof)
+    if delta is None and mode == "append" and size == entry.get("size") and not remapped:
+        return {"source": key, "mode": "noop", "delta_rows": 0, "store_rows": len(store)}
+
+    if delta is not None:
+        parts = [store, delta] if len(store) else [delta]
+        store = (pd.concat(parts, ignore_index=True)
+                   .groupby(AGG_KEYS, as_index=False)[["Export_USD", "Rows"]].sum())
+    entry.update(offset=new_offset, rows=entry["rows"] + delta_rows, size=size,
+                 eof_row=to_eof and new_offset == size and _mid_row(raw_csv, new_offset - 1),
+                 fingerprint=_fingerprint(raw_csv, new_offset))
+    manifest["sources"][key] = entry
+
+    with atomic_path(store_dir / AGG_FILE) as tmp:
+        store.to_csv(tmp, index=False)
+    atomic_write_json(store_dir / MANIFEST_FILE, manifest, ensure_ascii=False, indent=2)
+    return {"source": key, "mode": mode, "delta_rows": delta_rows, "store_rows": len(store)}
+
+
+# -------------------------
+# Queries
+# -------------------------
+
+def year_country_from_store(
+    store_dir: Path = Path("data/processed/store"),
+    year_min: int = 2013,
+    year_max: int = 2025,
+    hs_prefix: str = "8542",
+) -> pd.DataFrame:
+    """Year x Country_EN export sums, same shape as plot_exports.aggregate_year_country."""
+    store = load_store(Path(store_dir))
+    if len(store) and len(hs_prefix) > store["HS_Prefix"].str.len().max():
+        raise ValueError(f"HS prefix {hs_prefix!r} is longer than the stored prefix length")
+    keep = store["Year"].between(year_min, year_max) & store["HS_Prefix"].str.startswith(hs_prefix)
+    return (store[keep].groupby(["Year", "Country_EN"], as_index=False)["Export_USD"].sum())
+
+
+def tables_from_store(
+    store_dir: Path = Path("data/processed/store"),
+    year_min: int = 2013,
+    year_max: int = 2025,
+    include_others: bool = False,
+    processed_dir: Path = Path("data/processed"),
+) -> pd.DataFrame:
+    """Write top10_export_markets_{avg,trend}_*.csv from the store alone; return the Top10 trend rows."""
+    year_country = year_country_from_store(store_dir, year_min, year_max)
+    return write_top10_tables(year_country, include_others, processed_dir)
+
+
+def check_consistency(
+    raw_csv: Path,
+    mapping_json: Path,
+    store_dir: Path = Path("data/processed/store"),
+    year_min: int = 2013,
+    year_max: int = 2025,
+    rtol: float = 1e-9,
+) -> float:
+    """Compare the store against a full rebuild from raw_csv. Returns the max relative difference."""
+    full = aggregate_year_country(Path(raw_csv), Path(mapping_json), year_min, year_max)
+    inc = year_country_from_store(store_dir, year_min, year_max)
+    merged = full.merge(inc, on=["Year", "Country_EN"], how="outer", suffixes=("_full", "_store"), indicator=True)
+    if (merged["_merge"] != "both").any():
+        extra = merged.loc[merged["_merge"] != "both", ["Year", "Country_EN", "_merge"]]
+        raise AssertionError(f"Store and full rebuild have different keys:\n{extra.head(10)}")
+    a, b = merged["Export_USD_full"].to_numpy(), merged["Export_USD_store"].to_numpy()
+    rel = float(np.max(np.abs(a - b) / np.maximum(np.abs(a), 1.0), initial=0.0))
+    if rel > rtol:
+        raise AssertionError(f"Store differs from full rebuild: max relative diff {rel:.3e} > {rtol:.1e}")
+    return rel
+
+
+# -------------------------
+# CLI
+# -------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Incremental Year x Country x HS aggregate store")
+    ap.add_argument("command", choices=["update", "tables", "check"])
+    ap.add_argument("--raw", type=str, default="data/raw/taiwan_exports_by_country_2013_2025.csv")
+    ap.add_argument("--mapping", type=str, default="data/mappings/country_name_map_full.json")
+    ap.add_argument("--store", type=str, default="data/processed/store")
+    ap.add_argument("--processed", type=str, default="data/processed")
+    ap.add_argument("--year-min", type=int, default=2013)
+    ap.add_argument("--year-max", type=int, default=2025)
+    ap.add_argument("--include-others", action="store_true")
+    args = ap.parse_args()
+
+    store_dir = Path(args.store)
+    if args.command == "update":
+        stats = update_store(Path(args.raw), Path(args.mapping), store_dir)
+        print(f"Store {stats['mode']}: {stats['source']} +{stats['delta_rows']} rows "
+              f"({stats['store_rows']} aggregate rows)")
+    elif args.command == "tables":
+        top10 = tables_from_store(store_dir, args.year_min, args.year_max, args.include_others, Path(args.processed))
+        print(f"Top10 tables written from store ({len(top10)} trend rows) -> {args.processed}")
+    else:
+        rel = check_consistency(Path(args.raw), Path(args.mapping), store_dir, args.year_min, args.year_max)
+        print(f"Store matches full rebuild ✅ (max relative diff {rel:.2e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Panel regressions with absorbed fixed effects, for the TWFE and event-study models of
+notebooks/online_ic_regression.ipynb.
+
+Instead of expanding C(Country) + C(Year) into dummy columns through patsy, the fixed
+effects are removed by alternating projections (within transformation; exact after one
+sweep for a balanced two-way panel). By Frisch–Waugh–Lovell, OLS of the demeaned outcome
+on the demeaned regressors gives the same coefficients and residuals as the dummy
+regression. The HAC / HC0 sandwich for those coefficients is the same too, as long as
+rows keep their original order. The outcome is demeaned once per panel. Every
+regressor of every specification is demeaned in one batch, and each specification is
+then a small dense solve.
+
+Agreement with statsmodels `smf.ols(...).fit(cov_type="HAC", cov_kwds={"maxlags": 1})`
+on the TW_* terms: coefficients, standard errors and CI bounds within 1e-8 absolute
+(benchmarks/check_panel_fe.py). Fixed-effect coefficients themselves are not
+estimated, so the output tables carry the TW_* rows only; the plotting cells filter
+to those rows anyway. The TWFE table therefore goes to regression_results_TWFE_TW.csv,
+leaving the notebook's full regression_results_TWFE.csv (Intercept, C(Country), C(Year)
+rows included) untouched.
+
+Usage:
+    python src/panel_fe.py --input data/processed/ic_exports_comparison.csv --outdir output/regression
+"""
+
+from __future__ import annotations
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# TW_* rows only; the notebook's full coefficient table keeps its own file name
+TWFE_TW_FILE = "regression_results_TWFE_TW.csv"
+
+TWFE_EVENTS = {
+    "TradeWar2018": 2018,   # 美中貿易戰
+    "Covid2020": 2020,      # 新冠疫情
+    "ChipShort2021": 2021,  # 全球晶片荒
+    "ChipAct2022": 2022,    # 美國CHIPS法案
+    "USBan2023": 2023,      # AI GPU 對中出口管制
+}
+EVENT_STUDIES = [
+    {"year": 2020, "label": "Covid2020", "leads": 3, "lags": 3},
+    {"year": 2022, "label": "ChipAct2022", "leads": 3, "lags": 3},
+]
+COV_TYPES = ("HAC", "HC0", "nonrobust")
+
+
+# -------------------------
+# Fixed-effect absorption
+# -------------------------
+
+class _Grouping:
+    """One fixed-effect dimension: dense codes plus a sort order for reduceat group sums."""
+
+    def __init__(self, values: Sequence):
+        self.codes, self.levels = pd.factorize(np.asarray(values), sort=True)
+        if (self.codes < 0).any():
+            raise ValueError("Fixed-effect column contains missing values")
+        self.order = np.argsort(self.codes, kind="stable")
+        sorted_codes = self.codes[self.order]
+        self.starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        self.counts = np.diff(np.r_[self.starts, len(self.codes)])
+
+    def demean(self, m: np.ndarray) -> np.ndarray:
+        means = np.add.reduceat(m[self.order], self.starts, axis=0) / self.counts[:, None]
+        return m - means[self.codes]
+
+
+def absorb(m: np.ndarray, groupings: List[_Grouping], tol: float = 1e-13, max_iter: int = 10_000) -> np.ndarray:
+    """Alternating projections: sweep out each fixed effect until the matrix stops changing."""
+    m = np.asarray(m, dtype=np.float64)
+    m = m.reshape(len(m), -1).copy()
+    scale = max(float(np.abs(m).max(initial=0.0)), 1.0)
+    for _ in range(max_iter):
+        prev = m
+        for g in groupings:
+            m = g.demean(m)
+        if np.abs(m - prev).max(initial=0.0) <= tol * scale:
+            return m
+    raise RuntimeError(f"Fixed-effect absorption did not converge in {max_iter} sweeps")
+
+
+def _fe_rank(groupings: List[_Grouping]) -> int:
+    """Columns the dummy expansion (with intercept) would contribute: levels minus connected components."""
+    if not groupings:
+        return 1
+    if len(groupings) == 1:
+        return len(groupings[0].levels)
+    if len(groupings) > 2:
+        raise ValueError("nonrobust covariance supports at most two fixed effects")
+    a, b = groupings
+    parent = list(range(len(a.levels) + len(b.levels)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in set(zip(a.codes.tolist(), (b.codes + len(a.levels)).tolist())):
+        parent[find(i)] = find(j)
+    components = len({find(i) for i in range(len(parent))})
+    return len(parent) - components
+
+
+# -------------------------
+# Estimation
+# -------------------------
+
+@dataclass
+class FEResult:
+    names: List[str]
+    params: np.ndarray
+    bse: np.ndarray
+    nobs: int
+    cov_type: str
+    df_resid: Optional[float] = None
+
+    def table(self, alpha: float = 0.05) -> pd.DataFrame:
+        """
+        statsmodels summary2-style table: normal inference for robust covariances (as with
+        fit(cov_type=...)), Student t on df_resid for nonrobust (as with a plain fit()).
+        """
+        dist = stats.t(self.df_resid) if self.cov_type == "nonrobust" else stats.norm
+        stat = "t" if self.cov_type == "nonrobust" else "z"
+        q = dist.ppf(1 - alpha / 2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = self.params / self.bse
+        return pd.DataFrame({
+            "variable": self.names,
+            "Coef.": self.params,
+            "Std.Err.": self.bse,
+            stat: z,
+            f"P>|{stat}|": 2 * dist.sf(np.abs(z)),
+            "[0.025": self.params - q * self.bse,
+            "0.975]": self.params + q * self.bse,
+        })
+
+
+class FEPanel:
+    """
+    A panel with its outcome demeaned once; fit() / fit_many() absorb the same fixed
+    effects from any regressors and solve OLS on the demeaned data.
+    Row order is kept as given (HAC treats rows as the time order, like statsmodels).
+    """
+
+    def __init__(self, df: pd.DataFrame, y: str, fe: Sequence[str] = ("Country", "Year")):
+        self.df = df.reset_index(drop=True)
+        self.groupings = [_Grouping(self.df[c].to_numpy()) for c in fe]
+        self.y = absorb(self.df[y].to_numpy(dtype=np.float64), self.groupings)[:, 0]
+        self.nobs = len(self.df)
+
+    def fit(self, X: pd.DataFrame, cov_type: str = "HAC", maxlags: int = 1) -> FEResult:
+        return self.fit_many({"_": X}, cov_type, maxlags)["_"]
+
+    def fit_many(self, specs: Dict[str, pd.DataFrame], cov_type: str = "HAC", maxlags: int = 1) -> Dict[str, FEResult]:
+        """Fit several specifications; all their regressor columns are demeaned in one batch."""
+        if cov_type not in COV_TYPES:
+            raise ValueError(f"cov_type must be one of {COV_TYPES}")
+        blocks = [np.asarray(X, dtype=np.float64).reshape(self.nobs, -1) for X in specs.values()]
+        demeaned = absorb(np.hstack(blocks), self.groupings) if blocks else np.empty((self.nobs, 0))
+        out, start = {}, 0
+        for (name, X), block in zip(specs.items(), blocks):
+            Xt = demeaned[:, start:start + block.shape[1]]
+            start += block.shape[1]
+            out[name] = self._solve(list(X.columns), Xt, cov_type, maxlags)
+        return out
+
+    def _solve(self, names: List[str], Xt: np.ndarray, cov_type: str, maxlags: int) -> FEResult:
+        pinv_x = np.linalg.pinv(Xt)            # same pseudo-inverse route as statsmodels OLS
+        beta = pinv_x @ self.y
+        bread = pinv_x @ pinv_x.T               # (X'X)^+
+        resid = self.y - Xt @ beta
+        dof = self.nobs - np.linalg.matrix_rank(Xt) - _fe_rank(self.groupings)
+        if cov_type == "nonrobust":
+            cov = bread * (resid @ resid) / dof
+        else:
+            xu = Xt * resid[:, None]
+            meat = xu.T @ xu
+            if cov_type == "HAC":
+                for lag in range(1, maxlags + 1):  # Bartlett kernel, no small-sample correction
+                    s = xu[lag:].T @ xu[:-lag]
+                    meat += (1 - lag / (maxlags + 1)) * (s + s.T)
+            cov = bread @ meat @ bread
+        return FEResult(names, beta, np.sqrt(np.clip(np.diag(cov), 0, None)), self.nobs, cov_type, dof)
+
+
+# -------------------------
+# Notebook models
+# -------------------------
+
+def prepare_panel(df: pd.DataFrame, countries: Optional[List[str]] = None) -> pd.DataFrame:
+    """Same preparation as the notebook: Country/Year sort, positive exports, log outcome."""
+    df = df.copy()
+    if countries is not None:
+        df = df[df["Country"].isin(countries)]
+    df["Year"] = df["Year"].astype(int)
+    df["ExportValue(USD)"] = pd.to_numeric(df["ExportValue(USD)"], errors="coerce")
+    df = df.dropna(subset=["ExportValue(USD)"])
+    df = df.sort_values(["Country", "Year"]).reset_index(drop=True)
+    df["log_exports"] = np.log(df["ExportValue(USD)"])
+    return df
+
+
+def twfe_regressors(df: pd.DataFrame, events: Dict[str, int] = TWFE_EVENTS, treated: str = "Taiwan") -> pd.DataFrame:
+    is_tw = (df["Country"] == treated).to_numpy()
+    year = df["Year"].to_numpy()
+    return pd.DataFrame({f"TW_{ev}": ((year >= yr) & is_tw).astype(np.float64) for ev, yr in events.items()})
+
+
+def event_study_regressors(df: pd.DataFrame, event_year: int, event_label: str, leads: int = 3, lags: int = 3,
+                           treated: str = "Taiwan") -> pd.DataFrame:
+    """TW x 1[Year - event_year == k] for k in -leads..lags, k = -1 omitted (baseline)."""
+    rel = df["Year"].to_numpy() - int(event_year)
+    is_tw = (df["Country"] == treated).to_numpy()
+    cols = {}
+    for k in range(-leads, lags + 1):
+        if k == -1:
+            continue
+        suffix = f"m{abs(k)}" if k < 0 else f"p{k}"
+        cols[f"TW_ES_{event_label}_{suffix}"] = ((rel == k) & is_tw).astype(np.float64)
+    return pd.DataFrame(cols)
+
+
+def twfe_table(res: FEResult, model: str = "ModelB_TWFE(HAC)") -> pd.DataFrame:
+    """The TW_* rows of regression_results_TWFE.csv (same columns), written as TWFE_TW_FILE."""
+    tbl = res.table()
+    tbl.insert(0, "model", model)
+    return tbl
+
+
+def event_study_table(res: FEResult, event_label: str, leads: int = 3, lags: int = 3) -> pd.DataFrame:
+    """Same schema as event_study_<label>_coeffs.csv: k, term, coef, low, high, pct_approx(%), pct_exp(%)."""
+    tbl = res.table().set_index("variable")
+    rows = []
+    for k in sorted(set(range(-leads, lags + 1)) | {-1}):
+        if k == -1:
+            rows.append({"k": k, "term": f"baseline({k})", "coef": 0.0, "low": 0.0, "high": 0.0})
+            continue
+        term = f"TW_ES_{event_label}_{'m' if k < 0 else 'p'}{abs(k)}"
+        rows.append({"k": k, "term": term, "coef": tbl.at[term, "Coef."],
+                     "low": tbl.at[term, "[0.025"], "high": tbl.at[term, "0.975]"]})
+    res_df = pd.DataFrame(rows)
+    res_df["pct_approx(%)"] = res_df["coef"] * 100
+    res_df["pct_exp(%)"] = (np.exp(res_df["coef"]) - 1.0) * 100
+    return res_df
+
+
+def run_all(df: pd.DataFrame, events=TWFE_EVENTS, studies=EVENT_STUDIES, maxlags: int = 1) -> Dict[str, pd.DataFrame]:
+    """TWFE + every event study against one demeaned panel; returns {output file name: table}."""
+    panel_df = prepare_panel(df, countries=["China", "Rep. of Korea", "USA", "Taiwan"])
+    panel = FEPanel(panel_df, "log_exports", fe=("Country", "Year"))
+    specs = {"twfe": twfe_regressors(panel_df, events)}
+    for ev in studies:
+        specs[ev["label"]] = event_study_regressors(panel_df, ev["year"], ev["label"], ev["leads"], ev["lags"])
+    fits = panel.fit_many(specs, cov_type="HAC", maxlags=maxlags)
+
+    out = {TWFE_TW_FILE: twfe_table(fits["twfe"])}
+    for ev in studies:
+        out[f"event_study_{ev['label']}_coeffs.csv"] = event_study_table(fits[ev["label"]], ev["label"],
+                                                                         ev["leads"], ev["lags"])
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="TWFE / event-study regressions with absorbed fixed effects")
+    ap.add_argument("--input", type=str, default="data/processed/ic_exports_comparison.csv")
+    ap.add_argument("--outdir", type=str, default="output/regression")
+    ap.add_argument("--maxlags", type=int, default=1)
+    args = ap.parse_args()
+
+    outdir = Path(args.outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    for name, tbl in run_all(pd.read_csv(args.input), maxlags=args.maxlags).items():
+        tbl.to_csv(outdir / name, index=False)
+        print(f"✅ Saved -> {(outdir / name).as_posix()}")
+
+
+if __name__ == "__main__":
+    main()
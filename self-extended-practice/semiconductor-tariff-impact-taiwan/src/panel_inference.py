@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resampling inference for the Taiwan event effects (TW_* terms) of the TWFE and
+event-study models in panel_fe.py.
+
+Two procedures:
+
+1. Wild cluster bootstrap-t (unrestricted, Webb six-point or Rademacher weights per
+   cluster, Country clusters by default). Each replicate is
+   y* = fitted + w_g * u. The replicate coefficients and their CR0 cluster-robust
+   standard errors are linear / quadratic in the weight vector w. The design is
+   therefore decomposed once per specification:
+       S[:, g]       = (X'X)^+ X' (u * 1_g)                  coefficient shift per cluster
+       C[h, :, g]    = X_h' M(u * 1_g)                       score of cluster h per cluster weight
+       H[h]          = X_h' X_h
+   Here M absorbs the fixed effects. A chunk of replicates is then a few batched
+   einsums over its (reps x clusters) weight matrix. Chunks run in a process pool.
+   Chunk i always draws from SeedSequence(seed).spawn(...)[i], so results do not
+   depend on the number of workers.
+
+2. Placebo-country permutation: the treatment is reassigned to every country in turn
+   (all specifications in one panel_fe.fit_many batch). The p-value is the share of
+   assignments whose |coef| is at least Taiwan's.
+
+Caveat: Taiwan is the only treated cluster, so every TW_* regressor lives in a single
+cluster. The wild cluster bootstrap is known to be unreliable in that case (MacKinnon &
+Webb, 2017). With four countries, the permutation p-value cannot go below 0.25.
+Read the two side by side with the HAC intervals.
+
+Output: the existing coefficient CSVs plus columns
+    regression_results_TWFE_inference.csv   ... [0.025, 0.975], boot_[0.025, boot_0.975], boot_P>|t|, perm_P
+    event_study_<label>_inference.csv       ... low, high, boot_low, boot_high, boot_p, perm_p
+
+Usage:
+    python src/panel_inference.py --reps 9999 --jobs 4 --seed 2025 --outdir output/regression
+"""
+
+from __future__ import annotations
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from panel_fe import (
+    EVENT_STUDIES,
+    TWFE_EVENTS,
+    FEPanel,
+    absorb,
+    event_study_regressors,
+    event_study_table,
+    prepare_panel,
+    twfe_regressors,
+    twfe_table,
+)
+
+WEIGHTS = ("webb", "rademacher")
+_WEBB = np.array([-np.sqrt(1.5), -1.0, -np.sqrt(0.5), np.sqrt(0.5), 1.0, np.sqrt(1.5)])
+COUNTRIES = ["China", "Rep. of Korea", "USA", "Taiwan"]
+
+
+# -------------------------
+# Wild cluster bootstrap
+# -------------------------
+
+@dataclass
+class WildDesign:
+    """Everything a replicate needs; small (k x G, G x k x G, G x k x k) and picklable."""
+    names: List[str]
+    beta: np.ndarray      # (k,)
+    se: np.ndarray        # (k,) CR0 cluster-robust SE of the original fit
+    bread: np.ndarray     # (k, k) (X'X)^+
+    S: np.ndarray         # (k, G)
+    C: np.ndarray         # (G, k, G)
+    H: np.ndarray         # (G, k, k)
+
+    @property
+    def n_clusters(self) -> int:
+        return self.S.shape[1]
+
+
+def wild_design(panel: FEPanel, X: pd.DataFrame, cluster: str = "Country") -> WildDesign:
+    """Decompose one specification for the wild cluster bootstrap (done once, reused by every replicate)."""
+    Xt = absorb(np.asarray(X, dtype=np.float64).reshape(panel.nobs, -1), panel.groupings)
+    pinv_x = np.linalg.pinv(Xt)
+    beta = pinv_x @ panel.y
+    resid = panel.y - Xt @ beta
+
+    codes, _ = pd.factorize(panel.df[cluster].to_numpy(), sort=True)
+    n_clusters = codes.max() + 1
+    onehot = np.zeros((panel.nobs, n_clusters))
+    onehot[np.arange(panel.nobs), codes] = 1.0
+    U = resid[:, None] * onehot                 # u * 1_g, one column per cluster
+    MU = absorb(U, panel.groupings)             # fixed effects swept out of every column
+
+    k = Xt.shape[1]
+    C = np.empty((n_clusters, k, n_clusters))
+    H = np.empty((n_clusters, k, k))
+    for h in range(n_clusters):
+        rows = codes == h
+        C[h] = Xt[rows].T @ MU[rows]
+        H[h] = Xt[rows].T @ Xt[rows]
+    bread = pinv_x @ pinv_x.T
+    S = pinv_x @ U
+
+    scores = C.sum(axis=2)                      # sum_g M(u * 1_g) = u, so this is X_h' u_h
+    se = np.sqrt(np.clip(np.einsum("kl,hl,hm,km->k", bread, scores, scores, bread), 0, None))
+    return WildDesign(list(X.columns), beta, se, bread, S, C, H)
+
+
+def draw_weights(rng: np.random.Generator, kind: str, reps: int, n_clusters: int) -> np.ndarray:
+    if kind == "webb":
+        return _WEBB[rng.integers(0, 6, size=(reps, n_clusters))]
+    if kind == "rademacher":
+        return rng.integers(0, 2, size=(reps, n_clusters)) * 2.0 - 1.0
+    raise ValueError(f"weights must be one of {WEIGHTS}")
+
+
+def bootstrap_stats(design: WildDesign, W: np.ndarray):
+    """Coefficient shifts (beta* - beta) and bootstrap t statistics for a (reps x G) weight matrix."""
+    delta = W @ design.S.T                                                  # (B, k)
+    scores = np.einsum("hkg,bg->bhk", design.C, W) - np.einsum("hkl,bl->bhk", design.H, delta)
+    meat = np.einsum("bhk,bhl->bkl", scores, scores)
+    se = np.sqrt(np.clip(np.einsum("kl,blm,km->bk", design.bread, meat, design.bread), 0, None))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return delta, delta / se
+
+
+def _bootstrap_chunk(design: WildDesign, kind: str, seed: np.random.SeedSequence, reps: int) -> np.ndarray:
+    W = draw_weights(np.random.default_rng(seed), kind, reps, design.n_clusters)
+    return bootstrap_stats(design, W)[1]
+
+
+def wild_cluster_bootstrap(
+    design: WildDesign,
+    reps: int = 9999,
+    weights: str = "webb",
+    seed: int = 0,
+    chunk: int = 2000,
+    jobs: int = 1,
+    alpha: float = 0.05,
+) -> pd.DataFrame:
+    """Percentile-t CIs and symmetric p-values; identical for any `jobs` given the same seed and chunk."""
+    sizes = [min(chunk, reps - start) for start in range(0, reps, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = min(jobs or os.cpu_count() or 1, len(sizes))
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parts = list(pool.map(_bootstrap_chunk, [design] * len(sizes), [weights] * len(sizes), seeds, sizes))
+    else:
+        parts = [_bootstrap_chunk(design, weights, s, n) for s, n in zip(seeds, sizes)]
+    t_star = np.vstack(parts)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_obs = design.beta / design.se
+    valid = np.isfinite(t_star)
+    q_lo = np.array([np.quantile(col[ok], alpha / 2) if ok.any() else np.nan for col, ok in zip(t_star.T, valid.T)])
+    q_hi = np.array([np.quantile(col[ok], 1 - alpha / 2) if ok.any() else np.nan for col, ok in zip(t_star.T, valid.T)])
+    p = np.where(valid.any(axis=0), (np.abs(t_star) >= np.abs(t_obs)).sum(axis=0) / valid.sum(axis=0).clip(1), np.nan)
+    return pd.DataFrame({
+        "variable": design.names,
+        "Coef.": design.beta,
+        "CR0 Std.Err.": design.se,
+        "boot_[0.025": design.beta - q_hi * design.se,
+        "boot_0.975]": design.beta - q_lo * design.se,
+        "boot_P>|t|": p,
+    })
+
+
+# -------------------------
+# Placebo-country permutation
+# -------------------------
+
+def placebo_permutation(
+    panel: FEPanel,
+    build: Callable[[str], pd.DataFrame],
+    units: Sequence[str],
+    actual: str = "Taiwan",
+) -> pd.DataFrame:
+    """Refit with the treatment moved to every unit (one fit_many batch); p = share with |coef| >= actual's."""
+    specs = {u: build(u) for u in units}
+    fits = panel.fit_many(specs, cov_type="nonrobust")
+    coefs = np.vstack([fits[u].params for u in units])            # (units, k)
+    obs = np.abs(fits[actual].params)
+    p = (np.abs(coefs) >= obs - 1e-12).mean(axis=0)
+    return pd.DataFrame({
+        "variable": fits[actual].names,
+        "perm_P": np.where(specs[actual].to_numpy().any(axis=0), p, np.nan),  # all-zero term: not identified
+        "perm_n": len(units),
+    })
+
+
+# -------------------------
+# Notebook models
+# -------------------------
+
+def run_inference(
+    df: pd.DataFrame,
+    reps: int = 9999,
+    weights: str = "webb",
+    seed: int = 0,
+    jobs: int = 1,
+    chunk: int = 2000,
+    events=TWFE_EVENTS,
+    studies=EVENT_STUDIES,
+    maxlags: int = 1,
+) -> Dict[str, pd.DataFrame]:
+    """HAC tables of panel_fe.run_all with bootstrap and permutation columns; returns {output file name: table}."""
+    panel_df = prepare_panel(df, countries=COUNTRIES)
+    panel = FEPanel(panel_df, "log_exports", fe=("Country", "Year"))
+    units = sorted(panel_df["Country"].unique())
+
+    builders: Dict[str, Callable[[str], pd.DataFrame]] = {"twfe": lambda c: twfe_regressors(panel_df, events, treated=c)}
+    for ev in studies:
+        builders[ev["label"]] = (lambda c, ev=ev: event_study_regressors(
+            panel_df, ev["year"], ev["label"], ev["leads"], ev["lags"], treated=c))
+    fits = panel.fit_many({name: b("Taiwan") for name, b in builders.items()}, cov_type="HAC", maxlags=maxlags)
+
+    extra = {}
+    for i, (name, build) in enumerate(builders.items()):
+        boot = wild_cluster_bootstrap(wild_design(panel, build("Taiwan")), reps=reps, weights=weights,
+                                      seed=seed + i, chunk=chunk, jobs=jobs)
+        perm = placebo_permutation(panel, build, units)
+        extra[name] = boot.drop(columns=["Coef.", "CR0 Std.Err."]).merge(perm, on="variable")
+
+    out = {"regression_results_TWFE_inference.csv": twfe_table(fits["twfe"]).merge(extra["twfe"], on="variable")}
+    for ev in studies:
+        tbl = event_study_table(fits[ev["label"]], ev["label"], ev["leads"], ev["lags"])
+        e = extra[ev["label"]].rename(columns={"variable": "term", "boot_[0.025": "boot_low",
+                                               "boot_0.975]": "boot_high", "boot_P>|t|": "boot_p",
+                                               "perm_P": "perm_p"})
+        tbl = tbl.merge(e.drop(columns="perm_n"), on="term", how="left")
+        base = tbl["term"].str.startswith("baseline")
+        tbl.loc[base, ["boot_low", "boot_high"]] = 0.0
+        out[f"event_study_{ev['label']}_inference.csv"] = tbl
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Wild cluster bootstrap + placebo-country permutation for TW_* effects")
+    ap.add_argument("--input", type=str, default="data/processed/ic_exports_comparison.csv")
+    ap.add_argument("--outdir", type=str, default="output/regression")
+    ap.add_argument("--reps", type=int, default=9999, help="Bootstrap replicates per specification")
+    ap.add_argument("--weights", choices=WEIGHTS, default="webb")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--jobs", type=int, default=0, help="Worker processes (0 = CPU count)")
+    ap.add_argument("--chunk", type=int, default=2000, help="Replicates per task (fixes the seed stream)")
+    args = ap.parse_args()
+
+    outdir = Path(args.outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    tables = run_inference(pd.read_csv(args.input), reps=args.reps, weights=args.weights, seed=args.seed,
+                           jobs=args.jobs, chunk=args.chunk)
+    for name, tbl in tables.items():
+        tbl.to_csv(outdir / name, index=False)
+        print(f"✅ Saved -> {(outdir / name).as_posix()}")
+
+
+if __name__ == "__main__":
+    main()
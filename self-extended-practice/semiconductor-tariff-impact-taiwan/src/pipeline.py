@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dependency-tracked pipeline runner for data/processed and output/.
+
+Every stage is a script under src/ with declared inputs and outputs, given as paths
+relative to the project root, with globs allowed. The script's own source is always
+one of its inputs, and so is every src/ or ../common/ module it imports, directly or
+through other local modules (found by parsing their import statements, including imports
+inside functions). Stage B depends on stage A when one of B's inputs matches one of
+A's outputs, or when B lists A in `after` (stages that share a file they both rewrite,
+such as output/.render_manifest.json, so they never run at the same time). When a stage becomes ready (after its upstream stages finish), it is
+skipped if all of these hold:
+- the sha256 of every input file is the same as on its last successful run;
+- its command line is unchanged;
+- every declared output still exists with the content it had then.
+Otherwise it is re-run. A stage whose upstream re-ran but wrote byte-identical outputs is
+therefore skipped too. Ready stages run concurrently as subprocesses (cwd = project root).
+
+State      : output/.pipeline_state.json   (digests per stage; file digests cached by size + mtime)
+Report     : output/.pipeline_report.json  (status / seconds / changed inputs per stage)
+
+Not covered (their outputs are read as source files): the Google Trends fetch and the
+quarterly AI regression of notebooks/online_ai_regression.ipynb, and the period model /
+CAGR cells of notebooks/online_ic_regression.ipynb.
+
+Usage:
+    python src/pipeline.py                    # build everything that is stale
+    python src/pipeline.py figures --jobs 2   # build one target and what it depends on
+    python src/pipeline.py --dry-run          # show what would run and why
+    python src/pipeline.py --list
+"""
+
+from __future__ import annotations
+import argparse
+import ast
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))  # shared by both projects
+from atomic_io import atomic_write_json, load_json, sha256_file  # noqa: E402
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+STATE_FILE = "output/.pipeline_state.json"
+REPORT_FILE = "output/.pipeline_report.json"
+
+
+@dataclass
+class Stage:
+    name: str
+    script: str
+    args: List[str] = field(default_factory=list)
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    after: List[str] = field(default_factory=list)
+
+    @property
+    def command(self) -> List[str]:
+        return [sys.executable, self.script, *self.args]
+
+    @property
+    def all_inputs(self) -> List[str]:
+        return [self.script, *self.inputs]
+
+
+# -------------------------
+# Stages
+# -------------------------
+
+STAGES: List[Stage] = [
+    Stage(
+        "ic_comparison", "src/build_ic_comparison.py",
+        inputs=["data/raw/ic_exports_comparison_uncomtrade_2013_2024.csv",
+                "data/raw/taiwan_exports_8542_2013_2025.csv"],
+        outputs=["data/processed/ic_exports_comparison_panel.csv"],
+    ),
+    Stage(
+        "top10", "src/plot_exports.py", ["--jobs", "1"],
+        inputs=["data/raw/taiwan_exports_by_country_2013_2025.csv",
+                "data/mappings/country_name_map_full.json"],
+        outputs=["data/processed/top10_export_markets_avg_2013_2025.csv",
+                 "data/processed/top10_export_markets_trend_2013_2025.csv",
+                 "output/figures/taiwan_ic_top10_trend_en.png",
+                 "output/interactive/top10_export_markets_bar_race.html"],
+    ),
+    Stage(
+        "event_impact", "src/event_impact.py",
+        inputs=["data/raw/taiwan_exports_by_country_2013_2025.csv",
+                "data/mappings/country_name_map_full.json",
+                "data/processed/us_tariffs_with_policy_events.csv"],
+        outputs=["data/processed/event_impact_summary.csv"],
+    ),
+    Stage(
+        "regression", "src/panel_fe.py", ["--input", "data/processed/ic_exports_comparison_panel.csv"],
+        inputs=["data/processed/ic_exports_comparison_panel.csv"],
+        outputs=["output/regression/regression_results_TWFE_TW.csv",
+                 "output/regression/event_study_Covid2020_coeffs.csv",
+                 "output/regression/event_study_ChipAct2022_coeffs.csv"],
+    ),
+    Stage(
+        "inference", "src/panel_inference.py",
+        ["--input", "data/processed/ic_exports_comparison_panel.csv", "--reps", "9999", "--seed", "2025", "--jobs", "1"],
+        inputs=["data/processed/ic_exports_comparison_panel.csv"],
+        outputs=["output/regression/regression_results_TWFE_inference.csv",
+                 "output/regression/event_study_Covid2020_inference.csv",
+                 "output/regression/event_study_ChipAct2022_inference.csv"],
+    ),
+    Stage(
+        "figures", "src/render_figures.py", ["--jobs", "1", "--only", "tw_*", "event_study_*"],
+        inputs=["output/regression/regression_results_TWFE.csv",
+                "output/regression/period_model_results.csv",
+                "output/regression/event_study_*_coeffs.csv"],
+        outputs=["output/regression/tw_relative_effects_bar_labeled.png",
+                 "output/regression/tw_period_effects_bar_labeled.png",
+                 "output/regression/event_study_Covid2020.png",
+                 "output/regression/event_study_ChipAct2022.png"],
+        after=["top10"],  # both rewrite output/.render_manifest.json
+    ),
+]
+
+
+# -------------------------
+# Graph
+# -------------------------
+
+def _matches(pattern: str, path: str) -> bool:
+    return pattern == path or fnmatchcase(path, pattern)
+
+
+def dependencies(stages: List[Stage]) -> Dict[str, Set[str]]:
+    """stage -> names of the stages producing any of its inputs, plus its `after` stages."""
+    deps = {s.name: set() for s in stages}
+    names = set(deps)
+    for s in stages:
+        deps[s.name].update(n for n in s.after if n in names)
+        for other in stages:
+            if other is not s and any(_matches(i, o) for i in s.all_inputs for o in other.outputs):
+                deps[s.name].add(other.name)
+    _check_acyclic(deps)
+    return deps
+
+
+def _check_acyclic(deps: Dict[str, Set[str]]) -> None:
+    done: Set[str] = set()
+    while len(done) < len(deps):
+        ready = [n for n, d in deps.items() if n not in done and d <= done]
+        if not ready:
+            raise ValueError(f"Dependency cycle among stages: {sorted(set(deps) - done)}")
+        done.update(ready)
+
+
+def select(stages: List[Stage], deps: Dict[str, Set[str]], targets: Optional[List[str]]) -> List[Stage]:
+    """The requested targets plus everything upstream of them (all stages when no target is given)."""
+    if not targets:
+        return list(stages)
+    unknown = set(targets) - set(deps)
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {', '.join(sorted(unknown))}; see --list")
+    keep: Set[str] = set()
+    todo = list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in keep:
+            keep.add(name)
+            todo.extend(deps[name])
+    return [s for s in stages if s.name in keep]
+
+
+# -------------------------
+# Local imports
+# -------------------------
+
+def local_imports(script: str, root: Path = PROJECT_ROOT) -> List[str]:
+    """src/ and ../common/ modules the script imports, transitively, as sorted project-relative
+    paths (script excluded)."""
+    dirs = [Path(script).parent, Path("..") / "common"]
+    seen: Set[str] = set()
+    todo = [script]
+    while todo:
+        rel = todo.pop()
+        try:
+            tree = ast.parse((root / rel).read_text(encoding="utf-8"))
+        except (OSError, SyntaxError):
+            continue  # a missing or broken script fails when it runs
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [a.name for a in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                for d in dirs:
+                    dep = (d / (name.split(".")[0] + ".py")).as_posix()
+                    if (root / dep).is_file():
+                        if dep not in seen and dep != script:
+                            seen.add(dep)
+                            todo.append(dep)
+                        break
+    return sorted(seen)
+
+
+# -------------------------
+# Content digests
+# -------------------------
+
+class Digests:
+    """sha256 per file, re-hashed only when size or mtime changed since the cached entry."""
+
+    def __init__(self, root: Path, cache: Dict[str, dict]):
+        self.root = root
+        self.cache = cache
+
+    def file(self, rel: str) -> Optional[str]:
+        path = self.root / rel
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        hit = self.cache.get(rel)
+        if hit and hit["size"] == st.st_size and hit["mtime_ns"] == st.st_mtime_ns:
+            return hit["sha256"]
+        digest = sha256_file(path)
+        self.cache[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        return digest
+
+    def expand(self, patterns: List[str]) -> Dict[str, Optional[str]]:
+        """pattern list -> {relative path: digest}; a literal path that does not exist maps to None."""
+        out: Dict[str, Optional[str]] = {}
+        for pat in patterns:
+            if glob.has_magic(pat):
+                for p in sorted(glob.glob(str(self.root / pat))):
+                    rel = Path(p).relative_to(self.root).as_posix()
+                    out[rel] = self.file(rel)
+            else:
+                out[pat] = self.file(pat)
+        return out
+
+
+def _load_state(root: Path) -> dict:
+    return load_json(root / STATE_FILE, {"files": {}, "stages": {}})
+
+
+def _save_state(root: Path, state: dict) -> None:
+    path = root / STATE_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_json(path, state, indent=2, sort_keys=True)
+
+
+# -------------------------
+# Runner
+# -------------------------
+
+def _why_stale(stage: Stage, inputs: Dict[str, Optional[str]], outputs: Dict[str, Optional[str]],
+               last: Optional[dict]) -> List[str]:
+    """Reasons to run (empty list = up to date)."""
+    missing_in = [p for p, d in inputs.items() if d is None]
+    if missing_in:
+        return [f"missing input {p}" for p in missing_in]
+    if last is None:
+        return ["never built"]
+    reasons = [f"changed {p}" for p, d in inputs.items() if last["inputs"].get(p) != d]
+    reasons += [f"removed {p}" for p in last["inputs"] if p not in inputs]
+    if last["command"] != stage.command[1:]:
+        reasons.append("command changed")
+    for p, d in outputs.items():
+        if d is None:
+            reasons.append(f"missing output {p}")
+        elif last["outputs"].get(p) != d:
+            reasons.append(f"output modified {p}")
+    return reasons
+
+
+def _run_stage(stage: Stage, root: Path) -> dict:
+    t0 = time.perf_counter()
+    proc = subprocess.run(stage.command, cwd=root, capture_output=True, text=True)
+    return {"returncode": proc.returncode, "log": proc.stdout + proc.stderr, "seconds": time.perf_counter() - t0}
+
+
+def run_pipeline(
+    stages: List[Stage] = STAGES,
+    targets: Optional[List[str]] = None,
+    jobs: int = 0,
+    force: bool = False,
+    dry_run: bool = False,
+    root: Path = PROJECT_ROOT,
+) -> List[dict]:
+    """Build the selected stages; returns one report row per stage in completion order."""
+    deps = dependencies(stages)
+    selected = select(stages, deps, targets)
+    names = {s.name for s in selected}
+    deps = {s.name: deps[s.name] & names for s in selected}
+
+    state = _load_state(root)
+    digests = Digests(root, state["files"])
+    report: List[dict] = []
+    done: Dict[str, str] = {}          # name -> status
+    t_start = time.perf_counter()
+
+    def decide(stage: Stage):
+        inputs = digests.expand(stage.all_inputs + local_imports(stage.script, root))
+        outputs = digests.expand(stage.outputs)
+        reasons = _why_stale(stage, inputs, outputs, state["stages"].get(stage.name))
+        if force and not any(r.startswith("missing input") for r in reasons):
+            reasons = ["--force"]
+        return inputs, reasons
+
+    def record(stage: Stage, status: str, seconds: float, reasons: List[str], started: float) -> None:
+        done[stage.name] = status
+        report.append({"stage": stage.name, "status": status, "seconds": round(seconds, 3),
+                       "start": round(started, 3), "reasons": reasons})
+        detail = f"  ({'; '.join(reasons[:3])}{' ...' if len(reasons) > 3 else ''})" if reasons else ""
+        print(f"  {stage.name:<16} {status:<8} {seconds:>7.2f}s{detail}")
+
+    jobs = jobs or os.cpu_count() or 1
+    running = {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while len(done) < len(selected):
+            for stage in selected:
+                if stage.name in done or any(r[0] is stage for r in running.values()):
+                    continue
+                upstream = deps[stage.name]
+                if not upstream <= set(done):
+                    continue
+                started = time.perf_counter() - t_start
+                failed_up = sorted(u for u in upstream if done[u] in ("failed", "blocked"))
+                if failed_up:
+                    record(stage, "blocked", 0.0, [f"upstream {u} failed" for u in failed_up], started)
+                    continue
+                inputs, reasons = decide(stage)
+                pending_up = sorted(u for u in upstream if done[u] == "would run")
+                if pending_up and not reasons:
+                    reasons = [f"upstream {u} would run" for u in pending_up]
+                if not reasons:
+                    record(stage, "skipped", 0.0, [], started)
+                elif any(r.startswith("missing input") for r in reasons):
+                    record(stage, "failed", 0.0, reasons, started)
+                elif dry_run:
+                    record(stage, "would run", 0.0, reasons, started)
+                else:
+                    running[pool.submit(_run_stage, stage, root)] = (stage, inputs, reasons, started)
+            if not running:
+                continue
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in finished:
+                stage, inputs, reasons, started = running.pop(fut)
+                res = fut.result()
+                if res["returncode"] == 0:
+                    outputs = digests.expand(stage.outputs)
+                    state["stages"][stage.name] = {
+                        "command": stage.command[1:],
+                        "inputs": inputs,
+                        "outputs": outputs,
+                    }
+                    missing = [p for p, d in outputs.items() if d is None]
+                    status = "failed" if missing else "ran"
+                    reasons = reasons + [f"did not write {p}" for p in missing]
+                else:
+                    status = "failed"
+                record(stage, status, res["seconds"], reasons, started)
+                if status == "failed":
+                    print("\n".join("    | " + line for line in res["log"].rstrip().splitlines()[-20:]))
+                _save_state(root, state)
+
+    if not dry_run:
+        _save_state(root, state)
+        path = root / REPORT_FILE
+        path.write_text(json.dumps({"wall_seconds": round(time.perf_counter() - t_start, 3), "stages": report},
+                                   indent=2, ensure_ascii=False), encoding="utf-8")
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the semiconductor pipeline, rebuilding only stale stages")
+    ap.add_argument("targets", nargs="*", help="Stages to build (with everything upstream); default all")
+    ap.add_argument("--jobs", type=int, default=0, help="Stages run concurrently (0 = CPU count)")
+    ap.add_argument("--force", action="store_true", help="Re-run the selected stages even if up to date")
+    ap.add_argument("--dry-run", action="store_true", help="Report what would run, run nothing")
+    ap.add_argument("--list", action="store_true", help="List stages with their dependencies")
+    args = ap.parse_args()
+
+    if args.list:
+        deps = dependencies(STAGES)
+        for s in STAGES:
+            print(f"{s.name:<16} <- {', '.join(sorted(deps[s.name])) or '(sources only)'}")
+            imports = local_imports(s.script)
+            if imports:
+                print(f"{'':<19}imports {', '.join(Path(m).name for m in imports)}")
+            for o in s.outputs:
+                print(f"{'':<19}{o}")
+        return
+
+    t0 = time.perf_counter()
+    report = run_pipeline(STAGES, args.targets, jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+    ran = sum(r["status"] == "ran" for r in report)
+    skipped = sum(r["status"] == "skipped" for r in report)
+    pending = sum(r["status"] == "would run" for r in report)
+    failed = [r["stage"] for r in report if r["status"] in ("failed", "blocked")]
+    print(f"{'✅' if not failed else '❌'} {ran} ran, {pending} would run, {skipped} up to date, {len(failed)} failed/blocked "
+          f"in {time.perf_counter() - t0:.2f}s")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
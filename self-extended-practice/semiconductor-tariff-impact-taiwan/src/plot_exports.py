@@ -29,16 +29,32 @@ Notes:
 from __future__ import annotations
 import argparse
 import json
+import sys
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 
+try:  # optional: streaming Arrow CSV reader with predicate push-down
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    import columnar_store
+except ModuleNotFoundError as e:  # pragma: no cover - falls back to chunked pandas
+    if (e.name or "").split(".")[0] != "pyarrow":
+        raise  # a broken import inside columnar_store is a bug, not a missing optional dependency
+    pa = None
+
 # Plotly for interactive chart, Matplotlib for static
 import plotly.express as px
+import plotly.graph_objects as go
 import plotly.io as pio
 import matplotlib.pyplot as plt
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))  # shared by both projects
+from stage_trace import add_profile_args, configure, stage  # noqa: E402
+
 
 # -------------------------
 # Helpers
@@ -70,71 +86,226 @@ def ascii_safe(s: str) -> str:
 
 
 # -------------------------
-# Core processing
+# Typed ingestion
 # -------------------------
 
-def prepare_top10_tables(
+REQUIRED_COLUMNS = {"Year", "Country", "HS Code", "Description", "Export Value (USD)"}
+# Only these are materialized; Description (long repeated text) is never parsed.
+USED_COLUMNS = ["Year", "Country", "HS Code", "Export Value (USD)"]
+READ_DTYPES = {"Year": "float64", "Country": "string", "HS Code": "string", "Export Value (USD)": "float64"}
+
+
+def _raw_header(raw_csv: Path) -> Dict[str, str]:
+    """Map stripped column name -> name as written in the file (BOM/whitespace tolerant)."""
+    cols = pd.read_csv(raw_csv, nrows=0, encoding="utf-8-sig").columns
+    return {c.strip(): c for c in cols}
+
+
+def _filter_rows(df: pd.DataFrame, year_min: int, year_max: int, hs_prefix: str) -> pd.DataFrame:
+    df = df.dropna(subset=["Year", "Export Value (USD)"])
+    keep = (df["Year"] >= year_min) & (df["Year"] <= year_max)
+    if hs_prefix:
+        keep &= df["HS Code"].str.strip().str.startswith(hs_prefix).fillna(False)
+    return df[keep]
+
+
+def _read_exports_pandas(raw_csv, names, year_min, year_max, hs_prefix, chunksize) -> pd.DataFrame:
+    dtypes = {names[c]: t for c, t in READ_DTYPES.items()}
+    try:
+        reader = pd.read_csv(raw_csv, usecols=[names[c] for c in USED_COLUMNS], dtype=dtypes,
+                             encoding="utf-8-sig", chunksize=chunksize)
+        parts = [_filter_rows(c.rename(columns=str.strip), year_min, year_max, hs_prefix) for c in reader]
+    except ValueError:
+        # Malformed numbers: re-read numeric columns as text and coerce like before.
+        text = {names[c]: "string" for c in USED_COLUMNS}
+        reader = pd.read_csv(raw_csv, usecols=list(text), dtype=text, encoding="utf-8-sig", chunksize=chunksize)
+        parts = []
+        for c in reader:
+            c = c.rename(columns=str.strip)
+            for col in ("Year", "Export Value (USD)"):
+                c[col] = pd.to_numeric(c[col], errors="coerce")
+            parts.append(_filter_rows(c, year_min, year_max, hs_prefix))
+    return pd.concat(parts, ignore_index=True)
+
+
+def _arrow_mask(year, value, hs, year_min, year_max, hs_prefix):
+    mask = pc.and_(
+        pc.and_(pc.greater_equal(year, year_min), pc.less_equal(year, year_max)),
+        pc.is_valid(value),
+    )
+    if hs_prefix:
+        mask = pc.and_(mask, pc.starts_with(pc.utf8_trim_whitespace(hs), hs_prefix))
+    return pc.fill_null(mask, False)
+
+
+def _read_exports_arrow(raw_csv, names, year_min, year_max, hs_prefix) -> pd.DataFrame:
+    cols = [names[c] for c in USED_COLUMNS]
+    convert = pacsv.ConvertOptions(
+        include_columns=cols,
+        column_types={names["Year"]: pa.float64(), names["Country"]: pa.string(),
+                      names["HS Code"]: pa.string(), names["Export Value (USD)"]: pa.float64()},
+    )
+    batches = []
+    with pacsv.open_csv(raw_csv, convert_options=convert) as stream:
+        for batch in stream:
+            mask = _arrow_mask(batch.column(cols[0]), batch.column(cols[3]), batch.column(cols[2]),
+                               year_min, year_max, hs_prefix)
+            batches.append(batch.filter(mask))
+    table = pa.Table.from_batches(batches, schema=stream.schema)
+    return table.to_pandas(types_mapper={pa.string(): pd.StringDtype()}.get).rename(columns=str.strip)
+
+
+def _read_exports_columnar(arrow_path, year_min, year_max, hs_prefix) -> pd.DataFrame:
+    # Memory-mapped; only the four used columns are touched
+    table = columnar_store.open_table(arrow_path, columns=USED_COLUMNS)
+    mask = _arrow_mask(table["Year"], table["Export Value (USD)"], table["HS Code"], year_min, year_max, hs_prefix)
+    table = table.filter(mask)
+    if pa.types.is_dictionary(table.schema.field("Country").type):  # same dtypes as the CSV engines
+        table = table.set_column(table.schema.get_field_index("Country"), "Country",
+                                 table["Country"].cast(pa.string()))
+    return table.to_pandas(types_mapper={pa.string(): pd.StringDtype()}.get)
+
+
+def read_exports(
     raw_csv: Path,
-    mapping_json: Path,
     year_min: int = 2013,
     year_max: int = 2025,
-    include_others: bool = False,
-    processed_dir: Path = Path("data/processed"),
+    hs_prefix: str = "8542",
+    engine: str = "auto",
+    chunksize: int = 200_000,
 ) -> pd.DataFrame:
-    """Return year-country aggregated DataFrame (top10 only) and write processed CSVs."""
-    df = pd.read_csv(raw_csv)
-    # Normalize columns
-    df.columns = [c.strip() for c in df.columns]
-
-    # Required columns check
-    required = {"Year", "Country", "HS Code", "Description", "Export Value (USD)"}
-    missing = required - set(df.columns)
+    """
+    Read the country-level exports CSV with explicit dtypes and the year/HS predicates
+    applied while reading, so dropped rows are never materialized as a full frame.
+
+    engine: "columnar" (memory-mapped data/columnar/<stem>.arrow, see columnar_store.py),
+    "arrow" (streaming pyarrow batches), "pandas" (chunked read_csv) or "auto"
+    (columnar when a current copy exists, else arrow, else pandas).
+    Returns Year (int64), Country / HS Code (category), Export Value (USD) (float64).
+    """
+    names = _raw_header(raw_csv)
+    missing = REQUIRED_COLUMNS - set(names)
     if missing:
         raise ValueError(f"Missing required columns in {raw_csv}: {sorted(missing)}")
 
-    # Year range filter and numeric cast
-    df["Year"] = pd.to_numeric(df["Year"], errors="coerce")
-    df["Export Value (USD)"] = pd.to_numeric(df["Export Value (USD)"], errors="coerce")
-    df = df.dropna(subset=["Year", "Export Value (USD)"])
-    df = df[(df["Year"] >= year_min) & (df["Year"] <= year_max)]
+    columnar_dir = Path(raw_csv).resolve().parent.parent / "columnar"
+    if engine == "auto":
+        if pa is None:
+            engine = "pandas"
+        else:
+            engine = "columnar" if columnar_store.is_fresh(raw_csv, columnar_dir) else "arrow"
+    with stage("read") as st:  # year / HS filters are pushed down into the read
+        if engine == "columnar":
+            if pa is None:
+                raise ImportError("engine='columnar' requires pyarrow")
+            df = _read_exports_columnar(columnar_store.store_path(raw_csv, columnar_dir), year_min, year_max,
+                                        hs_prefix)
+        elif engine == "arrow":
+            if pa is None:
+                raise ImportError("engine='arrow' requires pyarrow")
+            try:
+                df = _read_exports_arrow(raw_csv, names, year_min, year_max, hs_prefix)
+            except pa.ArrowInvalid:  # malformed numbers: use the coercing pandas path
+                df = _read_exports_pandas(raw_csv, names, year_min, year_max, hs_prefix, chunksize)
+        elif engine == "pandas":
+            df = _read_exports_pandas(raw_csv, names, year_min, year_max, hs_prefix, chunksize)
+        else:
+            raise ValueError(f"Unknown engine: {engine!r}")
+        st.rows(out=len(df))
+
+    with stage("normalize", rows_in=len(df)) as st:
+        df["Year"] = df["Year"].astype("int64")
+        df["Country"] = df["Country"].str.strip().astype("category")
+        df["HS Code"] = df["HS Code"].str.strip().astype("category")
+        st.rows(out=len(df))
+    return df
 
-    # Map country names to English
-    cmap = load_country_map(mapping_json)
-    df["Country_EN"] = df["Country"].map(cmap).fillna("Others")
-    df["Country_EN"] = df["Country_EN"].map(ascii_safe)
 
-    # Keep IC only (safety)
-    df = df[df["HS Code"].astype(str).str.startswith("8542")].copy()
+# -------------------------
+# Core processing
+# -------------------------
+
+def english_names(country: pd.Series, cmap: Dict[str, str]) -> np.ndarray:
+    """Map a categorical Country column to ASCII English names (once per category, gathered by code)."""
+    names = country.cat.categories
+    to_en = pd.Series(names, index=names).map(cmap).fillna("Others").map(ascii_safe)
+    codes = country.cat.codes.to_numpy()
+    return np.where(codes >= 0, to_en.to_numpy(dtype=object)[codes], "Others")
 
-    # Aggregate to Year x Country
-    year_country = (
-        df.groupby(["Year", "Country_EN"], as_index=False)["Export Value (USD)"]
-          .sum()
-          .rename(columns={"Export Value (USD)": "Export_USD"})
-    )
 
+def write_top10_tables(
+    year_country: pd.DataFrame,
+    include_others: bool = False,
+    processed_dir: Path = Path("data/processed"),
+) -> pd.DataFrame:
+    """Pick Top10 markets by average over years, write avg/trend CSVs, return the Top10 trend rows."""
     # Compute Top10 by average over years
-    avg = (year_country.groupby("Country_EN", as_index=False)["Export_USD"]
-           .mean().rename(columns={"Export_USD": "Avg_Exports_2013_2025_USD"}))
+    with stage("aggregate", rows_in=len(year_country)) as st:
+        avg = (year_country.groupby("Country_EN", as_index=False)["Export_USD"]
+               .mean().rename(columns={"Export_USD": "Avg_Exports_2013_2025_USD"}))
+        st.rows(out=len(avg))
 
-    if not include_others:
-        avg = avg[avg["Country_EN"].str.lower() != "others"]
+    with stage("filter", rows_in=len(year_country)) as st:
+        if not include_others:
+            avg = avg[avg["Country_EN"].str.lower() != "others"]
 
-    top10 = avg.sort_values("Avg_Exports_2013_2025_USD", ascending=False).head(10)
+        top10 = avg.sort_values("Avg_Exports_2013_2025_USD", ascending=False).head(10)
 
-    # Save avg table
-    ensure_dirs([processed_dir])
-    avg_out = processed_dir / "top10_export_markets_avg_2013_2025.csv"
-    top10.to_csv(avg_out, index=False, encoding="utf-8-sig")
+        # Filter year_country for top10
+        year_country_top10 = year_country[year_country["Country_EN"].isin(top10["Country_EN"])].copy()
+        st.rows(out=len(year_country_top10))
 
-    # Filter year_country for top10
-    year_country_top10 = year_country[year_country["Country_EN"].isin(top10["Country_EN"])].copy()
-    trend_out = processed_dir / "top10_export_markets_trend_2013_2025.csv"
-    year_country_top10.to_csv(trend_out, index=False, encoding="utf-8-sig")
+    with stage("write", rows_in=len(top10) + len(year_country_top10)):
+        # Save avg table
+        ensure_dirs([processed_dir])
+        avg_out = processed_dir / "top10_export_markets_avg_2013_2025.csv"
+        top10.to_csv(avg_out, index=False, encoding="utf-8-sig")
+
+        trend_out = processed_dir / "top10_export_markets_trend_2013_2025.csv"
+        year_country_top10.to_csv(trend_out, index=False, encoding="utf-8-sig")
 
     return year_country_top10
 
 
+def aggregate_year_country(
+    raw_csv: Path,
+    mapping_json: Path,
+    year_min: int = 2013,
+    year_max: int = 2025,
+) -> pd.DataFrame:
+    """Full rebuild of the Year x Country_EN export sums (HS 8542) from the raw CSV."""
+    # Typed read; year range and IC-only (HS 8542) filters are applied while reading
+    df = read_exports(raw_csv, year_min=year_min, year_max=year_max, hs_prefix="8542")
+
+    # Map country names to English
+    with stage("normalize", rows_in=len(df)) as st:
+        df["Country_EN"] = english_names(df["Country"], load_country_map(mapping_json))
+        st.rows(out=len(df))
+
+    # Aggregate to Year x Country
+    with stage("aggregate", rows_in=len(df)) as st:
+        out = (
+            df.groupby(["Year", "Country_EN"], as_index=False)["Export Value (USD)"]
+              .sum()
+              .rename(columns={"Export Value (USD)": "Export_USD"})
+        )
+        st.rows(out=len(out))
+    return out
+
+
+def prepare_top10_tables(
+    raw_csv: Path,
+    mapping_json: Path,
+    year_min: int = 2013,
+    year_max: int = 2025,
+    include_others: bool = False,
+    processed_dir: Path = Path("data/processed"),
+) -> pd.DataFrame:
+    """Return year-country aggregated DataFrame (top10 only) and write processed CSVs."""
+    year_country = aggregate_year_country(raw_csv, mapping_json, year_min, year_max)
+    return write_top10_tables(year_country, include_others, processed_dir)
+
+
 def plot_static_lines(year_country_top10: pd.DataFrame, out_png: Path) -> None:
     pivot = year_country_top10.pivot(index="Year", columns="Country_EN", values="Export_USD").sort_index()
     plt.figure(figsize=(12, 7))
@@ -151,37 +322,86 @@ def plot_static_lines(year_country_top10: pd.DataFrame, out_png: Path) -> None:
     plt.close()
 
 
-def plot_interactive_bar_race(year_country_top10: pd.DataFrame, out_html: Path) -> None:
-    df_sorted = year_country_top10.copy()
-    df_sorted["Export_Bn"] = df_sorted["Export_USD"] / 1e9
-    df_sorted = df_sorted.sort_values(["Year", "Export_Bn"], ascending=[True, False])
-
-    fig = px.bar(
-        df_sorted,
-        x="Export_Bn",
-        y="Country_EN",
-        orientation="h",
-        color="Country_EN",
-        animation_frame="Year",
-        range_x=[0, max(1e-9, df_sorted["Export_Bn"].max()) * 1.1],
-        labels={"Export_Bn": "Exports (USD, Billions)", "Country_EN": "Market", "Year": "Year"},
-        title="Taiwan IC (HS 8542) Exports — Top 10 Markets (2013–2025)"
-    )
-    fig.update_yaxes(categoryorder="total ascending")
+def _category_colorscale(n: int) -> list:
+    """Discrete colorscale so integer color codes 0..n-1 hit one palette color each."""
+    palette = px.colors.qualitative.Plotly
+    if n <= 1:
+        return [[0.0, palette[0]], [1.0, palette[0]]]
+    return [[i / (n - 1), palette[i % len(palette)]] for i in range(n)]
+
+
+def bar_race_figure(
+    year_country: pd.DataFrame,
+    top_k: Optional[int] = None,
+    title: str = "Taiwan IC (HS 8542) Exports — Top 10 Markets (2013–2025)",
+) -> go.Figure:
+    """
+    Horizontal bar race with ONE bar trace; each frame only replaces that trace's
+    x / y / color arrays (numpy -> typed arrays in the HTML) and the y tick labels.
+    Colors are stable per market (integer code into a discrete colorscale).
+    top_k keeps the K largest markets of each year.
+    """
+    df = year_country[["Year", "Country_EN", "Export_USD"]].dropna()
+    markets = np.sort(df["Country_EN"].unique())
+    codes = pd.Categorical(df["Country_EN"], categories=markets).codes.astype(np.int16)
+    df = df.assign(_code=codes, Export_Bn=(df["Export_USD"] / 1e9).astype(np.float32))
+    # Within each year: smallest at the bottom (y = 0), largest on top
+    df = df.sort_values(["Year", "Export_Bn"], ascending=[True, True], kind="stable")
+
+    frames, k_max = [], 1
+    for year, sub in df.groupby("Year", sort=True):
+        if top_k:
+            sub = sub.tail(top_k)
+        k = len(sub)
+        k_max = max(k_max, k)
+        pos = np.arange(k, dtype=np.int16)
+        names = sub["Country_EN"].tolist()
+        frames.append(go.Frame(
+            name=str(year),
+            traces=[0],
+            data=[go.Bar(x=sub["Export_Bn"].to_numpy(), y=pos, hovertext=names,
+                         marker={"color": sub["_code"].to_numpy()})],
+            layout={"yaxis": {"tickvals": pos, "ticktext": names}},
+        ))
+
+    first = frames[0] if frames else go.Frame(data=[go.Bar()])
+    fig = go.Figure(data=[go.Bar(
+        x=first.data[0].x, y=first.data[0].y, hovertext=first.data[0].hovertext, orientation="h",
+        marker={"color": first.data[0].marker.color, "colorscale": _category_colorscale(len(markets)),
+                "cmin": 0, "cmax": max(len(markets) - 1, 1), "showscale": False},
+        hovertemplate="%{hovertext}: %{x:.2f} Bn USD<extra></extra>",
+    )], frames=frames)
+
+    x_max = float(df["Export_Bn"].max()) if len(df) else 0.0
+    play = {"frame": {"duration": 800, "redraw": True}, "fromcurrent": True, "transition": {"duration": 300}}
     fig.update_layout(
-        legend_title_text="Market",
+        title=title,
+        xaxis={"title": "Exports (USD, Billions)", "range": [0, max(1e-9, x_max) * 1.1]},
+        yaxis={"title": "Market", "range": [-0.5, k_max - 0.5], "tickmode": "array",
+               "tickvals": first.layout.yaxis.tickvals if frames else [],
+               "ticktext": first.layout.yaxis.ticktext if frames else []},
         hovermode="closest",
-        updatemenus=[
-            {
-                "type": "buttons",
-                "showactive": False,
-                "buttons": [
-                    {"label": "Play", "method": "animate", "args": [None, {"fromcurrent": True}]},
-                    {"label": "Pause", "method": "animate", "args": [[None], {"mode": "immediate"}]}
-                ]
-            }
-        ]
+        updatemenus=[{
+            "type": "buttons",
+            "showactive": False,
+            "buttons": [
+                {"label": "Play", "method": "animate", "args": [None, play]},
+                {"label": "Pause", "method": "animate",
+                 "args": [[None], {"mode": "immediate", "frame": {"duration": 0}, "transition": {"duration": 0}}]},
+            ],
+        }],
+        sliders=[{
+            "currentvalue": {"prefix": "Year: "},
+            "steps": [{"label": f.name, "method": "animate",
+                       "args": [[f.name], {"mode": "immediate", "frame": {"duration": 0, "redraw": True},
+                                           "transition": {"duration": 0}}]} for f in frames],
+        }],
     )
+    return fig
+
+
+def plot_interactive_bar_race(year_country_top10: pd.DataFrame, out_html: Path, top_k: Optional[int] = None) -> None:
+    fig = bar_race_figure(year_country_top10, top_k=top_k)
     out_html.parent.mkdir(parents=True, exist_ok=True)
     pio.write_html(fig, file=str(out_html), auto_open=False, include_plotlyjs="cdn")
 
@@ -205,7 +425,13 @@ def main():
     grp = ap.add_mutually_exclusive_group()
     grp.add_argument("--include-others", action="store_true", help="Include the 'Others' bucket in Top10 selection")
     grp.add_argument("--exclude-others", action="store_true", help="Exclude the 'Others' bucket (default)")
+    ap.add_argument("--store", type=str, default=None,
+                    help="Aggregate store dir (e.g. data/processed/store): only parse rows appended since last run")
+    ap.add_argument("--jobs", type=int, default=0, help="Figure render worker processes (0 = CPU count)")
+    ap.add_argument("--force", action="store_true", help="Re-render figures even if their inputs are unchanged")
+    add_profile_args(ap)
     args = ap.parse_args()
+    configure("plot_exports", args)
 
     include_others = True if args.include_others else False
     if args.exclude_others:
@@ -217,22 +443,40 @@ def main():
     outdir = Path(args.outdir)
 
     # 1) Build processed top10 tables
-    year_country_top10 = prepare_top10_tables(
-        raw_csv=raw_csv,
-        mapping_json=mapping_json,
-        year_min=args.year_min,
-        year_max=args.year_max,
-        include_others=include_others,
-        processed_dir=processed_dir,
-    )
+    if args.store:
+        from export_store import tables_from_store, update_store
+
+        with stage("read") as st:  # parses only the rows appended since the last run
+            stats = update_store(raw_csv, mapping_json, Path(args.store))
+            st.rows(out=stats["delta_rows"])
+        print(f"Store {stats['mode']}: +{stats['delta_rows']} rows")
+        year_country_top10 = tables_from_store(
+            Path(args.store), args.year_min, args.year_max, include_others, processed_dir
+        )
+    else:
+        year_country_top10 = prepare_top10_tables(
+            raw_csv=raw_csv,
+            mapping_json=mapping_json,
+            year_min=args.year_min,
+            year_max=args.year_max,
+            include_others=include_others,
+            processed_dir=processed_dir,
+        )
+
+    # 2) Static lines + interactive bar race (cached, rendered in parallel)
+    from render_figures import FigureSpec, print_report, render_figures
 
-    # 2) Static lines
     png_path = outdir / "figures" / "taiwan_ic_top10_trend_en.png"
-    plot_static_lines(year_country_top10, png_path)
-
-    # 3) Interactive bar race
     html_path = outdir / "interactive" / "top10_export_markets_bar_race.html"
-    plot_interactive_bar_race(year_country_top10, html_path)
+    specs = [
+        FigureSpec("top10_trend_png", plot_static_lines, year_country_top10, png_path),
+        FigureSpec("top10_bar_race_html", plot_interactive_bar_race, year_country_top10, html_path),
+    ]
+    with stage("render", rows_in=len(year_country_top10)):
+        report = render_figures(specs, outdir, jobs=args.jobs, force=args.force)
+    print_report(report)
+    if (report["status"] == "failed").any():
+        raise SystemExit(1)
 
     print("\nDone ✅")
     print(f"Processed avg table  : {(processed_dir / 'top10_export_markets_avg_2013_2025.csv').as_posix()}")
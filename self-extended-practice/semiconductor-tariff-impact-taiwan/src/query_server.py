@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local in-memory query server behind the interactive pages (stdlib asyncio, no web framework).
+
+The customs trade cube, and optionally a quake catalog, are loaded once at startup. Every
+request is then answered from memory with a filtered, pre-aggregated JSON slice:
+
+    GET /api/trade/top?n=10&year_min=2013&year_max=2025&others=0   Top-N markets (prepare_top10_tables)
+    GET /api/trade/trend?...                                        Year x market values of that Top-N
+    GET /api/trade/bar_race?...                                     Plotly figure JSON (bar_race_figure)
+    GET /api/quakes/years                                           events per year
+    GET /api/quakes/layer?year=2024&mag_min=3&mode=auto             one map layer, as make_map_by_year's lazy files
+    GET /api/quakes/events?start=...&lat=...&radius_km=...          QuakeIndex query (columnar, at most `limit` rows)
+    GET /api/stats                                                  requests served, cache hits / misses
+    GET /trade, /quakes                                             pages that fetch from the API above
+
+Responses are cached in an LRU keyed by route + normalized parameters. Defaults are filled in
+and values parsed before the lookup, so ?n=10 and a missing n share one entry. A cached entry is
+the encoded body, so a hit costs a dict lookup plus a socket write. The server speaks HTTP/1.1
+with keep-alive and serves GET only. CORS is open, so a page opened from file:// or GitHub Pages
+can fetch too (make_map_by_year.py --data-url). Handlers run on the event loop: misses are
+milliseconds (array slices of the cube / index), and a slow one delays the requests queued behind it.
+
+Usage:
+    python src/query_server.py                                   # http://127.0.0.1:8765/trade
+    python src/query_server.py --cube data/cube/customs.npz \\
+        --quakes ../taiwan_earthquake_analysis/data/earthquakes/GDMScatalog.json
+    python ../benchmarks/bench_query_server.py                   # load test: p50 / p99 latency, requests/s
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import sys
+import time
+import traceback
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from plot_exports import bar_race_figure
+from trade_cube import TradeCube, customs_cube
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+QUAKE_SRC = PROJECT_ROOT.parent / "taiwan_earthquake_analysis" / "src"
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+JSON_TYPE = "application/json; charset=utf-8"
+HTML_TYPE = "text/html; charset=utf-8"
+
+
+# -------------------------
+# Response cache
+# -------------------------
+
+class LRUCache:
+    """Least-recently-used mapping with a fixed number of entries."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        body = self._data.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key: tuple, body: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        self._data[key] = body
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._data), "bytes": sum(len(b) for b in self._data.values()),
+                "hits": self.hits, "misses": self.misses, "max_entries": self.max_entries}
+
+
+# -------------------------
+# Routes and parameters
+# -------------------------
+
+def _bool(s: str) -> bool:
+    v = s.strip().lower()
+    if v in ("1", "true", "yes", "on"):
+        return True
+    if v in ("0", "false", "no", "off", ""):
+        return False
+    raise ValueError(f"not a boolean: {s!r}")
+
+
+def _choice(*options: str) -> Callable[[str], str]:
+    def parse(s: str) -> str:
+        if s not in options:
+            raise ValueError(f"{s!r} is not one of {', '.join(options)}")
+        return s
+    return parse
+
+
+@dataclass
+class Route:
+    """handler(**params) -> dict (JSON-encoded) or str (sent as is); params: name -> (parser, default)."""
+    handler: Callable[..., object]
+    params: Dict[str, Tuple[Callable[[str], object], object]] = field(default_factory=dict)
+    content_type: str = JSON_TYPE
+    cache: bool = True
+
+    def parse(self, query: str) -> Dict[str, object]:
+        raw = parse_qs(query, keep_blank_values=True)
+        unknown = set(raw) - set(self.params)
+        if unknown:
+            raise ValueError(f"unknown parameter(s): {', '.join(sorted(unknown))}")
+        out = {}
+        for name, (parser, default) in self.params.items():
+            if name in raw and raw[name][-1] != "":
+                try:
+                    out[name] = parser(raw[name][-1])
+                except ValueError as exc:
+                    raise ValueError(f"{name}: {exc}") from None
+            else:
+                out[name] = default
+        return out
+
+    def render(self, params: Dict[str, object]) -> bytes:
+        result = self.handler(**params)
+        if isinstance(result, str):
+            return result.encode("utf-8")
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+# -------------------------
+# Trade slices
+# -------------------------
+
+TRADE_PARAMS = {"n": (int, 10), "year_min": (int, None), "year_max": (int, None), "others": (_bool, False)}
+
+
+class TradeAPI:
+    """Top-N slices of the customs cube (reporter Taiwan, partner = English market name, HS 8542)."""
+
+    def __init__(self, cube: TradeCube):
+        self.cube = cube
+        self.values, self.counts, self.rollup = cube.view(("year", "partner"))
+        self.years = self.rollup.coords["year"].astype(int)
+
+    def _years(self, year_min: Optional[int], year_max: Optional[int]) -> List[int]:
+        lo = self.years.min() if year_min is None else year_min
+        hi = self.years.max() if year_max is None else year_max
+        years = [int(y) for y in self.years if lo <= y <= hi]
+        if not years:
+            raise ValueError(f"no data between {lo} and {hi} (cube years {self.years.min()}-{self.years.max()})")
+        return years
+
+    def _top(self, n: int, year_min, year_max, others: bool):
+        if n < 1:
+            raise ValueError("n must be >= 1")
+        years = self._years(year_min, year_max)
+        labels, avg = self.cube.top_n(n, by="partner", years=years, exclude=() if others else ("Others",))
+        return years, labels, avg
+
+    def _block(self, years: List[int], labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(years x labels) values and present-mask, straight from the cached rollup."""
+        yi = [self.rollup.index["year"][str(y)] for y in years]
+        pi = [self.rollup.index["partner"][str(m)] for m in labels]
+        return self.values[np.ix_(yi, pi)], self.counts[np.ix_(yi, pi)] > 0
+
+    def top(self, n: int, year_min, year_max, others: bool) -> dict:
+        years, labels, avg = self._top(n, year_min, year_max, others)
+        return {"years": [years[0], years[-1]], "markets": labels.tolist(), "avg_usd": avg.tolist()}
+
+    def trend(self, n: int, year_min, year_max, others: bool) -> dict:
+        years, labels, _ = self._top(n, year_min, year_max, others)
+        values, present = self._block(years, labels)
+        series = {str(m): [float(v) if p else None for v, p in zip(values[:, j], present[:, j])]
+                  for j, m in enumerate(labels)}
+        return {"years": years, "series": series}
+
+    def year_country(self, n: int, year_min, year_max, others: bool) -> pd.DataFrame:
+        """Same rows as write_top10_tables' trend table (Year, Country_EN, Export_USD)."""
+        years, labels, _ = self._top(n, year_min, year_max, others)
+        values, present = self._block(years, labels)
+        yi, pi = np.nonzero(present)
+        return pd.DataFrame({"Year": np.asarray(years)[yi], "Country_EN": labels[pi], "Export_USD": values[yi, pi]})
+
+    def bar_race(self, n: int, year_min, year_max, others: bool) -> str:
+        df = self.year_country(n, year_min, year_max, others)
+        years = (int(df["Year"].min()), int(df["Year"].max())) if len(df) else (year_min, year_max)
+        title = f"Taiwan IC (HS 8542) Exports — Top {n} Markets ({years[0]}–{years[1]})"
+        return bar_race_figure(df, title=title).to_json()
+
+
+def trade_routes(cube: TradeCube) -> Dict[str, Route]:
+    api = TradeAPI(cube)
+    return {
+        "/api/trade/top": Route(api.top, TRADE_PARAMS),
+        "/api/trade/trend": Route(api.trend, TRADE_PARAMS),
+        "/api/trade/bar_race": Route(api.bar_race, TRADE_PARAMS),
+        "/trade": Route(trade_page, content_type=HTML_TYPE),
+    }
+
+
+def trade_page() -> str:
+    import plotly.offline
+
+    return TRADE_PAGE.replace("{plotly_js}", f"https://cdn.plot.ly/plotly-{plotly.offline.get_plotlyjs_version()}.min.js")
+
+
+TRADE_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Taiwan IC exports — live</title>
+<script src="{plotly_js}"></script>
+<style>
+  body { font: 14px/1.3 Arial, sans-serif; margin: 12px; }
+  #controls label { margin-right: 10px; }
+  #controls input[type=number] { width: 5em; }
+  #chart { height: 80vh; }
+</style>
+</head>
+<body>
+<div id="controls">
+  <label>From <input id="year_min" type="number" value="2013"></label>
+  <label>To <input id="year_max" type="number" value="2025"></label>
+  <label>Top <input id="n" type="number" value="10" min="1"></label>
+  <label><input id="others" type="checkbox"> include "Others"</label>
+  <span id="status"></span>
+</div>
+<div id="chart"></div>
+<script>
+(function() {
+  var ids = ["year_min", "year_max", "n", "others"], seq = 0;
+  var status = document.getElementById("status");
+
+  function refresh() {
+    var q = new URLSearchParams();
+    ids.forEach(function(id) {
+      var el = document.getElementById(id);
+      q.set(id, el.type === "checkbox" ? (el.checked ? "1" : "0") : el.value);
+    });
+    var mine = ++seq;
+    status.textContent = "loading…";
+    fetch("/api/trade/bar_race?" + q)
+      .then(function(r) { return r.json().then(function(body) { return {ok: r.ok, body: body}; }); })
+      .then(function(res) {
+        if (mine !== seq) return;
+        if (!res.ok) { status.textContent = res.body.error; return; }
+        status.textContent = "";
+        Plotly.newPlot("chart", res.body);
+      })
+      .catch(function(err) { status.textContent = "request failed"; console.error(err); });
+  }
+
+  ids.forEach(function(id) { document.getElementById(id).addEventListener("change", refresh); });
+  refresh();
+})();
+</script>
+</body>
+</html>
+"""
+
+INDEX_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Query server</title></head>
+<body style="font: 14px/1.5 Arial, sans-serif;">
+<h3>Query server</h3>
+<ul>{links}</ul>
+</body></html>
+"""
+
+
+# -------------------------
+# Quake slices (taiwan_earthquake_analysis/src/quake_api.py)
+# -------------------------
+
+def _float(s: str) -> float:
+    v = float(s)
+    if not np.isfinite(v):
+        raise ValueError(f"not a finite number: {s!r}")
+    return v
+
+
+def quake_routes(catalogs: Sequence[str], cell_km: float = 10.0) -> Dict[str, Route]:
+    sys.path.insert(0, str(QUAKE_SRC))
+    from quake_api import EVENT_LIMIT, QuakeAPI, quake_page
+    from quake_index import QUERY_FIELDS
+    from quake_sources import load_quakes
+
+    api = QuakeAPI(load_quakes(list(catalogs)), cell_km=cell_km)
+    layer = {"year": (int, None), "mag_min": (_float, None), "mode": (_choice("auto", "raw", "binned"), "auto"),
+             "bin_threshold": (int, 10_000), "cell_deg": (_float, 0.1), "bin_kind": (_choice("hex", "grid"), "hex")}
+    events = {f: (str if f in ("start", "end") else _float, None) for f in QUERY_FIELDS}
+    events["k"] = (int, None)
+    events["limit"] = (int, EVENT_LIMIT)
+
+    def _events(limit: int, **query) -> dict:
+        return api.events(limit=limit, **{k: v for k, v in query.items() if v is not None})
+
+    return {
+        "/api/quakes/years": Route(api.years),
+        "/api/quakes/layer": Route(api.layer, layer),
+        "/api/quakes/events": Route(_events, events),
+        "/quakes": Route(quake_page, content_type=HTML_TYPE),
+    }
+
+
+# -------------------------
+# HTTP server
+# -------------------------
+
+class QueryServer:
+    def __init__(self, routes: Dict[str, Route], cache_size: int = 512):
+        self.routes = dict(routes)
+        self.cache = LRUCache(cache_size)
+        self.requests = 0
+        self.errors = 0
+        self.started = time.time()
+        self.routes["/api/stats"] = Route(self.stats, cache=False)
+        links = "".join(f'<li><a href="{p}">{p}</a></li>' for p in sorted(self.routes))
+        self.routes["/"] = Route(lambda: INDEX_PAGE.replace("{links}", links), content_type=HTML_TYPE)
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "errors": self.errors, "uptime_s": round(time.time() - self.started, 1),
+                "cache": self.cache.stats()}
+
+    def respond(self, method: str, target: str) -> Tuple[int, str, bytes, str]:
+        """(status, content type, body, cache state) for one request; never raises."""
+        self.requests += 1
+        if method != "GET":
+            return self._error(405, f"{method} not supported (GET only)")
+        url = urlsplit(target)
+        route = self.routes.get(url.path)
+        if route is None:
+            return self._error(404, f"no route {url.path}")
+        try:
+            params = route.parse(url.query)
+        except ValueError as exc:
+            return self._error(400, str(exc))
+
+        key = (url.path, *sorted(params.items()))
+        if route.cache:
+            body = self.cache.get(key)
+            if body is not None:
+                return 200, route.content_type, body, "HIT"
+        try:
+            body = route.render(params)
+        except (ValueError, KeyError) as exc:
+            return self._error(400, str(exc))
+        except Exception:  # noqa: BLE001 - reported to the client, server keeps running
+            traceback.print_exc()
+            return self._error(500, "internal error (see server log)")
+        if route.cache:
+            self.cache.put(key, body)
+        return 200, route.content_type, body, "MISS" if route.cache else "BYPASS"
+
+    def _error(self, status: int, message: str) -> Tuple[int, str, bytes, str]:
+        self.errors += 1
+        return status, JSON_TYPE, json.dumps({"error": message}, ensure_ascii=False).encode("utf-8"), "BYPASS"
+
+    @staticmethod
+    def _head(status: int, content_type: str, length: int, cache: str, keep_alive: bool) -> bytes:
+        return (
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {length}\r\n"
+            f"X-Cache: {cache}\r\n"
+            "Access-Control-Allow-Origin: *\r\n"
+            "Cache-Control: no-cache\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        ).encode("latin-1")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    body = b'{"error": "request head too large"}'
+                    writer.write(self._head(431, JSON_TYPE, len(body), "BYPASS", False) + body)
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length") or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # the body cannot be framed, so the connection cannot be reused
+                    status, content_type, body, cache = self._error(400, "malformed Content-Length header")
+                    writer.write(self._head(status, content_type, len(body), cache, False) + body)
+                    break
+                if length:
+                    await reader.readexactly(length)        # bodies are ignored (GET only)
+                conn = headers.get("connection", "").lower()
+                keep_alive = conn != "close" if version == "HTTP/1.1" else conn == "keep-alive"
+
+                status, content_type, body, cache = self.respond(method, target)
+                writer.write(self._head(status, content_type, len(body), cache, keep_alive) + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        server = await asyncio.start_server(self.handle, host, port)
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"✅ Serving on http://{host}:{port}/ ({', '.join(p for p in sorted(self.routes) if not p.startswith('/api'))})",
+              flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+# -------------------------
+# CLI
+# -------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve cached JSON slices of the trade cube / quake catalog on localhost")
+    ap.add_argument("--host", type=str, default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765, help="0 = any free port (printed at startup)")
+    ap.add_argument("--cube", type=str, default=None, help="Saved customs cube (.npz, trade_cube.py build)")
+    ap.add_argument("--raw", type=str, default="data/raw/taiwan_exports_by_country_2013_2025.csv",
+                    help="Customs CSV, used when --cube is not given")
+    ap.add_argument("--mapping", type=str, default="data/mappings/country_name_map_full.json")
+    ap.add_argument("--quakes", type=str, nargs="*", default=[],
+                    help="GDMS / CWA catalogs to serve under /api/quakes (optional)")
+    ap.add_argument("--cell-km", type=float, default=10.0, help="QuakeIndex grid cell size")
+    ap.add_argument("--cache-size", type=int, default=512, help="LRU entries (0 disables response caching)")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    if args.cube:
+        cube = TradeCube.load(Path(args.cube))
+    else:
+        cube = customs_cube(Path(args.raw), Path(args.mapping))
+    routes = trade_routes(cube)
+    if args.quakes:
+        routes.update(quake_routes([str(Path(p).resolve()) for p in args.quakes], cell_km=args.cell_km))
+    print(f"[INFO] loaded in {time.perf_counter() - t0:.2f}s", flush=True)
+
+    try:
+        asyncio.run(QueryServer(routes, args.cache_size).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cached, parallel rendering stage for the figures under output/.
+
+Every figure is described by a FigureSpec: an input frame, a module-level render
+function and its parameters. A render is skipped when the output file exists and
+the fingerprint of (input frame, parameters, source of the module defining the render
+function plus any declared deps) matches the one recorded in output/.render_manifest.json.
+Outstanding renders run in a process pool (Matplotlib's pyplot state is not thread-safe),
+and each figure's wall time is reported. A figure whose render raises is reported as
+failed; the others still render and are recorded in the manifest.
+
+Figures (inputs are the tables written by plot_exports.py and the notebooks):
+- figures/taiwan_ic_top10_trend_en.png            <- data/processed/top10_export_markets_trend_2013_2025.csv
+- interactive/top10_export_markets_bar_race.html  <- same
+- regression/tw_relative_effects_bar_labeled.png  <- output/regression/regression_results_TWFE.csv
+- regression/tw_period_effects_bar_labeled.png    <- output/regression/period_model_results.csv
+- regression/event_study_<event>.png              <- output/regression/event_study_<event>_coeffs.csv
+- ai/ic_vs_ai_quarterly.png                       <- data/processed/ic_with_ai_index.csv
+
+Usage:
+    python src/render_figures.py --outdir output --processed data/processed --jobs 4
+    python src/render_figures.py --force          # ignore the manifest, re-render everything
+    python src/render_figures.py --only "tw_*" "event_study_*"
+"""
+
+from __future__ import annotations
+import argparse
+import fnmatch
+import hashlib
+import inspect
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))  # shared by both projects
+from atomic_io import atomic_write_json, load_json  # noqa: E402
+from plot_exports import (  # noqa: E402
+    english_names,
+    load_country_map,
+    plot_interactive_bar_race,
+    plot_static_lines,
+)
+
+MANIFEST_FILE = ".render_manifest.json"
+
+
+@dataclass
+class FigureSpec:
+    name: str
+    render: Callable[..., None]
+    data: Optional[pd.DataFrame]  # None -> input missing, figure is reported and skipped
+    out: Path
+    params: Dict[str, object] = field(default_factory=dict)
+    deps: List[object] = field(default_factory=list)  # extra modules / functions the render reads
+
+
+# -------------------------
+# Regression / AI figures (ported from the notebooks; read their saved tables)
+# -------------------------
+
+_COEF_COLUMNS = {
+    "Coef.": "coef", "Coefficient": "coef", "coef": "coef",
+    "Std.Err.": "stderr", "Std. Err.": "stderr", "std err": "stderr",
+    "[0.025": "low", "2.5%": "low", "0.025": "low",
+    "0.975]": "high", "97.5%": "high", "0.975": "high",
+}
+
+
+def _coef_table(coef_raw: pd.DataFrame) -> pd.DataFrame:
+    coef = coef_raw.rename(columns={k: v for k, v in _COEF_COLUMNS.items() if k in coef_raw.columns})
+    if not {"low", "high"}.issubset(coef.columns):
+        coef["low"] = coef["coef"] - 1.96 * coef["stderr"]
+        coef["high"] = coef["coef"] + 1.96 * coef["stderr"]
+    return coef
+
+
+def _labeled_bars(labels, coef: pd.DataFrame, out_png: Path, ylabel: str, title: str, rotate: bool) -> None:
+    plt.figure(figsize=(8, 5))
+    plt.axhline(0, color="gray", linestyle="--", linewidth=1)
+    yerr = [coef["coef"] - coef["low"], coef["high"] - coef["coef"]]
+    bars = plt.bar(labels, coef["coef"], yerr=yerr, capsize=5, color="skyblue", edgecolor="black")
+    for bar, val in zip(bars, coef["coef"]):
+        plt.text(bar.get_x() + bar.get_width() / 2, bar.get_height(), f"{val:.2f}",
+                 ha="center", va="bottom", fontsize=9)
+    if rotate:
+        plt.xticks(rotation=45, ha="right")
+    plt.ylabel(ylabel)
+    plt.title(title)
+    plt.tight_layout()
+    out_png.parent.mkdir(parents=True, exist_ok=True)
+    plt.savefig(out_png, dpi=150, bbox_inches="tight")
+    plt.close()
+
+
+def plot_tw_event_effects(coef_raw: pd.DataFrame, out_png: Path, order: List[str]) -> None:
+    """TW_* interaction coefficients of the TWFE model with 95% CI."""
+    coef = _coef_table(coef_raw)
+    coef = coef[coef["variable"].str.startswith("TW_")].copy()
+    coef["order"] = coef["variable"].map({v: i for i, v in enumerate(order)})
+    coef = coef.sort_values("order")
+    _labeled_bars(coef["variable"], coef, out_png,
+                  "Effect on log(exports) (≈ % change)", "Taiwan Relative Effects (TWFE, 2013–2024)", rotate=True)
+
+
+def plot_tw_period_effects(coef_raw: pd.DataFrame, out_png: Path, order: List[str]) -> None:
+    """TW x Period interaction coefficients; the base period is drawn as 0."""
+    coef = _coef_table(coef_raw.rename(columns={coef_raw.columns[0]: "term"}))
+    pattern = re.compile(r"TW:C\(Period\)\[(.+?)\]|C\(Period\)\[(.+?)\]:TW")
+    groups = coef["term"].astype(str).str.extract(pattern)
+    rows = coef.assign(Period=groups[0].fillna(groups[1])).dropna(subset=["Period"])
+    if rows.empty:
+        raise RuntimeError("No TW x Period interaction terms in the period model table")
+    if order[0] not in rows["Period"].tolist():
+        base = pd.DataFrame([{"Period": order[0], "coef": 0.0, "low": 0.0, "high": 0.0}])
+        rows = pd.concat([base, rows], ignore_index=True)
+    rows = (rows.groupby("Period", as_index=False)
+                .agg(coef=("coef", "mean"), low=("low", "mean"), high=("high", "mean")))
+    rows = rows.assign(order=rows["Period"].map({v: i for i, v in enumerate(order)})).sort_values("order")
+    _labeled_bars(rows["Period"], rows, out_png, "TW extra effect by period on log(exports) (≈ % change)",
+                  "Taiwan Relative Effects by Mutually-Exclusive Periods", rotate=False)
+
+
+def plot_event_study(res: pd.DataFrame, out_png: Path, event_label: str) -> None:
+    """Event-study coefficients by k (years relative to the event), baseline k = -1."""
+    plot_df = res.dropna(subset=["coef"])
+    plt.figure(figsize=(8, 5))
+    plt.axhline(0, linestyle="--", linewidth=1)
+    plt.errorbar(plot_df["k"], plot_df["coef"],
+                 yerr=[plot_df["coef"] - plot_df["low"], plot_df["high"] - plot_df["coef"]],
+                 fmt="o-", capsize=4)
+    plt.axvline(0, color="black", linestyle=":", linewidth=1)
+    plt.text(0, plt.ylim()[1], "event year", ha="center", va="top", fontsize=9)
+    for x, v in zip(plot_df["k"], plot_df["coef"]):
+        plt.text(x, v, f"{v:.2f}", ha="center", va="bottom", fontsize=8)
+    plt.title(f"Event Study (TWFE) — {event_label}  (baseline k = -1)")
+    plt.xlabel("k (years relative to event)")
+    plt.ylabel("coef on log(exports)  (≈ % change)")
+    plt.tight_layout()
+    out_png.parent.mkdir(parents=True, exist_ok=True)
+    plt.savefig(out_png, dpi=150, bbox_inches="tight")
+    plt.close()
+
+
+def plot_ic_vs_ai(merged: pd.DataFrame, out_png: Path, target_col: str) -> None:
+    """Quarterly IC exports vs AI demand index with the OLS line."""
+    x, y = merged["ai_demand_index"].to_numpy(float), merged[target_col].to_numpy(float)
+    slope, intercept = np.polyfit(x, y, 1)
+    fig, ax = plt.subplots(figsize=(7, 5))
+    ax.scatter(x, y, s=18, alpha=0.7, label="obs")
+    xs = np.linspace(x.min(), x.max(), 100)
+    ax.plot(xs, intercept + slope * xs, linewidth=2, label="OLS fit")
+    ax.set_xlabel("AI Demand Index (quarterly avg)")
+    ax.set_ylabel(target_col)
+    ax.set_title("IC exports vs AI demand index (quarterly)")
+    ax.legend()
+    fig.tight_layout()
+    out_png.parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(out_png, dpi=150)
+    plt.close(fig)
+
+
+# -------------------------
+# Figure set
+# -------------------------
+
+def _read_optional(path: Path, **kwargs) -> Optional[pd.DataFrame]:
+    return pd.read_csv(path, **kwargs) if path.exists() else None
+
+
+def _read_trend(path: Path, mapping_json: Path) -> Optional[pd.DataFrame]:
+    """The Top10 trend table; older copies carry the raw Country column, mapped to Country_EN here."""
+    trend = _read_optional(path, encoding="utf-8-sig", float_precision="round_trip")
+    if trend is not None and "Country_EN" not in trend.columns and "Country" in trend.columns:
+        country = trend.pop("Country").str.strip().astype("category")
+        trend.insert(1, "Country_EN", english_names(country, load_country_map(mapping_json)))
+    return trend
+
+
+def standard_specs(
+    outdir: Path = Path("output"),
+    processed_dir: Path = Path("data/processed"),
+    year_country_top10: Optional[pd.DataFrame] = None,
+    mapping_json: Path = Path("data/mappings/country_name_map_full.json"),
+) -> List[FigureSpec]:
+    """All figures under output/; year_country_top10 may be passed in-memory from plot_exports."""
+    if year_country_top10 is None:
+        year_country_top10 = _read_trend(processed_dir / "top10_export_markets_trend_2013_2025.csv", mapping_json)
+    reg = outdir / "regression"
+    specs = [
+        FigureSpec("top10_trend_png", plot_static_lines, year_country_top10,
+                   outdir / "figures" / "taiwan_ic_top10_trend_en.png"),
+        FigureSpec("top10_bar_race_html", plot_interactive_bar_race, year_country_top10,
+                   outdir / "interactive" / "top10_export_markets_bar_race.html"),
+        FigureSpec("tw_relative_effects", plot_tw_event_effects,
+                   _read_optional(reg / "regression_results_TWFE.csv"),
+                   reg / "tw_relative_effects_bar_labeled.png",
+                   {"order": ["TW_TradeWar2018", "TW_Covid2020", "TW_ChipShort2021",
+                              "TW_ChipAct2022", "TW_USBan2023"]}),
+        FigureSpec("tw_period_effects", plot_tw_period_effects,
+                   _read_optional(reg / "period_model_results.csv", encoding="utf-8-sig"),
+                   reg / "tw_period_effects_bar_labeled.png",
+                   {"order": ["2013–2017", "2018–2019", "2020–2021", "2022–2024"]}),
+    ]
+    for coeffs in sorted(reg.glob("event_study_*_coeffs.csv")):
+        label = coeffs.name[len("event_study_"):-len("_coeffs.csv")]
+        specs.append(FigureSpec(f"event_study_{label}", plot_event_study, pd.read_csv(coeffs),
+                                reg / f"event_study_{label}.png", {"event_label": label}))
+
+    merged = _read_optional(processed_dir / "ic_with_ai_index.csv", encoding="utf-8-sig")
+    target = next((c for c in ("fobvalue", "cifvalue") if merged is not None and c in merged.columns), None)
+    specs.append(FigureSpec("ic_vs_ai_quarterly", plot_ic_vs_ai, merged if target else None,
+                            outdir / "ai" / "ic_vs_ai_quarterly.png", {"target_col": target}))
+    return specs
+
+
+# -------------------------
+# Fingerprints / rendering
+# -------------------------
+
+@lru_cache(maxsize=None)
+def _source(obj) -> str:
+    return inspect.getsource(obj)
+
+
+def fingerprint(spec: FigureSpec) -> str:
+    """
+    sha256 over the input frame (values + columns), the parameters and the source of the
+    module defining the render function (so edits to its helpers count), plus spec.deps.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps([list(map(str, spec.data.columns)), list(map(str, spec.data.dtypes))]).encode())
+    h.update(pd.util.hash_pandas_object(spec.data, index=False).to_numpy().tobytes())
+    h.update(json.dumps(spec.params, sort_keys=True, default=str).encode())
+    for dep in [inspect.getmodule(spec.render), *spec.deps]:
+        h.update(_source(dep).encode())
+    return h.hexdigest()
+
+
+def _render_one(spec: FigureSpec) -> float:
+    t0 = time.perf_counter()
+    spec.render(spec.data, spec.out, **spec.params)
+    return time.perf_counter() - t0
+
+
+def _failed(spec: FigureSpec, exc: BaseException) -> dict:
+    return {"figure": spec.name, "status": "failed", "seconds": 0.0, "error": f"{type(exc).__name__}: {exc}"}
+
+
+def render_figures(specs: List[FigureSpec], outdir: Path = Path("output"), jobs: int = 0,
+                   force: bool = False) -> pd.DataFrame:
+    """Render stale figures (in parallel when more than one), update the manifest, return a timing report."""
+    t_start = time.perf_counter()
+    manifest: Dict[str, str] = load_json(outdir / MANIFEST_FILE, {})
+    report, todo = [], []
+    for spec in specs:
+        if spec.data is None:
+            report.append({"figure": spec.name, "status": "missing input", "seconds": 0.0})
+            continue
+        key = os.path.relpath(spec.out, outdir)
+        fp = fingerprint(spec)
+        if not force and spec.out.exists() and manifest.get(key) == fp:
+            report.append({"figure": spec.name, "status": "cached", "seconds": 0.0})
+        else:
+            todo.append((spec, key, fp))
+
+    # One failing figure must not abort the batch: errors are collected per spec
+    jobs = jobs or os.cpu_count() or 1
+    rendered = []
+    if len(todo) > 1 and jobs > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(todo))) as pool:
+            futures = [(pool.submit(_render_one, spec), spec, key, fp) for spec, key, fp in todo]
+            for fut, spec, key, fp in futures:
+                try:
+                    rendered.append((spec, key, fp, fut.result()))
+                except Exception as exc:
+                    report.append(_failed(spec, exc))
+    else:
+        for spec, key, fp in todo:
+            try:
+                rendered.append((spec, key, fp, _render_one(spec)))
+            except Exception as exc:
+                report.append(_failed(spec, exc))
+
+    for spec, key, fp, sec in rendered:
+        manifest[key] = fp
+        report.append({"figure": spec.name, "status": "rendered", "seconds": round(sec, 3)})
+    if rendered:
+        outdir.mkdir(parents=True, exist_ok=True)
+        atomic_write_json(outdir / MANIFEST_FILE, manifest, indent=2, sort_keys=True)
+
+    report = pd.DataFrame(report, columns=["figure", "status", "seconds", "error"]).fillna({"error": ""})
+    report.attrs["wall_seconds"] = time.perf_counter() - t_start
+    return report
+
+
+def print_report(report: pd.DataFrame) -> None:
+    for row in report.itertuples(index=False):
+        print(f"  {row.figure:<28} {row.status:<14} {row.seconds:>7.2f}s  {row.error}".rstrip())
+    failed = int((report["status"] == "failed").sum())
+    print(f"Rendered {int((report['status'] == 'rendered').sum())}/{len(report)} figures "
+          f"in {report.attrs.get('wall_seconds', 0.0):.2f}s wall" + (f", {failed} failed" if failed else ""))
+
+
+# -------------------------
+# CLI
+# -------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Render (or refresh) all figures under output/")
+    ap.add_argument("--outdir", type=str, default="output")
+    ap.add_argument("--processed", type=str, default="data/processed")
+    ap.add_argument("--mapping", type=str, default="data/mappings/country_name_map_full.json",
+                    help="CN->EN country map, for trend tables that still carry the raw Country column")
+    ap.add_argument("--jobs", type=int, default=0, help="Worker processes (0 = CPU count)")
+    ap.add_argument("--force", action="store_true", help="Re-render even if the manifest says up to date")
+    ap.add_argument("--only", nargs="+", default=None, metavar="PATTERN",
+                    help="Render only figures whose name matches one of these globs (e.g. 'event_study_*')")
+    args = ap.parse_args()
+
+    outdir = Path(args.outdir)
+    specs = standard_specs(outdir, Path(args.processed), mapping_json=Path(args.mapping))
+    if args.only:
+        specs = [s for s in specs if any(fnmatch.fnmatchcase(s.name, pat) for pat in args.only)]
+    report = render_figures(specs, outdir, jobs=args.jobs, force=args.force)
+    print_report(report)
+    if (report["status"] == "failed").any():
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
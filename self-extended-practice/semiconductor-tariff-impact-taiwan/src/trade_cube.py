@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pre-aggregated trade cube: period x reporter x partner x HS, as dense NumPy arrays.
+
+The raw rows are grouped once into a base array (export values plus a row-count
+array, so "present" can be told apart from zero). Rollups to coarser levels are then
+built once and cached. The levels are year (from YYYYMM periods), HS-4/6/8 (codes are
+sorted, so each prefix is a contiguous run reduced by np.add.reduceat), and "summed
+out" for any dimension not kept. Queries index and reduce those small arrays. No
+pandas groupby runs per query:
+
+    cube.top_n(10, by="partner")                 # prepare_top10_tables' ranking
+    cube.share(by="partner", hs4="8542")         # (years x partners) yearly shares
+    cube.cagr(2013, 2024, by="reporter")         # cagr_summary_2013_2024.csv
+    cube.event_window(2018, pre=2, post=2)       # event_impact_summary.csv pre/post rows
+
+Levels: period -> "month" (monthly sources only), "year"; hs -> "hs4", "hs6", "hs8"
+(as far as the source's codes go); "reporter"; "partner".
+
+Usage:
+    python src/trade_cube.py build --source customs --out data/cube/customs.npz
+    python src/trade_cube.py build --source comtrade --input data/raw/ic_exports_world_HS8542_raw.csv --out data/cube/world.npz
+    python src/trade_cube.py top --cube data/cube/customs.npz --n 10
+    python src/trade_cube.py build --source comparison --out data/cube/comparison.npz
+    python src/trade_cube.py cagr --cube data/cube/comparison.npz --start 2013 --end 2024 --by reporter
+"""
+
+from __future__ import annotations
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+DIMS = ("period", "reporter", "partner", "hs")
+HS_LEVELS = ("hs4", "hs6", "hs8")
+STANDARD_ROLLUPS = [
+    ("year", "partner"),
+    ("year", "reporter"),
+    ("year", "partner", "hs4"),
+    ("year", "partner", "hs6"),
+    ("year", "reporter", "partner"),
+]
+
+
+@dataclass
+class Rollup:
+    """One cached aggregation: values / row counts over `levels` (in cube dimension order)."""
+    levels: Tuple[str, ...]
+    values: np.ndarray
+    counts: np.ndarray
+    coords: Dict[str, np.ndarray]
+    index: Dict[str, Dict[str, int]]
+
+    def axis(self, level: str) -> int:
+        return self.levels.index(level)
+
+
+def _as_list(sel) -> List[str]:
+    return [sel] if isinstance(sel, (str, int, np.integer)) else list(sel)
+
+
+class TradeCube:
+    def __init__(self, values: np.ndarray, counts: np.ndarray, coords: Dict[str, np.ndarray]):
+        self.values = values
+        self.counts = counts
+        self.coords = coords
+        period = coords["period"].astype(np.int64)
+        self.monthly = bool(len(period)) and int(period.max()) > 9999
+        hs_digits = min((len(c) for c in coords["hs"]), default=0)
+        self.hs_levels = [lv for lv in HS_LEVELS if int(lv[2:]) <= hs_digits]
+        self._groups = self._level_groups()
+        self._rollups: Dict[Tuple[str, ...], Rollup] = {}
+        self._masks: Dict[Tuple[str, Tuple[str, ...]], np.ndarray] = {}
+
+    # -------------------------
+    # Construction
+    # -------------------------
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, period: str, reporter: str, partner: str, hs: str, value: str,
+                   hs_digits: int = 8) -> "TradeCube":
+        """Group tidy rows once into the dense base array (HS codes truncated to hs_digits)."""
+        keys = {
+            "period": df[period].astype(np.int64).astype(str),
+            "reporter": df[reporter].astype(str),
+            "partner": df[partner].astype(str),
+            "hs": df[hs].astype(str).str.strip().str[:hs_digits],
+        }
+        codes, coords = [], {}
+        for dim in DIMS:
+            c, labels = pd.factorize(keys[dim], sort=True)
+            codes.append(c)
+            coords[dim] = np.asarray(labels, dtype=str)
+        shape = tuple(len(coords[d]) for d in DIMS)
+        flat = np.ravel_multi_index(codes, shape)
+        size = int(np.prod(shape))
+        vals = pd.to_numeric(df[value], errors="coerce").to_numpy(dtype=np.float64)
+        ok = ~np.isnan(vals)
+        values = np.bincount(flat[ok], weights=vals[ok], minlength=size).reshape(shape)
+        counts = np.bincount(flat[ok], minlength=size).astype(np.int32).reshape(shape)
+        cube = cls(values, counts, coords)
+        cube.build()
+        return cube
+
+    def _level_groups(self) -> Dict[str, Tuple[str, np.ndarray, np.ndarray]]:
+        """level -> (dimension, start offsets of each group along that dimension, group labels)."""
+        groups = {}
+        period = self.coords["period"]
+        groups["month" if self.monthly else "year"] = ("period", np.arange(len(period)), period)
+        if self.monthly:
+            years = np.array([p[:4] for p in period])
+            starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+            groups["year"] = ("period", starts, years[starts])
+        hs = self.coords["hs"]
+        for lv in self.hs_levels:
+            pref = np.array([c[:int(lv[2:])] for c in hs])
+            starts = np.flatnonzero(np.r_[True, pref[1:] != pref[:-1]]) if len(pref) else np.array([], int)
+            groups[lv] = ("hs", starts, pref[starts])
+        for dim in ("reporter", "partner"):
+            groups[dim] = (dim, np.arange(len(self.coords[dim])), self.coords[dim])
+        return groups
+
+    @property
+    def levels(self) -> List[str]:
+        return list(self._groups)
+
+    def build(self, rollups: Iterable[Sequence[str]] = STANDARD_ROLLUPS) -> "TradeCube":
+        """Materialize the standard rollups (those whose levels the source has)."""
+        for keep in rollups:
+            if all(lv in self._groups for lv in keep):
+                self.rollup(keep)
+        return self
+
+    def rollup(self, keep: Sequence[str]) -> Rollup:
+        """Aggregation keeping `keep` levels (one per dimension at most); cached after the first call."""
+        keep = tuple(sorted(keep, key=lambda lv: DIMS.index(self._groups[lv][0])))
+        hit = self._rollups.get(keep)
+        if hit is not None:
+            return hit
+        by_dim = {self._groups[lv][0]: lv for lv in keep}
+        if len(by_dim) != len(keep):
+            raise ValueError(f"At most one level per dimension: {keep}")
+        values, counts = self.values, self.counts
+        for axis in reversed(range(len(DIMS))):
+            lv = by_dim.get(DIMS[axis])
+            if lv is None:
+                values, counts = values.sum(axis=axis), counts.sum(axis=axis)
+            else:
+                starts = self._groups[lv][1]
+                if len(starts) != values.shape[axis]:
+                    values = np.add.reduceat(values, starts, axis=axis)
+                    counts = np.add.reduceat(counts, starts, axis=axis)
+        coords = {lv: self._groups[lv][2] for lv in keep}
+        index = {lv: {str(lab): i for i, lab in enumerate(coords[lv])} for lv in keep}
+        r = Rollup(keep, np.ascontiguousarray(values), np.ascontiguousarray(counts), coords, index)
+        self._rollups[keep] = r
+        return r
+
+    # -------------------------
+    # Slicing
+    # -------------------------
+
+    def view(self, keep: Sequence[str], **where) -> Tuple[np.ndarray, np.ndarray, Rollup]:
+        """
+        (values, counts, rollup) over `keep`, after restricting/summing the levels in `where`
+        (level=label or list of labels). Filtered levels are summed out of the result.
+        """
+        r = self.rollup(tuple(keep) + tuple(lv for lv in where if lv not in keep))
+        values, counts = r.values, r.counts
+        for lv, sel in where.items():
+            idx = [r.index[lv][str(s)] for s in _as_list(sel) if str(s) in r.index[lv]]
+            ax = r.axis(lv)
+            values = np.take(values, idx, axis=ax)
+            counts = np.take(counts, idx, axis=ax)
+            if lv not in keep:
+                values, counts = values.sum(axis=ax, keepdims=True), counts.sum(axis=ax, keepdims=True)
+        drop = tuple(r.axis(lv) for lv in where if lv not in keep)
+        if drop:
+            values, counts = values.squeeze(axis=drop), counts.squeeze(axis=drop)
+        return values, counts, r
+
+    def _year_by(self, by: str, years: Optional[Sequence[int]], where: dict, exclude: Sequence[str] = ()):
+        """(years x by) values / counts, the year labels kept and the `by` labels not excluded."""
+        values, counts, r = self.view(("year", by), **where)
+        year_labels, labels = r.coords["year"], r.coords[by]
+        if years is not None:
+            pos = [r.index["year"][str(y)] for y in years if str(y) in r.index["year"]]
+            values, counts, year_labels = values[pos], counts[pos], year_labels[pos]
+        if exclude:
+            keep = self._keep_mask(by, tuple(exclude))
+            values, counts, labels = values[:, keep], counts[:, keep], labels[keep]
+        return values, counts, year_labels, labels
+
+    def _keep_mask(self, level: str, exclude: Tuple[str, ...]) -> np.ndarray:
+        key = (level, exclude)
+        if key not in self._masks:
+            labels = self.rollup((level,)).coords[level]
+            self._masks[key] = ~np.isin(np.char.lower(labels), [e.lower() for e in exclude])
+        return self._masks[key]
+
+    # -------------------------
+    # Queries
+    # -------------------------
+
+    def top_n(self, n: int = 10, by: str = "partner", years: Optional[Sequence[int]] = None,
+              exclude: Sequence[str] = ("Others",), **where) -> Tuple[np.ndarray, np.ndarray]:
+        """Largest `by` labels by yearly average (over the years each label appears, as groupby().mean())."""
+        values, counts, _, labels = self._year_by(by, years, where, exclude)
+        present = (counts > 0).sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg = np.where(present > 0, values.sum(axis=0) / present, np.nan)
+        order = np.argsort(-np.nan_to_num(avg, nan=-np.inf), kind="stable")[:n]
+        order = order[~np.isnan(avg[order])]
+        return labels[order], avg[order]
+
+    def share(self, by: str = "partner", years: Optional[Sequence[int]] = None,
+              exclude: Sequence[str] = ("Others",), **where):
+        """(year labels, by labels, years x by share of each year's total); excluded labels leave the total."""
+        values, _, year_labels, labels = self._year_by(by, years, where, exclude)
+        total = values.sum(axis=1, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return year_labels, labels, values / total
+
+    def cagr(self, start: int, end: int, by: str = "reporter", **where):
+        """(by labels, start values, end values, CAGR) between two years."""
+        values, _, year_labels, labels = self._year_by(by, [start, end], where)
+        if values.shape[0] != 2:
+            missing = sorted({str(start), str(end)} - set(year_labels))
+            raise ValueError(f"Cube has no data for year(s) {', '.join(missing)}")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rate = (values[1] / values[0]) ** (1.0 / (end - start)) - 1.0
+        return labels, values[0], values[1], rate
+
+    def event_window(self, event_year: int, pre: int = 2, post: int = 2, by: str = "partner",
+                     exclude: Sequence[str] = ("Others",), **where) -> dict:
+        """
+        Average value and average yearly share over [event-pre, event-1] and [event+1, event+post]
+        (the event year itself is in neither window); NaN where a window has no data.
+        """
+        values, _, year_labels, labels = self._year_by(by, None, where, exclude)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            shares = values / values.sum(axis=1, keepdims=True)
+        yrs = year_labels.astype(np.int64)
+        pre_m = (yrs >= event_year - pre) & (yrs <= event_year - 1)
+        post_m = (yrs >= event_year + 1) & (yrs <= event_year + post)
+
+        def _avg(a, m):
+            return a[m].mean(axis=0) if m.any() else np.full(a.shape[1], np.nan)
+
+        out = {
+            "labels": labels,
+            "pre_avg": _avg(values, pre_m),
+            "post_avg": _avg(values, post_m),
+            "pre_share": _avg(shares, pre_m),
+            "post_share": _avg(shares, post_m),
+        }
+        out["delta"] = out["post_avg"] - out["pre_avg"]
+        out["delta_share"] = out["post_share"] - out["pre_share"]
+        return out
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+
+    def save(self, path: Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, values=self.values, counts=self.counts, **{f"coord_{d}": self.coords[d] for d in DIMS})
+        return path
+
+    @classmethod
+    def load(cls, path: Path, build: bool = True) -> "TradeCube":
+        with np.load(path) as z:
+            cube = cls(z["values"], z["counts"], {d: z[f"coord_{d}"] for d in DIMS})
+        return cube.build() if build else cube
+
+
+# -------------------------
+# Sources
+# -------------------------
+
+def customs_cube(raw_csv: Path, mapping_json: Path, year_min: int = 2013, year_max: int = 2025) -> TradeCube:
+    """Taiwan customs by destination: reporter Taiwan, partner = English country name (as plot_exports)."""
+    from plot_exports import english_names, load_country_map, read_exports
+
+    df = read_exports(raw_csv, year_min=year_min, year_max=year_max, hs_prefix="8542")
+    df["Country_EN"] = english_names(df["Country"], load_country_map(mapping_json))
+    df["Reporter"] = "Taiwan"
+    return TradeCube.from_frame(df, "Year", "Reporter", "Country_EN", "HS Code", "Export Value (USD)")
+
+
+def comtrade_cube(raw_csv: Path) -> TradeCube:
+    """UN Comtrade API extract; only the five used columns of the 47 are read."""
+    cols = ["period", "reporterDesc", "partnerDesc", "cmdCode", "primaryValue"]
+    df = pd.read_csv(raw_csv, usecols=cols, index_col=False, encoding_errors="replace",
+                     dtype={"period": "string", "cmdCode": "string"})
+    return TradeCube.from_frame(df, "period", "reporterDesc", "partnerDesc", "cmdCode", "primaryValue")
+
+
+def comparison_cube(csv: Path) -> TradeCube:
+    """data/processed/ic_exports_comparison_panel.csv: one reporter per country, partner World, HS 8542."""
+    df = pd.read_csv(csv, usecols=["Year", "Country", "ExportValue(USD)"]).assign(Partner="World", HS="8542")
+    return TradeCube.from_frame(df, "Year", "Country", "Partner", "HS", "ExportValue(USD)")
+
+
+SOURCES = {
+    "customs": "data/raw/taiwan_exports_by_country_2013_2025.csv",
+    "comtrade": "data/raw/ic_exports_world_HS8542_raw.csv",
+    "comparison": "data/processed/ic_exports_comparison_panel.csv",
+}
+
+
+# -------------------------
+# CLI
+# -------------------------
+
+def _where(args) -> dict:
+    return dict(w.split("=", 1) for w in (args.where or []))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build / query the pre-aggregated trade cube")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("build")
+    b.add_argument("--source", choices=list(SOURCES), default="customs")
+    b.add_argument("--input", type=str, default=None, help="Source file (default per --source)")
+    b.add_argument("--mapping", type=str, default="data/mappings/country_name_map_full.json")
+    b.add_argument("--out", type=str, required=True)
+
+    for name in ("top", "share", "cagr", "event"):
+        q = sub.add_parser(name)
+        q.add_argument("--cube", type=str, required=True)
+        q.add_argument("--by", type=str, default="partner")
+        q.add_argument("--where", nargs="*", metavar="LEVEL=LABEL", help="e.g. hs4=8542 reporter=Taiwan")
+        if name == "top":
+            q.add_argument("--n", type=int, default=10)
+        if name == "cagr":
+            q.add_argument("--start", type=int, required=True)
+            q.add_argument("--end", type=int, required=True)
+        if name == "event":
+            q.add_argument("--year", type=int, required=True)
+            q.add_argument("--pre", type=int, default=2)
+            q.add_argument("--post", type=int, default=2)
+    args = ap.parse_args()
+
+    if args.command == "build":
+        src = Path(args.input or SOURCES[args.source])
+        if args.source == "customs":
+            cube = customs_cube(src, Path(args.mapping))
+        elif args.source == "comtrade":
+            cube = comtrade_cube(src)
+        else:
+            cube = comparison_cube(src)
+        cube.save(Path(args.out))
+        shape = " x ".join(f"{d}={len(cube.coords[d])}" for d in DIMS)
+        print(f"✅ Saved cube -> {args.out} ({shape}; levels: {', '.join(cube.levels)})")
+        return
+
+    cube = TradeCube.load(Path(args.cube))
+    where = _where(args)
+    if args.command == "top":
+        labels, avg = cube.top_n(args.n, by=args.by, **where)
+        out = pd.DataFrame({args.by: labels, "Avg_USD": avg})
+    elif args.command == "share":
+        years, labels, shares = cube.share(by=args.by, **where)
+        out = pd.DataFrame(shares, index=years, columns=labels)
+    elif args.command == "cagr":
+        labels, v0, v1, rate = cube.cagr(args.start, args.end, by=args.by, **where)
+        out = pd.DataFrame({args.by: labels, f"{args.start}": v0, f"{args.end}": v1, "CAGR(%)": rate * 100})
+    else:
+        res = cube.event_window(args.year, args.pre, args.post, by=args.by, **where)
+        out = pd.DataFrame({k: v for k, v in res.items()}).rename(columns={"labels": args.by})
+    print(out.to_string(index=args.command == "share"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,56 @@
-import json
+import argparse
+import sys
+from pathlib import Path
+
 import pandas as pd
 import folium
 
+from quake_sources import load_quakes
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))  # 兩個專案共用的模組
+from stage_trace import add_profile_args, configure, stage  # noqa: E402
+
 # 路徑：以 repo 根目錄為基準
 JSON_PATH = "./self-extended-practice/taiwan_earthquake_analysis/data/earthquakes/E-A0073-001.json"
 HTML_OUT = "./self-extended-practice/taiwan_earthquake_analysis/output/taiwan_earthquake_map.html"
 
-# 讀 JSON
-with open(JSON_PATH, "r", encoding="utf-8") as f:
-    data = json.load(f)
-
-# 取地震清單
-eq_list = data["cwaopendata"]["Dataset"]["Catalog"]["EarthquakeInfo"]
-df = pd.json_normalize(eq_list)
+# 只有效能紀錄參數（--profile 等）；路徑固定用上面兩個
+ap = argparse.ArgumentParser(description="台灣地震地圖（單檔、逐點 marker）")
+add_profile_args(ap)
+configure("make_map", ap.parse_args())
 
-# 欄位轉型
-df["lat"] = pd.to_numeric(df["EpicenterLatitude"], errors="coerce")
-df["lon"] = pd.to_numeric(df["EpicenterLongitude"], errors="coerce")
-df["depth"] = pd.to_numeric(df["FocalDepth"], errors="coerce")
-df["mag"] = pd.to_numeric(df["LocalMagnitude"], errors="coerce")
-df["year"] = pd.to_datetime(df["OriginTime"], errors="coerce").dt.year
+# 讀 JSON（自動辨識 CWA/GDMS；內容沒變時直接讀 data/cache/ 的 Parquet）
+df = load_quakes(JSON_PATH)
 
 # 只留台灣近海範圍，避免跑去太平洋 & 中國內陸
-df = df[(df["lat"] >= 20) & (df["lat"] <= 26.5) & (df["lon"] >= 118) & (df["lon"] <= 123.8)]
+with stage("filter", rows_in=len(df)) as st:
+    df = df[(df["lat"] >= 20) & (df["lat"] <= 26.5) & (df["lon"] >= 118) & (df["lon"] <= 123.8)]
+    st.rows(out=len(df))
 
 # folium 繪圖
 m = folium.Map(location=[23.7, 121], zoom_start=7, tiles="OpenStreetMap")
 
-for _, row in df.iterrows():
-    if pd.isna(row["lat"]) or pd.isna(row["lon"]):
-        continue
-    color = "blue" if (row["depth"] or 0) < 70 else "red"
-    radius = max(2, min(12, (row["mag"] or 0) * 2))
-
-    folium.CircleMarker(
-        location=[row["lat"], row["lon"]],
-        radius=radius,
-        color=color,
-        fill=True,
-        fill_color=color,
-        fill_opacity=0.6,
-        popup=(
-            f"時間：{row['OriginTime']}<br>"
-            f"規模：{row['mag']}<br>"
-            f"深度：{row['depth']} km<br>"
-            f"座標：({row['lat']}, {row['lon']})"
-        )
-    ).add_to(m)
-
-m.save(HTML_OUT)
+with stage("render", rows_in=len(df)):
+    for _, row in df.iterrows():
+        if pd.isna(row["lat"]) or pd.isna(row["lon"]):
+            continue
+        color = "blue" if (row["depth"] or 0) < 70 else "red"
+        radius = max(2, min(12, (row["mag"] or 0) * 2))
+
+        folium.CircleMarker(
+            location=[row["lat"], row["lon"]],
+            radius=radius,
+            color=color,
+            fill=True,
+            fill_color=color,
+            fill_opacity=0.6,
+            popup=(
+                f"時間：{row['time'].strftime('%Y-%m-%d %H:%M:%S') if pd.notna(row['time']) else '—'}<br>"
+                f"規模：{row['mag']}<br>"
+                f"深度：{row['depth']} km<br>"
+                f"座標：({row['lat']}, {row['lon']})"
+            )
+        ).add_to(m)
+
+with stage("write", rows_in=len(df)):
+    m.save(HTML_OUT)
 print(f"✅ 地圖已輸出：{HTML_OUT}")
@@ -1,194 +1,310 @@
 # src/make_map_by_year.py
 from __future__ import annotations
 from pathlib import Path
+from typing import Iterable
+import argparse
 import json
-import re
+import sys
+import numpy as np
 import pandas as pd
 import folium
-from branca.element import Element
+from branca.element import Element, MacroElement
+from jinja2 import Template
+
+from quake_binning import LON_SCALE, bin_quakes
+from quake_sources import load_quakes
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))  # 兩個專案共用的模組
+from stage_trace import add_profile_args, configure, stage  # noqa: E402
 
 
 # -------------------------------
-# 小工具：欄名/時間欄位推斷
+# 向量化 marker：整年一次算好顏色/半徑/popup，交給前端畫
 # -------------------------------
-def _pick(df: pd.DataFrame, candidates: list[str]) -> str | None:
-    """在 df 欄名中，找出第一個存在的候選名稱（不分大小寫）。"""
-    lower_map = {str(c).lower(): c for c in df.columns}
-    for k in candidates:
-        if k.lower() in lower_map:
-            return lower_map[k.lower()]
-    return None
+# 顏色：<=70km 橘色，>70km 紅色（索引 0 / 1）
+DEPTH_COLORS = ["#ff7f0e", "#d62728"]
 
 
-def _infer_time_from_row(row: pd.Series) -> str | None:
+def _quake_columns(yearly: pd.DataFrame) -> dict[str, list]:
+    """
+    把一年的地震一次轉成欄位式陣列（不逐列 iterrows）：
+    lat/lon、半徑 r、顏色索引 c，以及 popup 用的時間/規模/深度字串。
     """
-    嘗試從一列中推斷出可 parse 的時間字串。
-    支援：
-    - 完整 datetime (YYYY-MM-DD HH:MM:SS 或含 T / /)
-    - date(YYYYMMDD) + time(HHMMSS 或 HH:MM:SS)
-    - 欄名含 datetime / time / originTime / eventTime
+    n = len(yearly)
+    depth = yearly["depth"].to_numpy(dtype=float) if "depth" in yearly else np.full(n, np.nan)
+    mag = yearly["mag"].to_numpy(dtype=float) if "mag" in yearly else np.full(n, np.nan)
+
+    color_idx = np.where(np.isnan(depth) | (depth <= 70), 0, 1)
+    radius = np.round(3 + np.nan_to_num(mag, nan=0.0), 2)  # 規模越大點越大
+
+    mag_s = pd.Series(mag).map("{:.1f}".format).where(~np.isnan(mag), "—")
+    dep_s = pd.Series(depth).map("{:.1f} km".format).where(~np.isnan(depth), "—")
+
+    return {
+        "lat": np.round(yearly["lat"].to_numpy(dtype=float), 4).tolist(),
+        "lon": np.round(yearly["lon"].to_numpy(dtype=float), 4).tolist(),
+        "r": radius.tolist(),
+        "c": color_idx.tolist(),
+        "t": pd.to_datetime(yearly["time"]).dt.strftime("%Y-%m-%d %H:%M:%S").tolist(),
+        "m": mag_s.tolist(),
+        "d": dep_s.tolist(),
+    }
+
+
+def _nullable(values: np.ndarray, decimals: int) -> list:
+    """NaN → None（JSON null），其餘四捨五入。"""
+    out = np.round(values.astype(float), decimals).astype(object)
+    out[np.isnan(values.astype(float))] = None
+    return out.tolist()
+
+
+def _cell_columns(yearly: pd.DataFrame, cell_deg: float, kind: str) -> dict[str, list]:
+    """聚合模式：用 quake_binning.bin_quakes 聚成格網後的欄位式陣列（格中心、筆數、最大規模、平均深度）。"""
+    cells = bin_quakes(yearly, cell_deg=cell_deg, kind=kind)
+    return {
+        "lat": np.round(cells["lat"].to_numpy(dtype=float), 4).tolist(),
+        "lon": np.round(cells["lon"].to_numpy(dtype=float), 4).tolist(),
+        "n": cells["count"].astype(int).tolist(),
+        "m": _nullable(cells["max_mag"].to_numpy(), 1),
+        "d": _nullable(cells["mean_depth"].to_numpy(), 1),
+    }
+
+
+def _binned(n: int, mode: str, bin_threshold: int) -> bool:
+    return mode == "binned" or (mode == "auto" and n > bin_threshold)
+
+
+def layer_payload(
+    yearly: pd.DataFrame,
+    mode: str = "auto",
+    bin_threshold: int = 10_000,
+    cell_deg: float = 0.1,
+    bin_kind: str = "hex",
+) -> tuple[str, dict, dict]:
     """
-    # 1) 直接有完整 datetime 的情況
-    for v in row.values:
-        s = (v if isinstance(v, str) else str(v)).strip()
-        if re.match(r"^\d{4}[-/]\d{2}[-/]\d{2}[ T]\d{2}:\d{2}:\d{2}$", s):
-            return s.replace("T", " ").replace("/", "-")
-
-    # 2) 分離的 date/time
-    date_s, time_s = None, None
-    for v in row.values:
-        s = (v if isinstance(v, str) else str(v)).strip()
-        if re.match(r"^\d{8}$", s):  # YYYYMMDD
-            date_s = s
-        if re.match(r"^\d{6}$", s) or re.match(r"^\d{2}:\d{2}:\d{2}$", s):
-            time_s = s
-    if date_s and time_s:
-        y, m, d = date_s[:4], date_s[4:6], date_s[6:8]
-        hhmmss = time_s if ":" in time_s else f"{time_s[:2]}:{time_s[2:4]}:{time_s[4:6]}"
-        return f"{y}-{m}-{d} {hhmmss}"
-
-    # 3) 可能藏在特定欄
-    for k, v in row.items():
-        if str(k).lower() in {"datetime", "origintime", "eventtime", "time"}:
-            s = (v if isinstance(v, str) else str(v)).strip()
-            s = s.replace("T", " ").replace("/", "-")
-            # 若尾巴是 HHMMSS，補上冒號
-            if re.search(r"\d{6}$", s) and not re.search(r"\d{2}:\d{2}:\d{2}$", s):
-                s = re.sub(r"(\d{2})(\d{2})(\d{2})$", r"\1:\2:\3", s)
-            return s
-    return None
+    一個圖層的 (kind, data, opts)，即 quakeDraw[kind](layer, data, opts) 的參數：
+    mode="binned"，或 "auto" 且筆數 > bin_threshold 時聚合成格網（"cells"），否則逐點（"points"）。
+    延遲載入的 <year>.json 與查詢伺服器回傳的都是 {"kind", "opts", "data"}。
+    """
+    if _binned(len(yearly), mode, bin_threshold):
+        opts = {"kind": bin_kind, "cell": cell_deg, "lonScale": LON_SCALE, "colors": DEPTH_COLORS}
+        return "cells", _cell_columns(yearly, cell_deg, bin_kind), opts
+    return "points", _quake_columns(yearly), {"colors": DEPTH_COLORS}
 
 
-# -------------------------------
-# 只支援 GDMS Catalog：讀檔 → DataFrame
-# -------------------------------
-def _load_quakes_from_gdms(json_path: str | Path) -> pd.DataFrame:
+def _compact_json(obj) -> str:
+    """緊湊 JSON（無空白），並跳脫 '<' 以便安全嵌入 <script>。"""
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).replace("<", "\\u003c")
+
+
+# 前端繪圖函式（整頁只放一次）：
+# - points：逐點 circleMarker（canvas renderer）
+# - cells ：每格一個六角形/方形（顏色 = 平均深度分類，透明度 = log 筆數）
+# - lazy  ：圖層第一次被加到地圖時才 fetch 該年資料檔，之後留在記憶體不再下載
+QUAKE_DRAW_JS = """
+<script>
+var quakeDraw = {
+  points: function(layer, d, o) {
+    var renderer = L.canvas();
+    for (var i = 0; i < d.lat.length; i++) {
+      var col = o.colors[d.c[i]];
+      L.circleMarker([d.lat[i], d.lon[i]], {
+        renderer: renderer, radius: d.r[i], color: col, weight: 1,
+        fill: true, fillColor: col, fillOpacity: 0.65
+      }).bindPopup(
+        "時間：" + d.t[i] + "<br>規模：" + d.m[i] + "<br>深度：" + d.d[i]
+      ).addTo(layer);
+    }
+  },
+  cells: function(layer, d, o) {
+    var renderer = L.canvas();
+    var maxN = Math.max.apply(null, d.n.concat([2]));
+    var half = o.cell / 2, size = o.cell / Math.sqrt(3);
+    function fmt(v, unit) { return v === null ? "—" : v.toFixed(1) + unit; }
+    for (var i = 0; i < d.lat.length; i++) {
+      var lat = d.lat[i], lon = d.lon[i], ring = [];
+      if (o.kind === "hex") {
+        for (var k = 0; k < 6; k++) {
+          var a = Math.PI / 180 * (60 * k - 30);
+          ring.push([lat + size * Math.sin(a), lon + size * Math.cos(a) / o.lonScale]);
+        }
+      } else {
+        ring = [[lat - half, lon - half], [lat - half, lon + half],
+                [lat + half, lon + half], [lat + half, lon - half]];
+      }
+      var col = o.colors[(d.d[i] !== null && d.d[i] > 70) ? 1 : 0];
+      L.polygon(ring, {
+        renderer: renderer, color: col, weight: 0.5, fillColor: col,
+        fillOpacity: 0.15 + 0.7 * Math.log(d.n[i] + 1) / Math.log(maxN + 1)
+      }).bindPopup(
+        "筆數：" + d.n[i] + "<br>最大規模：" + fmt(d.m[i], "") + "<br>平均深度：" + fmt(d.d[i], " km")
+      ).addTo(layer);
+    }
+  },
+  lazy: function(layer, url) {
+    var pending = null;
+    layer.on("add", function() {
+      if (pending) return;
+      pending = fetch(url)
+        .then(function(r) { return r.json(); })
+        .then(function(p) { quakeDraw[p.kind](layer, p.data, p.opts); })
+        .catch(function(err) { pending = null; console.error("載入失敗：" + url, err); });
+    });
+  }
+};
+</script>
+"""
+
+
+class QuakeLayer(folium.FeatureGroup):
     """
-    讀取 GDMS Catalog JSON（header+body），回傳標準欄位：
-    ['time','lat','lon','depth','mag','year']
+    一個年份 = 一個 FeatureGroup，資料以欄位式陣列表示，由前端 quakeDraw 繪製。
+
+    - 內嵌：data 直接寫進 HTML（kind = "points" 或 "cells"）
+    - 延遲載入：只寫 url，圖層第一次顯示時才下載該年的資料檔
     """
-    p = Path(json_path)
-    with p.open("r", encoding="utf-8") as f:
-        raw = json.load(f)
-
-    if not (isinstance(raw, dict) and {"header", "body"} <= set(raw.keys())):
-        raise ValueError("此版本僅支援 GDMS Catalog（需包含 'header' 與 'body'）。")
-
-    header, body = raw["header"], raw["body"]
-    if not isinstance(header, list) or not isinstance(body, list) or not body:
-        raise ValueError("GDMS JSON 結構不完整（header/body）。")
-
-    # body 可能是「list of list」或「list of dict」
-    if isinstance(body[0], (list, tuple)):
-        max_len = max(len(r) for r in body)
-        cols = [str(h) for h in header][:max_len]
-        if len(cols) < max_len:
-            cols += [f"col_{i}" for i in range(len(cols), max_len)]
-        body_fixed = [list(r) + [None] * (max_len - len(r)) for r in body]
-        df = pd.DataFrame(body_fixed, columns=cols)
-    else:
-        df = pd.DataFrame(body)
-
-    # 找時間欄（優先 date+time，其次 datetime / originTime / eventTime / time）
-    date_col = _pick(df, ["date", "日期"])
-    time_col = _pick(df, ["time", "時間"])
-    dt_col = _pick(df, ["datetime", "origintime", "eventtime", "發震時刻", "time"])
-
-    if date_col and time_col:
-        ts_series = (
-            df[date_col].astype(str).str.strip()
-            + " "
-            + df[time_col].astype(str).str.strip()
-        )
-        # 標準化：YYYY-MM-DD HH:MM:SS
-        ts_series = ts_series.str.replace("T", " ", regex=False).str.replace("/", "-", regex=False)
-        # 若 time 是 HHMMSS 沒有冒號，加上
-        ts_series = ts_series.apply(
-            lambda s: re.sub(r"(\d{2})(\d{2})(\d{2})$", r"\1:\2:\3", s) if re.search(r"\d{6}$", s) and ":" not in s[-8:] else s
-        )
-        df["time"] = pd.to_datetime(ts_series, errors="coerce")
-    elif dt_col:
-        tmp = df[dt_col].astype(str).str.strip().str.replace("T", " ", regex=False).str.replace("/", "-", regex=False)
-        tmp = tmp.apply(
-            lambda s: re.sub(r"(\d{2})(\d{2})(\d{2})$", r"\1:\2:\3", s) if re.search(r"\d{6}$", s) and ":" not in s[-8:] else s
-        )
-        df["time"] = pd.to_datetime(tmp, errors="coerce")
-    else:
-        # 逐列嘗試推斷
-        df["time"] = pd.to_datetime(df.apply(_infer_time_from_row, axis=1), errors="coerce")
-
-    # 經緯度/深度/規模欄位
-    lat_col = _pick(df, ["lat", "latitude", "緯度", "y", "震央緯度"])
-    lon_col = _pick(df, ["lon", "longitude", "經度", "x", "震央經度"])
-    dep_col = _pick(df, ["depth", "focaldepth", "深度"])
-    mag_col = _pick(df, ["mag", "magnitude", "規模", "ml", "mw"])
-
-    rename = {}
-    if lat_col: rename[lat_col] = "lat"
-    if lon_col: rename[lon_col] = "lon"
-    if dep_col: rename[dep_col] = "depth"
-    if mag_col: rename[mag_col] = "mag"
-    df = df.rename(columns=rename)
-
-    # 型別轉換
-    for c in ["lat", "lon", "depth", "mag"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-
-    # 只保留需要欄位
-    keep = ["time", "lat", "lon"] + [c for c in ["depth", "mag"] if c in df.columns]
-    df = df[keep]
-
-    # 去除無效
-    df = df.dropna(subset=["time", "lat", "lon"]).copy()
-
-    # 台灣大致範圍（避免海外點誤入）
-    df = df[(df["lat"].between(20, 27)) & (df["lon"].between(118, 124))].copy()
-
-    df["year"] = pd.to_datetime(df["time"]).dt.year
-    df = df.sort_values("time").reset_index(drop=True)
-    return df
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.featureGroup(
+                {{ this.options|tojson }}
+            );
+            {%- if this.url %}
+            quakeDraw.lazy({{ this.get_name() }}, {{ this.url|tojson }});
+            {%- else %}
+            quakeDraw.{{ this.kind }}({{ this.get_name() }}, {{ this.data_json }}, {{ this.opts|tojson }});
+            {%- endif %}
+        {% endmacro %}
+        """
+    )
+
+    def __init__(self, kind: str, data: dict | None = None, opts: dict | None = None,
+                 url: str | None = None, name: str | None = None, show: bool = True):
+        super().__init__(name=name, show=show)
+        self._name = "QuakeLayer"
+        self.kind = kind
+        self.url = url
+        self.data_json = _compact_json(data) if data is not None else "null"
+        self.opts = opts or {}
+
+
+def _add_circle_markers(fg: folium.FeatureGroup, yearly: pd.DataFrame) -> None:
+    """舊路徑：每筆地震一個 folium.CircleMarker（保留作為對照/基準）。"""
+    for _, r in yearly.iterrows():
+        depth = float(r["depth"]) if "depth" in r and pd.notna(r["depth"]) else None
+        mag = float(r["mag"]) if "mag" in r and pd.notna(r["mag"]) else None
+
+        # 顏色：<=70km 橘色，>70km 紅色
+        color = DEPTH_COLORS[0] if (depth is None or depth <= 70) else DEPTH_COLORS[1]
+
+        folium.CircleMarker(
+            location=[float(r["lat"]), float(r["lon"])],
+            radius=(3 + (mag if mag is not None else 0)),  # 規模越大點越大
+            color=color,
+            weight=1,
+            fill=True,
+            fill_color=color,
+            fill_opacity=0.65,
+            popup=(
+                f"時間：{pd.to_datetime(r['time']).strftime('%Y-%m-%d %H:%M:%S')}<br>"
+                f"規模：{(f'{mag:.1f}' if mag is not None else '—')}<br>"
+                f"深度：{(f'{depth:.1f} km' if depth is not None else '—')}"
+            ),
+        ).add_to(fg)
 
 
 # -------------------------------
 # 互動地圖（下拉選年）— 橘/紅配色
 # -------------------------------
-def make_interactive_map(json_path: str, outfile: str = "index.html") -> None:
-    df = _load_quakes_from_gdms(json_path)
+def make_interactive_map(
+    json_path: str | Iterable[str],
+    outfile: str = "index.html",
+    renderer: str = "packed",
+    use_cache: bool = True,
+    mode: str = "auto",
+    bin_threshold: int = 10_000,
+    cell_deg: float = 0.1,
+    bin_kind: str = "hex",
+    lazy: bool = False,
+    data_dir: str = "quakes",
+    data_url: str | None = None,
+) -> None:
+    """
+    json_path：一個或多個地震目錄檔（GDMS 或 CWA，自動辨識；多檔會合併去重）。
+
+    renderer（逐點模式時）:
+    - "packed"  ：每年一個欄位式資料圖層，前端繪製（預設，適合大型目錄）
+    - "markers" ：每筆一個 folium.CircleMarker（舊版行為）
+
+    mode:
+    - "auto"   ：該年事件數 > bin_threshold 時改用聚合格網，否則逐點
+    - "raw"    ：一律逐點
+    - "binned" ：一律聚合成 cell_deg 度的六角格（bin_kind="hex"）或方格（"grid"）
+
+    use_cache：以 Parquet 快取解析後的目錄（data/cache/），JSON 沒變就不重新解析。
+
+    lazy：每年的資料另存成 HTML 旁的 <data_dir>/<year>.json，HTML 只放 URL；
+    下拉選到該年時才下載並留在瀏覽器記憶體。首頁載入時間與年份數無關，
+    但需經由 HTTP 開啟（GitHub Pages 或 python -m http.server），file:// 無法 fetch。
+
+    data_url：改向查詢伺服器要資料（例如 http://127.0.0.1:8765/api/quakes/layer），
+    每個圖層的 URL 為 <data_url>?year=<year>&mode=...（帶上 mode / 格網參數），不寫任何資料檔；
+    伺服器需開著，頁面才有資料。
+    """
+    if renderer not in {"packed", "markers"}:
+        raise ValueError(f"未知的 renderer：{renderer!r}（可用 'packed' 或 'markers'）")
+    if mode not in {"auto", "raw", "binned"}:
+        raise ValueError(f"未知的 mode：{mode!r}（可用 'auto'、'raw' 或 'binned'）")
+
+    df = load_quakes(json_path, use_cache=use_cache)
 
     years = sorted(df["year"].dropna().unique().tolist())
     print(f"[INFO] records={len(df)}, years={years}")
 
     m = folium.Map(location=[23.7, 121.0], zoom_start=7, tiles="CartoDB positron")
+    m.get_root().header.add_child(Element(QUAKE_DRAW_JS), name="quake_draw")
+
+    out_dir = Path(outfile).parent
+    if lazy and not data_url:
+        (out_dir / data_dir).mkdir(parents=True, exist_ok=True)
 
     # 每個年份一個 FeatureGroup；記下對應的 JS 變數名稱
     year_to_jsvar: dict[int, str] = {}
 
     for i, year in enumerate(years):
-        fg = folium.FeatureGroup(name=str(year), show=(i == 0))
-        yearly = df[df["year"] == year]
-
-        for _, r in yearly.iterrows():
-            depth = float(r["depth"]) if "depth" in r and pd.notna(r["depth"]) else None
-            mag = float(r["mag"]) if "mag" in r and pd.notna(r["mag"]) else None
-
-            # 顏色：<=70km 橘色，>70km 紅色
-            color = "#ff7f0e" if (depth is None or depth <= 70) else "#d62728"
-
-            folium.CircleMarker(
-                location=[float(r["lat"]), float(r["lon"])],
-                radius=(3 + (mag if mag is not None else 0)),  # 規模越大點越大
-                color=color,
-                weight=1,
-                fill=True,
-                fill_color=color,
-                fill_opacity=0.65,
-                popup=(
-                    f"時間：{pd.to_datetime(r['time']).strftime('%Y-%m-%d %H:%M:%S')}<br>"
-                    f"規模：{(f'{mag:.1f}' if mag is not None else '—')}<br>"
-                    f"深度：{(f'{depth:.1f} km' if depth is not None else '—')}"
-                ),
-            ).add_to(fg)
+        if data_url:
+            # 資料由查詢伺服器（query_server.py）依同樣的 mode / 格網參數即時產生，這裡只寫 URL
+            url = (f"{data_url}?year={year}&mode={mode}&bin_threshold={bin_threshold}"
+                   f"&cell_deg={cell_deg}&bin_kind={bin_kind}")
+            fg = QuakeLayer("points", url=url, name=str(year), show=(i == 0))
+            fg.add_to(m)
+            year_to_jsvar[year] = fg.get_name()
+            continue
+
+        with stage("filter", rows_in=len(df)) as st:
+            yearly = df[df["year"] == year]
+            st.rows(out=len(yearly))
+
+        with stage("render", rows_in=len(yearly)) as st:
+            if renderer == "markers" and not _binned(len(yearly), mode, bin_threshold):
+                kind = None
+            else:
+                kind, data, opts = layer_payload(yearly, mode, bin_threshold, cell_deg, bin_kind)
+                st.rows(out=len(data["lat"]))
+            if kind == "cells":
+                print(f"[INFO] {year}: {len(yearly)} 筆 → {len(data['n'])} 格（{bin_kind}, {cell_deg}°）")
+
+            if kind is None:
+                fg = folium.FeatureGroup(name=str(year), show=(i == 0))
+                _add_circle_markers(fg, yearly)
+            elif lazy:
+                rel = f"{data_dir}/{year}.json"
+                payload = json.dumps({"kind": kind, "opts": opts, "data": data}, ensure_ascii=False,
+                                     separators=(",", ":"))
+                (out_dir / rel).write_text(payload, encoding="utf-8")
+                fg = QuakeLayer(kind, url=rel, name=str(year), show=(i == 0))
+            else:
+                fg = QuakeLayer(kind, data=data, opts=opts, name=str(year), show=(i == 0))
 
         fg.add_to(m)
         # 取得此 FeatureGroup 的 JS 變數名稱（folium 內部用 get_name()）
@@ -213,7 +329,9 @@ def make_interactive_map(json_path: str, outfile: str = "index.html") -> None:
     {years_options}
   </select>
 </div>
-<script>
+"""
+    # JS 以 MacroElement 最後加到地圖上，會排在各年份圖層的 script 之後執行
+    js = f"""
 (function() {{
   var map = {map_var};
   var groups = {{}};
@@ -240,21 +358,57 @@ def make_interactive_map(json_path: str, outfile: str = "index.html") -> None:
   sel.value = '{years[0] if years else "all"}';
   showYear(sel.value);
 }})();
-</script>
 """
     m.get_root().html.add_child(Element(html))
+    picker = MacroElement()
+    picker._template = Template(
+        "{% macro script(this, kwargs) %}{% raw %}" + js + "{% endraw %}{% endmacro %}"
+    )
+    picker.add_to(m)
 
     # 固定輸出檔名為 index.html（方便 GitHub Pages）
-    Path(outfile).parent.mkdir(parents=True, exist_ok=True)
-    m.save(outfile)
+    with stage("write", rows_in=len(df)):
+        Path(outfile).parent.mkdir(parents=True, exist_ok=True)
+        m.save(outfile)
     print(f"[OK] 互動地圖輸出：{outfile}")
 
 
 # -------------------------------
-# （可選）本地測試
+# CLI
 # -------------------------------
+def main() -> None:
+    ap = argparse.ArgumentParser(description="台灣地震互動地圖（下拉選年）")
+    ap.add_argument("catalogs", nargs="+", help="GDMS / CWA 地震目錄 JSON（可多檔）")
+    ap.add_argument("-o", "--outfile", default="release/index.html")
+    ap.add_argument("--renderer", choices=["packed", "markers"], default="packed")
+    ap.add_argument("--no-cache", action="store_true", help="不使用 data/cache/ 的 Parquet 快取")
+    ap.add_argument("--mode", choices=["auto", "raw", "binned"], default="auto",
+                    help="逐點或聚合格網；auto 依每年事件數切換")
+    ap.add_argument("--bin-threshold", type=int, default=10_000)
+    ap.add_argument("--cell-deg", type=float, default=0.1, help="格網大小（度）")
+    ap.add_argument("--bin-kind", choices=["hex", "grid"], default="hex")
+    ap.add_argument("--lazy", action="store_true",
+                    help="每年資料另存成 quakes/<year>.json，選到該年才下載")
+    ap.add_argument("--data-url", default=None,
+                    help="向查詢伺服器取資料，例如 http://127.0.0.1:8765/api/quakes/layer")
+    add_profile_args(ap)
+    args = ap.parse_args()
+    configure("make_map_by_year", args)
+    make_interactive_map(
+        args.catalogs,
+        outfile=args.outfile,
+        renderer=args.renderer,
+        use_cache=not args.no_cache,
+        mode=args.mode,
+        bin_threshold=args.bin_threshold,
+        cell_deg=args.cell_deg,
+        bin_kind=args.bin_kind,
+        lazy=args.lazy,
+        data_url=args.data_url,
+    )
+
+
 if __name__ == "__main__":
     # 例：
-    # make_interactive_map("attached_assets/data/earthquakes/GDMScatalog.json",
-    #                      outfile="release/index.html")
-    pass
+    # python src/make_map_by_year.py data/earthquakes/GDMScatalog.json -o release/index.html
+    main()
@@ -0,0 +1,149 @@
+# src/quake_api.py
+from __future__ import annotations
+import json
+
+import folium
+import numpy as np
+import pandas as pd
+from branca.element import Element, MacroElement
+from jinja2 import Template
+
+from make_map_by_year import QUAKE_DRAW_JS, _nullable, layer_payload
+from quake_index import QuakeIndex
+
+
+# -------------------------------
+# 記憶體內的地震目錄：讀一次、建一次索引，之後每個請求只回傳篩選後的 JSON 切片
+# （給 semiconductor-tariff-impact-taiwan/src/query_server.py 掛在 /api/quakes/ 下）
+# -------------------------------
+EVENT_LIMIT = 5_000
+
+
+def _year_window(year: int) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """該年的閉區間 [1/1 00:00, 12/31 23:59:59.999999999]，與 df['year'] 一致。"""
+    start = pd.Timestamp(year=int(year), month=1, day=1)
+    return start, pd.Timestamp(year=int(year) + 1, month=1, day=1) - pd.Timedelta(1, "ns")
+
+
+class QuakeAPI:
+    """
+    load_quakes() 的標準欄位 DataFrame + QuakeIndex。每個方法回傳可直接 json.dumps 的 dict：
+
+    - years()  ：各年份筆數（頁面的年份選單）
+    - layer()  ：某年（或全部）規模 ≥ mag_min 的圖層，格式同延遲載入的 <year>.json
+                  {"kind", "opts", "data"}，前端用 quakeDraw 繪製
+    - events() ：QuakeIndex 的時間窗 / bbox / 半徑 / 最近鄰查詢，欄位式陣列，最多 limit 筆
+    """
+
+    def __init__(self, df: pd.DataFrame, cell_km: float = 10.0):
+        self.df = df
+        self.index = QuakeIndex(df, cell_km=cell_km)
+        years, counts = np.unique(df["year"].to_numpy(), return_counts=True)
+        self._years = {"years": years.tolist(), "counts": counts.tolist(), "total": int(len(df))}
+
+    def years(self) -> dict:
+        return self._years
+
+    def layer(
+        self,
+        year: int | None = None,
+        mag_min: float | None = None,
+        mode: str = "auto",
+        bin_threshold: int = 10_000,
+        cell_deg: float = 0.1,
+        bin_kind: str = "hex",
+    ) -> dict:
+        start, end = _year_window(year) if year is not None else (None, None)
+        rows = self.index.query(start, end, mag_min=mag_min)
+        kind, data, opts = layer_payload(self.index.frame(rows), mode, bin_threshold, cell_deg, bin_kind)
+        return {"kind": kind, "opts": opts, "data": data, "n": int(len(rows))}
+
+    def events(self, limit: int = EVENT_LIMIT, **query) -> dict:
+        """query 為 QUERY_FIELDS 的子集（同 QuakeIndex.query_batch 的一筆）；依時間（最近鄰則依距離）排序。"""
+        hits = self.index.query_batch([query])
+        n = len(hits)
+        hits = hits.iloc[:limit]
+        sub = self.index.frame(hits["row"].to_numpy())
+        return {
+            "n": n,
+            "truncated": n > len(hits),
+            "time": sub["time"].dt.strftime("%Y-%m-%d %H:%M:%S").tolist(),
+            "lat": np.round(sub["lat"].to_numpy(dtype=float), 4).tolist(),
+            "lon": np.round(sub["lon"].to_numpy(dtype=float), 4).tolist(),
+            "depth": _nullable(sub["depth"].to_numpy(), 1),
+            "mag": _nullable(sub["mag"].to_numpy(), 1),
+            "distance_km": _nullable(hits["distance_km"].to_numpy(), 2),
+        }
+
+
+# -------------------------------
+# 伺服器版地圖頁：年份 / 規模門檻 / 模式改變時向 <api>/layer 取資料，只留一個圖層
+# -------------------------------
+PAGE_CONTROLS = """
+<div id="quake-filter" style="
+  position: fixed; top: 10px; left: 50px; z-index: 9999;
+  background: white; padding: 6px 8px; border-radius: 4px;
+  box-shadow: 0 1px 4px rgba(0,0,0,0.3); font: 14px/1.2 Arial;">
+  <label>年份</label>
+  <select id="yearSelect"><option value="all">全部</option></select>
+  <label style="margin-left:8px;">規模 ≥</label>
+  <input id="magMin" type="number" step="0.5" min="0" max="9" style="width:4em;">
+  <label style="margin-left:8px;">模式</label>
+  <select id="modeSelect">
+    <option value="auto">auto</option><option value="raw">逐點</option><option value="binned">格網</option>
+  </select>
+  <span id="quakeInfo" style="margin-left:8px; color:#555;"></span>
+</div>
+"""
+
+PAGE_JS = """
+(function() {
+  var map = %(map)s, base = %(api)s;
+  var layer = L.featureGroup().addTo(map);
+  var year = document.getElementById('yearSelect'), mag = document.getElementById('magMin'),
+      mode = document.getElementById('modeSelect'), info = document.getElementById('quakeInfo');
+  var seq = 0;
+
+  function refresh() {
+    var q = new URLSearchParams({mode: mode.value});
+    if (year.value !== 'all') q.set('year', year.value);
+    if (mag.value !== '') q.set('mag_min', mag.value);
+    var mine = ++seq;
+    info.textContent = '載入中…';
+    fetch(base + '/layer?' + q)
+      .then(function(r) { return r.json(); })
+      .then(function(p) {
+        if (mine !== seq) return;  // 已有較新的請求
+        layer.clearLayers();
+        quakeDraw[p.kind](layer, p.data, p.opts);
+        info.textContent = p.n + ' 筆';
+      })
+      .catch(function(err) { info.textContent = '載入失敗'; console.error(err); });
+  }
+
+  fetch(base + '/years')
+    .then(function(r) { return r.json(); })
+    .then(function(y) {
+      y.years.forEach(function(v, i) {
+        var o = document.createElement('option');
+        o.value = v; o.textContent = v + '（' + y.counts[i] + '）';
+        year.appendChild(o);
+      });
+      if (y.years.length) year.value = y.years[y.years.length - 1];
+      refresh();
+    });
+  [year, mag, mode].forEach(function(el) { el.addEventListener('change', refresh); });
+})();
+"""
+
+
+def quake_page(api: str = "/api/quakes") -> str:
+    """查詢伺服器的地圖頁（HTML 字串）：底圖與 make_interactive_map 相同，資料全部向 api 取。"""
+    m = folium.Map(location=[23.7, 121.0], zoom_start=7, tiles="CartoDB positron")
+    m.get_root().header.add_child(Element(QUAKE_DRAW_JS), name="quake_draw")
+    m.get_root().html.add_child(Element(PAGE_CONTROLS))
+    js = PAGE_JS % {"map": m.get_name(), "api": json.dumps(api)}
+    page = MacroElement()
+    page._template = Template("{% macro script(this, kwargs) %}{% raw %}" + js + "{% endraw %}{% endmacro %}")
+    page.add_to(m)
+    return m.get_root().render()
@@ -0,0 +1,114 @@
+# src/quake_binning.py
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+
+# 經度在台灣緯度附近的縮放（1 度經度 ≈ cos(23.7°) 度緯度），讓六角格接近正六邊形
+REF_LAT = 23.7
+LON_SCALE = float(np.cos(np.radians(REF_LAT)))
+
+BIN_KINDS = ("hex", "grid")
+
+
+# -------------------------------
+# 格網索引：每個事件 → (格 id, 格中心)
+# -------------------------------
+def _grid_cells(lat: np.ndarray, lon: np.ndarray, cell_deg: float):
+    """方格：cell_deg × cell_deg 度。"""
+    i = np.floor(lat / cell_deg).astype(np.int64)
+    j = np.floor(lon / cell_deg).astype(np.int64)
+    return i, j
+
+
+def _grid_centers(i: np.ndarray, j: np.ndarray, cell_deg: float):
+    return (i + 0.5) * cell_deg, (j + 0.5) * cell_deg
+
+
+def _hex_cells(lat: np.ndarray, lon: np.ndarray, cell_deg: float):
+    """
+    尖頂六角格（axial 座標 q, r），在 x = lon·cos(REF_LAT)、y = lat 的平面上計算。
+    cell_deg 為相鄰格中心距離（約等於格寬）。
+    """
+    size = cell_deg / np.sqrt(3)
+    x, y = lon * LON_SCALE, lat
+    q = (np.sqrt(3) / 3 * x - y / 3) / size
+    r = (2 / 3 * y) / size
+
+    # cube rounding：三個座標分別四捨五入，修正誤差最大的那個
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+
+def _hex_centers(q: np.ndarray, r: np.ndarray, cell_deg: float):
+    size = cell_deg / np.sqrt(3)
+    x = size * np.sqrt(3) * (q + r / 2)
+    y = size * 1.5 * r
+    return y, x / LON_SCALE
+
+
+# -------------------------------
+# 聚合：每 (年, 格) 一列 — 筆數、最大規模、平均深度
+# -------------------------------
+def bin_quakes(df: pd.DataFrame, cell_deg: float = 0.1, kind: str = "hex") -> pd.DataFrame:
+    """
+    把地震事件依年份與格網聚合（純 NumPy，一次排序 + reduceat）。
+
+    回傳欄位：['year','lat','lon','count','max_mag','mean_depth']，
+    lat/lon 為格中心；沒有規模/深度資料的格為 NaN。
+    """
+    if kind not in BIN_KINDS:
+        raise ValueError(f"未知的格網類型：{kind!r}（可用 {', '.join(BIN_KINDS)}）")
+    cols = ["year", "lat", "lon", "count", "max_mag", "mean_depth"]
+    if df.empty:
+        return pd.DataFrame(columns=cols)
+
+    lat = df["lat"].to_numpy(dtype=np.float64)
+    lon = df["lon"].to_numpy(dtype=np.float64)
+    year = df["year"].to_numpy(dtype=np.int64)
+    n = len(df)
+    mag = df["mag"].to_numpy(dtype=np.float64) if "mag" in df else np.full(n, np.nan)
+    depth = df["depth"].to_numpy(dtype=np.float64) if "depth" in df else np.full(n, np.nan)
+
+    a, b = _hex_cells(lat, lon, cell_deg) if kind == "hex" else _grid_cells(lat, lon, cell_deg)
+
+    # (year, a, b) → 單一整數 key，排序後每段就是一格
+    a0, b0 = a.min(), b.min()
+    a, b = a - a0, b - b0
+    span_b = int(b.max()) + 1
+    span_a = int(a.max()) + 1
+    key = (year - year.min()) * (span_a * span_b) + a * span_b + b
+    order = np.argsort(key, kind="stable")
+    key_s = key[order]
+    starts = np.flatnonzero(np.r_[True, key_s[1:] != key_s[:-1]])
+
+    count = np.diff(np.r_[starts, n])
+    mag_s = np.where(np.isnan(mag[order]), -np.inf, mag[order])
+    max_mag = np.maximum.reduceat(mag_s, starts)
+    max_mag = np.where(np.isinf(max_mag), np.nan, max_mag)
+
+    dep_s = depth[order]
+    has_dep = ~np.isnan(dep_s)
+    dep_sum = np.add.reduceat(np.where(has_dep, dep_s, 0.0), starts)
+    dep_n = np.add.reduceat(has_dep.astype(np.int64), starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_depth = np.where(dep_n > 0, dep_sum / dep_n, np.nan)
+
+    first = order[starts]
+    ca, cb = a[first] + a0, b[first] + b0
+    c_lat, c_lon = _hex_centers(ca, cb, cell_deg) if kind == "hex" else _grid_centers(ca, cb, cell_deg)
+
+    return pd.DataFrame({
+        "year": year[first],
+        "lat": c_lat,
+        "lon": c_lon,
+        "count": count,
+        "max_mag": max_mag,
+        "mean_depth": mean_depth,
+    })
@@ -0,0 +1,92 @@
+# src/quake_cache.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable
+import json
+import sys
+
+import pandas as pd
+
+try:  # Parquet 需要 pyarrow；沒有安裝時快取自動停用，直接解析 JSON
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "common"))  # 兩個專案共用的模組
+from atomic_io import atomic_path, atomic_write_json, load_json, sha256_bytes, sha256_file  # noqa: E402
+
+
+# 預設快取位置：taiwan_earthquake_analysis/data/cache/
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[1] / "data" / "cache"
+_INDEX_NAME = "index.json"
+
+
+# -------------------------------
+# 內容雜湊（以 size + mtime 記住上次算過的結果，warm run 不必重讀檔案）
+# -------------------------------
+def content_hash(path: str | Path, cache_dir: Path = DEFAULT_CACHE_DIR) -> str:
+    """回傳檔案內容的 sha256；size 與 mtime 未變時直接沿用 index.json 裡的值。"""
+    p = Path(path).resolve()
+    st = p.stat()
+    index = load_json(cache_dir / _INDEX_NAME, {})
+    entry = index.get(str(p))
+    if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+        return entry["sha256"]
+
+    digest = sha256_file(p)
+    index[str(p)] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    atomic_write_json(cache_dir / _INDEX_NAME, index, ensure_ascii=False, indent=1)
+    return digest
+
+
+# -------------------------------
+# 快取讀取：key = 檔案內容雜湊 + loader 名稱/版本 + 參數
+# -------------------------------
+def cache_key(digest: str, loader_name: str, version: str, params: dict | None = None) -> str:
+    payload = json.dumps(
+        {"sha256": digest, "loader": loader_name, "version": version, "params": params or {}},
+        sort_keys=True,
+    )
+    return sha256_bytes(payload.encode("utf-8"))[:20]
+
+
+def cached_load(
+    path: str | Path,
+    loader: Callable[[str | Path], pd.DataFrame],
+    version: str,
+    params: dict | None = None,
+    cache_dir: str | Path = DEFAULT_CACHE_DIR,
+) -> pd.DataFrame:
+    """
+    以 Parquet 快取 loader(path) 的標準欄位 DataFrame（time/lat/lon/depth/mag/year）。
+
+    - 原始檔內容、loader 版本或 params 任一改變，key 就不同 → 自動重建
+    - 命中時只讀 Parquet，完全不解析 JSON
+    - 同一來源檔 + loader 的舊快取檔會在寫入新檔時清掉
+    """
+    if not HAS_PYARROW:
+        print("[WARN] 未安裝 pyarrow，略過快取。")
+        return loader(path)
+
+    cache_dir = Path(cache_dir)
+    p = Path(path)
+    name = getattr(loader, "__name__", "loader").strip("_")
+    key = cache_key(content_hash(p, cache_dir), name, version, params)
+    prefix = f"{p.stem}.{name}."
+    out = cache_dir / f"{prefix}{key}.parquet"
+
+    if out.exists():
+        print(f"[CACHE] 命中：{out.name}")
+        return pd.read_parquet(out)
+
+    df = loader(p)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with atomic_path(out) as tmp:
+        df.to_parquet(tmp, index=False)
+    for old in cache_dir.glob(f"{prefix}*.parquet"):
+        if old != out:
+            old.unlink(missing_ok=True)
+    print(f"[CACHE] 寫入：{out.name}")
+    return df
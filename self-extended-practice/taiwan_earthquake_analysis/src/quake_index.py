@@ -0,0 +1,258 @@
+# src/quake_index.py
+from __future__ import annotations
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+
+# -------------------------------
+# 距離：球面大圓距離（km）
+# -------------------------------
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG = float(np.radians(1.0) * EARTH_RADIUS_KM)  # 1 度緯度 ≈ 111.2 km
+
+# 批次查詢可用的欄位（DataFrame 欄名或 dict key）
+QUERY_FIELDS = (
+    "start", "end", "lat", "lon", "radius_km", "k",
+    "lat_min", "lat_max", "lon_min", "lon_max",
+    "mag_min", "mag_max", "depth_min", "depth_max",
+)
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _ns(t) -> int | None:
+    """時間參數（字串 / Timestamp / datetime64）→ int64 ns；None 代表不限。"""
+    if t is None or (not isinstance(t, str) and pd.isna(t)):
+        return None
+    return int(pd.Timestamp(t).value)
+
+
+def _given(v) -> bool:
+    return v is not None and not (isinstance(v, float) and np.isnan(v))
+
+
+def _float_column(s: pd.Series) -> np.ndarray:
+    """保留目錄本身的浮點精度（load_quakes 為 float32），非浮點欄轉 float64。"""
+    return s.to_numpy(dtype=s.dtype if s.dtype in (np.float32, np.float64) else np.float64)
+
+
+# -------------------------------
+# 時空索引：時間排序陣列 + 經緯度方格
+# -------------------------------
+class QuakeIndex:
+    """
+    建在 load_quakes() 的標準欄位 DataFrame 上（time/lat/lon/depth/mag），建一次、查多次：
+
+    - 時間索引：依時間排序的 int64 ns 陣列，時間窗用二分搜尋（searchsorted）切出連續區段
+    - 空間索引：cell_km × cell_km 的經緯度方格；事件依 (格, 時間) 排序，bbox / 半徑查詢
+      對涵蓋的每一格二分搜尋時間窗，只取出「在這些格內且在時間窗內」的事件
+    - 查詢規劃：時間窗內的筆數比涵蓋的格數還少時，直接掃時間區段；其餘條件（規模、深度、
+      精確的大圓距離）只在候選上向量化過濾
+
+    回傳值一律是原 DataFrame 的位置（iloc），依時間排序；時間條件為閉區間 [start, end]，
+    與 Series.between 相同。
+    """
+
+    def __init__(self, df: pd.DataFrame, cell_km: float = 10.0):
+        self.df = df
+        self.cell_km = float(cell_km)
+
+        t = df["time"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        order = np.arange(len(df)) if np.all(t[1:] >= t[:-1]) else np.argsort(t, kind="stable")
+        self._row = order
+        self._t = t[order]
+        self._lat = df["lat"].to_numpy(dtype=np.float64)[order]
+        self._lon = df["lon"].to_numpy(dtype=np.float64)[order]
+        self._mag = _float_column(df["mag"])[order]
+        self._depth = _float_column(df["depth"])[order]
+
+        # 方格：緯度方向 cell_km；經度方向以範圍內最高緯度換算，確保每格東西寬至少 cell_km
+        if len(df):
+            self.lat0, lat1 = float(np.floor(self._lat.min())), float(self._lat.max())
+            self.lon0, lon1 = float(np.floor(self._lon.min())), float(self._lon.max())
+        else:
+            self.lat0 = lat1 = self.lon0 = lon1 = 0.0
+        max_abs_lat = max(abs(self.lat0), abs(lat1))
+        self.dlat = self.cell_km / KM_PER_DEG
+        self.dlon = self.cell_km / (KM_PER_DEG * max(np.cos(np.radians(max_abs_lat)), 1e-6))
+        self.ny = int((lat1 - self.lat0) // self.dlat) + 1
+        self.nx = int((lon1 - self.lon0) // self.dlon) + 1
+
+        # (格, 時間位置) 合成鍵：穩定排序後同一格內仍依時間，任一格的時間窗都能二分搜尋
+        cell = self._iy(self._lat) * self.nx + self._ix(self._lon)
+        self._cell_order = np.argsort(cell, kind="stable")
+        self._cell_key = cell[self._cell_order] * max(len(df), 1) + self._cell_order
+
+    def __len__(self) -> int:
+        return len(self._t)
+
+    def _iy(self, lat) -> np.ndarray:
+        return np.clip(((np.asarray(lat) - self.lat0) // self.dlat).astype(np.int64), 0, self.ny - 1)
+
+    def _ix(self, lon) -> np.ndarray:
+        return np.clip(((np.asarray(lon) - self.lon0) // self.dlon).astype(np.int64), 0, self.nx - 1)
+
+    # -------------------------------
+    # 候選集合
+    # -------------------------------
+    def _time_range(self, start, end) -> tuple[int, int]:
+        t0, t1 = _ns(start), _ns(end)
+        i0 = 0 if t0 is None else int(np.searchsorted(self._t, t0, side="left"))
+        i1 = len(self._t) if t1 is None else int(np.searchsorted(self._t, t1, side="right"))
+        return i0, max(i0, i1)
+
+    def _box_cells(self, box: tuple[float, float, float, float]) -> np.ndarray:
+        """bbox 涵蓋的格 id。"""
+        lat_min, lat_max, lon_min, lon_max = box
+        if lat_min > lat_max or lon_min > lon_max:
+            return np.empty(0, np.int64)
+        rows = np.arange(self._iy(lat_min), self._iy(lat_max) + 1)
+        cols = np.arange(self._ix(lon_min), self._ix(lon_max) + 1)
+        return (rows[:, None] * self.nx + cols[None, :]).ravel()
+
+    @staticmethod
+    def _radius_box(lat: float, lon: float, radius_km: float) -> tuple[float, float, float, float]:
+        dlat = radius_km / KM_PER_DEG
+        edge = min(abs(lat) + dlat, 89.9)
+        dlon = min(radius_km / (KM_PER_DEG * np.cos(np.radians(edge))), 180.0)
+        return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+    def query(
+        self,
+        start=None,
+        end=None,
+        *,
+        bbox: tuple[float, float, float, float] | None = None,
+        lat: float | None = None,
+        lon: float | None = None,
+        radius_km: float | None = None,
+        mag_min: float | None = None,
+        mag_max: float | None = None,
+        depth_min: float | None = None,
+        depth_max: float | None = None,
+    ) -> np.ndarray:
+        """
+        時間窗 + 空間（bbox=(lat_min, lat_max, lon_min, lon_max) 或 lat/lon + radius_km）
+        + 規模 / 深度（閉區間）→ 原 DataFrame 位置，依時間排序。
+        """
+        pos = self._candidates(start, end, bbox, lat, lon, radius_km)
+        keep = np.ones(len(pos), dtype=bool)
+        # 門檻先轉成欄位精度：float32 的 M4.1 在 float64 下是 4.0999999，np.float64(4.1) 會把它濾掉
+        mag, depth = self._mag.dtype.type, self._depth.dtype.type
+        if _given(mag_min):
+            keep &= self._mag[pos] >= mag(mag_min)
+        if _given(mag_max):
+            keep &= self._mag[pos] <= mag(mag_max)
+        if _given(depth_min):
+            keep &= self._depth[pos] >= depth(depth_min)
+        if _given(depth_max):
+            keep &= self._depth[pos] <= depth(depth_max)
+        pos = pos[keep]
+        if _given(radius_km):
+            pos = pos[haversine_km(lat, lon, self._lat[pos], self._lon[pos]) <= radius_km]
+        return self._row[pos]
+
+    def _candidates(self, start, end, bbox, lat, lon, radius_km) -> np.ndarray:
+        """時間窗內、空間框內的候選（時間排序陣列的位置，已排序）。"""
+        if _given(radius_km):
+            if not (_given(lat) and _given(lon)):
+                raise ValueError("半徑查詢需要 lat、lon 與 radius_km。")
+            box = self._radius_box(lat, lon, radius_km)
+            if bbox is not None:
+                box = (max(box[0], bbox[0]), min(box[1], bbox[1]), max(box[2], bbox[2]), min(box[3], bbox[3]))
+        else:
+            box = bbox
+
+        i0, i1 = self._time_range(start, end)
+        if box is None:
+            return np.arange(i0, i1)
+
+        lat_min, lat_max, lon_min, lon_max = box
+        cells = self._box_cells(box)
+        if i1 - i0 <= len(cells):
+            # 時間窗比涵蓋的格數還少：直接在時間區段上過濾經緯度
+            pos = np.arange(i0, i1)
+            la, lo = self._lat[i0:i1], self._lon[i0:i1]
+            return pos[(la >= lat_min) & (la <= lat_max) & (lo >= lon_min) & (lo <= lon_max)]
+
+        # 每格各自的時間窗 [i0, i1) → _cell_order 中的區段，一次 searchsorted 全部算完
+        n = max(len(self._t), 1)
+        lo_idx = np.searchsorted(self._cell_key, cells * n + i0, side="left")
+        hi_idx = np.searchsorted(self._cell_key, cells * n + i1, side="left")
+        lengths = hi_idx - lo_idx
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, np.int64)
+        offsets = np.repeat(lo_idx - np.cumsum(lengths) + lengths, lengths)
+        pos = self._cell_order[offsets + np.arange(total)]
+        la, lo = self._lat[pos], self._lon[pos]
+        pos = pos[(la >= lat_min) & (la <= lat_max) & (lo >= lon_min) & (lo <= lon_max)]
+        return np.sort(pos)
+
+    # -------------------------------
+    # 最近鄰：半徑逐步加倍，直到圈內有 k 筆（圈內已涵蓋所有更近的事件）
+    # -------------------------------
+    def nearest(self, lat: float, lon: float, k: int = 10, start=None, end=None, **filters) -> tuple[np.ndarray, np.ndarray]:
+        """距 (lat, lon) 最近的 k 筆（可加時間 / 規模 / 深度條件）→ (原 DataFrame 位置, 距離 km)，由近到遠。"""
+        if len(self._t) == 0:
+            return np.empty(0, np.int64), np.empty(0)
+        grid = (self.lat0, self.lat0 + self.ny * self.dlat, self.lon0, self.lon0 + self.nx * self.dlon)
+        radius = self.cell_km
+        while True:
+            rows = self.query(start, end, lat=lat, lon=lon, radius_km=radius, **filters)
+            box = self._radius_box(lat, lon, radius)
+            covers = box[0] <= grid[0] and box[1] >= grid[1] and box[2] <= grid[2] and box[3] >= grid[3]
+            if len(rows) >= k or covers:
+                break
+            radius *= 2
+        dist = haversine_km(lat, lon, self.df["lat"].to_numpy()[rows], self.df["lon"].to_numpy()[rows])
+        top = np.argsort(dist, kind="stable")[:k]
+        return rows[top], dist[top]
+
+    # -------------------------------
+    # 批次查詢
+    # -------------------------------
+    def query_batch(self, queries: pd.DataFrame | Iterable[dict]) -> pd.DataFrame:
+        """
+        多筆查詢一次送入：每筆是 QUERY_FIELDS 的任意子集（DataFrame 一列或一個 dict，
+        缺值 / NaN 代表不限）。有 k 的那筆做最近鄰，否則做範圍查詢。
+        回傳長表 ['query', 'row', 'distance_km']：query 是第幾筆查詢，row 是原 DataFrame 位置；
+        distance_km 只有最近鄰 / 半徑查詢才有值。
+        """
+        records = queries.to_dict("records") if isinstance(queries, pd.DataFrame) else list(queries)
+        q_ids, rows, dists = [], [], []
+        lat_all, lon_all = self.df["lat"].to_numpy(), self.df["lon"].to_numpy()
+        for qi, q in enumerate(records):
+            unknown = set(q) - set(QUERY_FIELDS)
+            if unknown:
+                raise ValueError(f"不支援的查詢欄位：{', '.join(sorted(unknown))}")
+            q = {f: q.get(f) for f in QUERY_FIELDS if _given(q.get(f))}
+            filters = {f: q[f] for f in ("mag_min", "mag_max", "depth_min", "depth_max") if f in q}
+            if "k" in q:
+                r, d = self.nearest(q["lat"], q["lon"], int(q["k"]), q.get("start"), q.get("end"), **filters)
+            else:
+                box_keys = ("lat_min", "lat_max", "lon_min", "lon_max")
+                bbox = tuple(q.get(f, default) for f, default in zip(box_keys, (-90.0, 90.0, -180.0, 180.0))) \
+                    if any(f in q for f in box_keys) else None
+                r = self.query(q.get("start"), q.get("end"), bbox=bbox, lat=q.get("lat"), lon=q.get("lon"),
+                               radius_km=q.get("radius_km"), **filters)
+                d = (haversine_km(q["lat"], q["lon"], lat_all[r], lon_all[r])
+                     if "radius_km" in q else np.full(len(r), np.nan))
+            q_ids.append(np.full(len(r), qi, dtype=np.int64))
+            rows.append(r)
+            dists.append(d)
+        if not records:
+            return pd.DataFrame({"query": np.empty(0, np.int64), "row": np.empty(0, np.int64),
+                                 "distance_km": np.empty(0)})
+        return pd.DataFrame({"query": np.concatenate(q_ids), "row": np.concatenate(rows),
+                             "distance_km": np.concatenate(dists)})
+
+    def frame(self, rows: np.ndarray) -> pd.DataFrame:
+        """查詢結果（位置）→ 原 DataFrame 的對應列。"""
+        return self.df.iloc[rows]
@@ -0,0 +1,256 @@
+# src/quake_raster.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterable
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from quake_binning import LON_SCALE
+from quake_sources import TAIWAN_BBOX, load_quakes
+
+
+# -------------------------------
+# 靜態密度圖：經緯度 → 像素格，純 NumPy 累加，matplotlib imsave 輸出 PNG（不開 figure）
+# -------------------------------
+# 深度分類與互動地圖相同：<=70km（含深度缺值）橘色，>70km 紅色
+DEPTH_SPLIT_KM = 70.0
+DEPTH_COLORS = ["#ff7f0e", "#d62728"]
+BACKGROUND = "#ffffff"
+
+# 每次累加的列數：暫存記憶體上限與目錄大小無關（每塊約 CHUNK_ROWS × 40 bytes）
+CHUNK_ROWS = 1_000_000
+
+# 每個事件的權重：count = 1、mag = max(規模, 0) + MAG_FLOOR、energy = 10^(1.5·M)（相對能量）
+# GDMS 目錄有 M <= 0 的微震：mag 權重下限為 MAG_FLOOR，這些事件（以及規模缺值的事件）
+# 仍會出現在密度圖上，像素權重和也不會是負的
+WEIGHTS = ("count", "mag", "energy")
+MAG_FLOOR = 0.1
+SHADINGS = ("log", "eq")
+VALUES = ("density", "max_mag")
+
+# 預設寬度（像素）：單張 / 每年一張的小倍數圖
+WIDTH = 1200
+BY_YEAR_WIDTH = 400
+
+# 直方圖等化用的 bin 數
+EQ_BINS = 4096
+
+
+def _hex_rgb(color: str) -> np.ndarray:
+    c = color.lstrip("#")
+    return np.array([int(c[i:i + 2], 16) for i in (0, 2, 4)], dtype=np.float32) / 255.0
+
+
+class QuakeRaster:
+    """
+    在 bbox 上的像素格累加事件：每 (圖層, 深度分類, 像素) 的權重和與筆數，以及每 (圖層, 像素) 的最大規模。
+    by_year=False 只有一個圖層；by_year=True 每年一個圖層（小倍數圖）。
+
+    add() 可重複呼叫（例如逐塊讀進來的目錄）；累加陣列大小只跟像素數、年數有關
+    （每圖層每像素 20 bytes），暫存則以 CHUNK_ROWS 為上限。
+    """
+
+    def __init__(self, width: int = WIDTH, bbox: dict = TAIWAN_BBOX, by_year: bool = False, weight: str = "mag"):
+        if weight not in WEIGHTS:
+            raise ValueError(f"weight 只支援 {WEIGHTS}")
+        (self.lat0, self.lat1), (self.lon0, self.lon1) = bbox["lat"], bbox["lon"]
+        self.width = int(width)
+        # 經度乘上 cos(REF_LAT)，讓像素在台灣附近接近正方形
+        self.height = max(1, int(round(self.width * (self.lat1 - self.lat0) / ((self.lon1 - self.lon0) * LON_SCALE))))
+        self.by_year = by_year
+        self.weight = weight
+        self.years: list[int] = [] if by_year else [0]
+        n_pix = self.height * self.width
+        n_layers = len(self.years)
+        self.sum = np.zeros((n_layers, 2, n_pix), dtype=np.float32)
+        self.count = np.zeros((n_layers, 2, n_pix), dtype=np.int32)
+        self.max_mag = np.full((n_layers, n_pix), -np.inf, dtype=np.float32)
+
+    @property
+    def n_events(self) -> int:
+        return int(self.count.sum())
+
+    def _add_years(self, years: np.ndarray) -> None:
+        new = sorted(set(years.tolist()) - set(self.years))
+        if not new:
+            return
+        merged = sorted(self.years + new)
+        slots = [merged.index(y) for y in self.years]
+
+        def grow(a, fill):
+            out = np.full((len(merged),) + a.shape[1:], fill, dtype=a.dtype)
+            out[slots] = a
+            return out
+
+        self.sum, self.count = grow(self.sum, 0), grow(self.count, 0)
+        self.max_mag = grow(self.max_mag, -np.inf)
+        self.years = merged
+
+    def add(self, df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> "QuakeRaster":
+        """累加標準欄位 DataFrame（lat/lon/depth/mag，by_year 另需 year 或 time）。"""
+        for start in range(0, len(df), chunk_rows):
+            self._add_chunk(df.iloc[start:start + chunk_rows])
+        return self
+
+    def _add_chunk(self, df: pd.DataFrame) -> None:
+        lat = df["lat"].to_numpy(dtype=np.float64)
+        lon = df["lon"].to_numpy(dtype=np.float64)
+        inside = (lat >= self.lat0) & (lat <= self.lat1) & (lon >= self.lon0) & (lon <= self.lon1)
+        if not inside.all():
+            df, lat, lon = df[inside], lat[inside], lon[inside]
+        if len(df) == 0:
+            return
+
+        w, h, n_pix = self.width, self.height, self.height * self.width
+        px = np.minimum(((lon - self.lon0) * (w / (self.lon1 - self.lon0))).astype(np.int64), w - 1)
+        py = np.minimum(((self.lat1 - lat) * (h / (self.lat1 - self.lat0))).astype(np.int64), h - 1)  # 第 0 列在北
+        pix = py * w + px
+
+        deep = df["depth"].to_numpy(dtype=np.float32) > DEPTH_SPLIT_KM  # NaN > 70 為 False → 淺層
+        key = deep.astype(np.int64) * n_pix + pix                      # (深度分類, 像素)
+        mag = df["mag"].to_numpy(dtype=np.float32)
+        if self.weight == "count":
+            wts = None
+        else:
+            m = np.nan_to_num(mag.astype(np.float64), nan=0.0)
+            wts = np.maximum(m, 0.0) + MAG_FLOOR if self.weight == "mag" else 10.0 ** (1.5 * m)
+
+        if not self.by_year:
+            self._add_layer(0, key, pix, mag, wts)
+            return
+        # 依年份分組（目錄已依時間排序時，每塊通常只跨一兩年），每年一次 bincount
+        year = (df["year"] if "year" in df else df["time"].dt.year).to_numpy(dtype=np.int64)
+        self._add_years(np.unique(year))
+        layer = np.searchsorted(np.asarray(self.years), year)
+        order = np.argsort(layer, kind="stable")
+        bounds = np.flatnonzero(np.diff(layer[order])) + 1
+        for idx in np.split(order, bounds):
+            self._add_layer(int(layer[idx[0]]), key[idx], pix[idx], mag[idx], None if wts is None else wts[idx])
+
+    def _add_layer(self, layer: int, key: np.ndarray, pix: np.ndarray, mag: np.ndarray, wts) -> None:
+        size = 2 * self.height * self.width
+        counts = np.bincount(key, minlength=size).reshape(2, -1)
+        self.count[layer] += counts.astype(np.int32)
+        self.sum[layer] += counts if wts is None else np.bincount(key, weights=wts, minlength=size).reshape(2, -1)
+        has_mag = ~np.isnan(mag)
+        np.maximum.at(self.max_mag[layer], pix[has_mag], mag[has_mag])
+
+    # -------------------------------
+    # 上色：log / 直方圖等化 → 各深度分類的不透明度，依序疊在底色上
+    # -------------------------------
+    def _shade(self, values: np.ndarray, shading: str) -> np.ndarray:
+        """非負值 → [0, 1]；所有圖層共用同一個尺度，小倍數圖之間可以比較。"""
+        v = np.log1p(values / max(values[values > 0].min(), 1e-12)) if (values > 0).any() else values
+        vmax = float(v.max()) if v.size else 0.0
+        if vmax <= 0:
+            return np.zeros_like(values, dtype=np.float32)
+        if shading == "log":
+            return (v / vmax).astype(np.float32)
+        if shading != "eq":
+            raise ValueError(f"shading 只支援 {SHADINGS}")
+        nz = v[v > 0]
+        hist, edges = np.histogram(nz, bins=EQ_BINS, range=(0.0, vmax))
+        cdf = np.cumsum(hist) / nz.size
+        out = np.interp(v, edges[1:], cdf).astype(np.float32)
+        out[v <= 0] = 0.0
+        return out
+
+    def images(self, shading: str = "log", value: str = "density", cmap: str = "magma") -> np.ndarray:
+        """每個圖層的 RGB 影像：(layers, H, W, 3)，值域 [0, 1]。"""
+        n_layers, h, w = len(self.years), self.height, self.width
+        if value == "density":
+            alpha = self._shade(self.sum, shading)  # (layers, 2, pix)
+            rgb = np.broadcast_to(_hex_rgb(BACKGROUND), (n_layers, h * w, 3)).copy()
+            for cls in (0, 1):  # 深層畫在淺層上面
+                a = alpha[:, cls, :, None]
+                rgb = rgb * (1.0 - a) + _hex_rgb(DEPTH_COLORS[cls]) * a
+            return rgb.reshape(n_layers, h, w, 3)
+        if value != "max_mag":
+            raise ValueError(f"value 只支援 {VALUES}")
+
+        from matplotlib import colormaps
+
+        mm = self.max_mag
+        has = np.isfinite(mm)
+        lo, hi = (float(mm[has].min()), float(mm[has].max())) if has.any() else (0.0, 1.0)
+        scaled = np.where(has, (mm - lo) / max(hi - lo, 1e-6), 0.0)
+        rgb = colormaps[cmap](scaled)[..., :3].astype(np.float32)
+        rgb[~has] = _hex_rgb(BACKGROUND)
+        return rgb.reshape(n_layers, h, w, 3)
+
+    def save(self, out_png: str | Path, shading: str = "log", value: str = "density", cols: int = 6,
+             gutter: int = 4) -> Path:
+        """寫 PNG。by_year 時把每年排成 cols 欄的小倍數圖（依年份由左到右、由上到下）。"""
+        from matplotlib.image import imsave  # 不經過 pyplot / backend，無螢幕環境可用
+
+        imgs = self.images(shading, value)
+        if self.by_year and len(imgs) > 1:
+            cols = min(cols, len(imgs))
+            rows = -(-len(imgs) // cols)
+            h, w = self.height, self.width
+            sheet = np.ones((rows * h + (rows - 1) * gutter, cols * w + (cols - 1) * gutter, 3), dtype=np.float32)
+            for i, img in enumerate(imgs):
+                r, c = divmod(i, cols)
+                sheet[r * (h + gutter):r * (h + gutter) + h, c * (w + gutter):c * (w + gutter) + w] = img
+        else:
+            sheet = imgs[0] if len(imgs) else np.ones((self.height, self.width, 3), dtype=np.float32)
+
+        out = Path(out_png)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        imsave(out, (np.clip(sheet, 0.0, 1.0) * 255 + 0.5).astype(np.uint8))
+        return out
+
+
+def render_raster(
+    catalogs: str | Path | Iterable[str | Path],
+    out_png: str | Path,
+    width: int | None = None,
+    by_year: bool = False,
+    weight: str = "mag",
+    shading: str = "log",
+    value: str = "density",
+    cols: int = 6,
+    use_cache: bool = True,
+) -> Path:
+    df = load_quakes(catalogs, use_cache=use_cache)
+    width = width or (BY_YEAR_WIDTH if by_year else WIDTH)
+    raster = QuakeRaster(width=width, by_year=by_year, weight=weight).add(df)
+    out = raster.save(out_png, shading=shading, value=value, cols=cols)
+    years = f"，年份（依序）：{raster.years[0]}–{raster.years[-1]}" if by_year and raster.years else ""
+    print(f"✅ 密度圖已輸出：{out}（{raster.n_events:,} 筆，{raster.width}×{raster.height} px{years}）")
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="台灣地震靜態密度圖（PNG）")
+    ap.add_argument("catalogs", nargs="+", help="GDMS / CWA 地震目錄 JSON（可多檔）")
+    ap.add_argument("-o", "--outfile", default="output/taiwan_earthquake_density.png")
+    ap.add_argument("--width", type=int, default=None,
+                    help=f"每張圖的寬度（像素；預設 {WIDTH}，--by-year 時 {BY_YEAR_WIDTH}）")
+    ap.add_argument("--weight", choices=WEIGHTS, default="mag")
+    ap.add_argument("--shading", choices=SHADINGS, default="log", help="log 或直方圖等化（eq）")
+    ap.add_argument("--value", choices=VALUES, default="density", help="密度（依深度分色）或每像素最大規模")
+    ap.add_argument("--by-year", action="store_true", help="每年一張的小倍數圖")
+    ap.add_argument("--cols", type=int, default=6, help="小倍數圖每列幾張")
+    ap.add_argument("--no-cache", action="store_true", help="不使用 data/cache/ 的 Parquet 快取")
+    args = ap.parse_args()
+    render_raster(
+        args.catalogs,
+        args.outfile,
+        width=args.width,
+        by_year=args.by_year,
+        weight=args.weight,
+        shading=args.shading,
+        value=args.value,
+        cols=args.cols,
+        use_cache=not args.no_cache,
+    )
+
+
+if __name__ == "__main__":
+    # 例：
+    # python src/quake_raster.py data/earthquakes/GDMScatalog.json -o output/density.png --shading eq
+    # python src/quake_raster.py data/earthquakes/GDMScatalog.json -o output/density_by_year.png --by-year --width 400
+    main()